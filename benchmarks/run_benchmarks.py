@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+Benchmarks for the TWSCA hot paths on synthetic market data.
+
+Generates a reproducible GBM price panel (tickers x days), writes it in the
+downloaded-CSV layout and times each stage of the analysis separately:
+
+    post2.*      run_twsca_analysis.py: load, smooth, normalize, correlate,
+                 DTW (full and incremental), write (Parquet and CSV),
+                 render, and perform_twsca_analysis end to end
+    post1.*      twsca_extensions.AnalysisExtensions.run_twsca and
+                 rolling_correlation
+    streamlit.*  rolling correlation, baton handoff and entropy of the
+                 Streamlit dashboard (twsca_tools.influence)
+
+Each stage is timed over --repeat runs; peak memory is measured with
+tracemalloc in one extra run so tracing does not distort the timings.
+Results are written as JSON and two result files can be compared:
+
+    python benchmarks/run_benchmarks.py --tickers 20 --days 1000 --output base.json
+    python benchmarks/run_benchmarks.py --output new.json
+    python benchmarks/run_benchmarks.py --compare base.json new.json --max-slowdown 1.2
+
+Everything runs offline; no data is downloaded.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (repo_root,
+             os.path.join(repo_root, "benchmarks"),
+             os.path.join(repo_root, "posts", "post_2_batons_and_traps"),
+             os.path.join(repo_root, "posts", "post_01_timewarp")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import synthetic_data
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a stage. The decorated setup function receives the shared
+    context and returns (callable, items, unit)."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress output of the code under test."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _post2():
+    with quiet():
+        import run_twsca_analysis
+    return run_twsca_analysis
+
+
+def _prepared_pairs(ctx):
+    """Aligned, smoothed and normalized (main, comparison) arrays per ticker."""
+    if 'pairs' not in ctx:
+        import twsca
+        main = ctx['panel'][ctx['main']]['Close']
+        pairs = {}
+        for ticker in ctx['comparisons']:
+            comp = ctx['panel'][ticker]['Close']
+            common = main.index.intersection(comp.index)
+            pairs[ticker] = tuple(
+                twsca.normalize_series(twsca.llt_filter(series.loc[common].values,
+                                                        sigma=1.0, alpha=0.5))
+                for series in (main, comp))
+        ctx['pairs'] = pairs
+    return ctx['pairs']
+
+
+def _pair_results(ctx):
+    """Windowed correlation/DTW frames per ticker, as produced by the analysis."""
+    if 'results' not in ctx:
+        run_twsca_analysis = _post2()
+        main = ctx['panel'][ctx['main']]['Close']
+        results = {'correlation': {}, 'dtw': {}}
+        with quiet():
+            for ticker in ctx['comparisons']:
+                pair = run_twsca_analysis.analyze_pair(main, ctx['panel'][ticker]['Close'],
+                                                       ticker, window=ctx['window'],
+                                                       dtw_mode='incremental')
+                results['correlation'][ticker], results['dtw'][ticker] = pair
+        ctx['results'] = results
+    return ctx['results']
+
+
+def _n_windows(ctx):
+    return len(ctx['comparisons']) * max(0, ctx['days'] - ctx['window'])
+
+
+@benchmark("post2.load_csv")
+def bench_load_csv(ctx):
+    run_twsca_analysis = _post2()
+    def run():
+        with quiet():
+            run_twsca_analysis.load_stock_data(ctx['csv_dir'], ctx['tickers'])
+    return run, ctx['n_tickers'] * ctx['days'], "rows"
+
+
+@benchmark("post2.load_price_matrix")
+def bench_load_price_matrix(ctx):
+    from twsca_tools import price_matrix
+    run_twsca_analysis = _post2()
+    matrix_dir = os.path.join(ctx['workdir'], "matrix_data")
+    if not os.path.exists(matrix_dir):
+        synthetic_data.write_history_csvs(ctx['panel'], matrix_dir)
+        price_matrix.build_price_matrix(matrix_dir)
+    def run():
+        with quiet():
+            run_twsca_analysis.load_stock_data(matrix_dir, ctx['tickers'])
+    return run, ctx['n_tickers'] * ctx['days'], "rows"
+
+
+@benchmark("post2.smooth")
+def bench_smooth(ctx):
+    import twsca
+    series = [df['Close'].values for df in ctx['panel'].values()]
+    def run():
+        for values in series:
+            twsca.llt_filter(values, sigma=1.0, alpha=0.5)
+    return run, ctx['n_tickers'] * ctx['days'], "samples"
+
+
+@benchmark("post2.normalize")
+def bench_normalize(ctx):
+    import twsca
+    series = [df['Close'].values for df in ctx['panel'].values()]
+    def run():
+        for values in series:
+            twsca.normalize_series(values)
+    return run, ctx['n_tickers'] * ctx['days'], "samples"
+
+
+@benchmark("post2.correlate")
+def bench_correlate(ctx):
+    from twsca_tools import windowed
+    pairs = _prepared_pairs(ctx)
+    def run():
+        for x, y in pairs.values():
+            windowed.batched_spectral_correlation(x, y, ctx['window'])
+    return run, _n_windows(ctx), "windows"
+
+
+@benchmark("post2.dtw_full")
+def bench_dtw_full(ctx):
+    import twsca
+    from twsca_tools import windowed
+    pairs = _prepared_pairs(ctx)
+    def run():
+        for x, y in pairs.values():
+            windowed.windowed_dtw_distances(x, y, ctx['window'], twsca.dtw_distance)
+    return run, _n_windows(ctx), "windows"
+
+
+@benchmark("post2.dtw_incremental")
+def bench_dtw_incremental(ctx):
+    from twsca_tools import dtw_kernels
+    pairs = _prepared_pairs(ctx)
+    def run():
+        for x, y in pairs.values():
+            dtw_kernels.rolling_dtw_distances(x, y, ctx['window'])
+    return run, _n_windows(ctx), "windows"
+
+
+@benchmark("post2.write_parquet")
+def bench_write_parquet(ctx):
+    from twsca_tools import results_store
+    results = _pair_results(ctx)
+    store_dir = os.path.join(ctx['workdir'], "store")
+    def run():
+        results_store.write_results(store_dir, ctx['main'], results['correlation'], results['dtw'])
+    return run, 2 * _n_windows(ctx), "values"
+
+
+@benchmark("post2.write_csv")
+def bench_write_csv(ctx):
+    results = _pair_results(ctx)
+    out_dir = os.path.join(ctx['workdir'], "csv_out")
+    os.makedirs(out_dir, exist_ok=True)
+    def run():
+        for kind in ('correlation', 'dtw'):
+            for ticker, df in results[kind].items():
+                df.to_csv(os.path.join(out_dir, f"{kind}_{ctx['main']}_vs_{ticker}.csv"))
+    return run, 2 * _n_windows(ctx), "values"
+
+
+@benchmark("post2.render")
+def bench_render(ctx):
+    with quiet():
+        import generate_visuals
+    results = _pair_results(ctx)
+    fig_dir = os.path.join(ctx['workdir'], "figures")
+    def run():
+        with quiet():
+            generate_visuals.plot_correlation_vs_dtw(results, ctx['main'], fig_dir)
+    return run, len(ctx['comparisons']), "figures"
+
+
+@benchmark("post2.end_to_end")
+def bench_end_to_end(ctx):
+    run_twsca_analysis = _post2()
+    out_dir = os.path.join(ctx['workdir'], "e2e")
+    data_frames = {ticker: df.copy() for ticker, df in ctx['panel'].items()}
+    def run():
+        with quiet():
+            run_twsca_analysis.perform_twsca_analysis(
+                data_frames, ctx['main'], ctx['comparisons'], window=ctx['window'],
+                output_dir=out_dir, dtw_mode='incremental')
+    return run, _n_windows(ctx), "windows"
+
+
+@benchmark("post1.run_twsca")
+def bench_run_twsca(ctx):
+    with quiet():
+        from twsca_extensions import twsca_analysis
+    main = ctx['panel'][ctx['main']]['Close']
+    comparisons = [ctx['panel'][ticker]['Close'] for ticker in ctx['comparisons']]
+    def run():
+        with quiet():
+            for comp in comparisons:
+                twsca_analysis.run_twsca(main, comp, max_warp=5)
+    return run, len(comparisons), "pairs"
+
+
+@benchmark("post1.rolling_correlation")
+def bench_rolling_correlation(ctx):
+    with quiet():
+        from twsca_extensions import twsca_analysis
+    main = ctx['panel'][ctx['main']]['Close']
+    comparisons = [ctx['panel'][ticker]['Close'] for ticker in ctx['comparisons']]
+    def run():
+        for comp in comparisons:
+            twsca_analysis.rolling_correlation(main, comp, window_days=ctx['window'])
+    return run, len(comparisons) * ctx['days'], "samples"
+
+
+def _weekly(ctx):
+    if 'weekly' not in ctx:
+        ctx['weekly'] = synthetic_data.weekly_returns_table(ctx['panel'], ctx['main'])
+    return ctx['weekly']
+
+
+def _weekly_window(ctx):
+    # The dashboard's slider runs from 2 to 12 weeks
+    return min(max(ctx['window'] // 5, 2), 12)
+
+
+@benchmark("streamlit.rolling_correlations")
+def bench_streamlit_rolling(ctx):
+    from twsca_tools import influence
+    weekly = _weekly(ctx)
+    window = _weekly_window(ctx)
+    df_returns = weekly[[col for col in weekly.columns if col == 'date' or col.endswith('_Return')]]
+    def run():
+        influence.rolling_correlations(df_returns, window, main_col=f"{ctx['main']}_Return")
+    n_windows = max(0, len(weekly) - window + 1)
+    return run, n_windows * len(ctx['comparisons']), "correlations"
+
+
+def _weekly_corr(ctx):
+    if 'weekly_corr' not in ctx:
+        from twsca_tools import influence
+        weekly = _weekly(ctx)
+        df_returns = weekly[[col for col in weekly.columns if col == 'date' or col.endswith('_Return')]]
+        ctx['weekly_corr'] = influence.rolling_correlations(
+            df_returns, _weekly_window(ctx), main_col=f"{ctx['main']}_Return")
+    return ctx['weekly_corr']
+
+
+@benchmark("streamlit.baton")
+def bench_streamlit_baton(ctx):
+    from twsca_tools import influence
+    rolling_corr_df = _weekly_corr(ctx)
+    return lambda: influence.baton_handoff(rolling_corr_df), len(rolling_corr_df), "windows"
+
+
+@benchmark("streamlit.entropy")
+def bench_streamlit_entropy(ctx):
+    from twsca_tools import influence
+    rolling_corr_df = _weekly_corr(ctx)
+    return lambda: influence.correlation_entropy(rolling_corr_df), len(rolling_corr_df), "windows"
+
+
+def measure(fn, repeat):
+    """
+    Time a callable and record its peak traced memory.
+
+    Returns:
+        Dict with per-run seconds, their median and minimum, and the
+        tracemalloc peak (in MB) of one additional run
+    """
+    fn()  # warm-up: imports, caches, page faults
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'median_s': float(np.median(seconds)),
+        'min_s': float(np.min(seconds)),
+        'peak_mb': peak / 2**20,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(stages, tickers, days, window, repeat, seed):
+    """
+    Run the selected stages on one synthetic panel.
+
+    Returns:
+        Result dict (see the module docstring for the JSON layout)
+    """
+    panel = synthetic_data.gbm_panel(tickers, days, seed=seed)
+    names = list(panel)
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'config': {'tickers': tickers, 'days': days, 'window': window,
+                       'repeat': repeat, 'seed': seed},
+        },
+        'results': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="twsca_bench_") as workdir:
+        ctx = {
+            'panel': panel,
+            'main': names[0],
+            'comparisons': names[1:],
+            'tickers': names,
+            'n_tickers': len(names),
+            'days': days,
+            'window': window,
+            'workdir': workdir,
+            'csv_dir': synthetic_data.write_history_csvs(panel, os.path.join(workdir, "data")),
+        }
+        for name in stages:
+            print(f"{name:32s}", end="", flush=True)
+            try:
+                fn, items, unit = BENCHMARKS[name](ctx)
+                result = measure(fn, repeat)
+            except Exception as e:
+                report['results'][name] = {'error': f"{type(e).__name__}: {e}"}
+                print(f"  error: {type(e).__name__}: {e}")
+                continue
+            result.update({
+                'items': items,
+                'unit': unit,
+                'throughput': items / result['median_s'] if result['median_s'] > 0 else None,
+            })
+            report['results'][name] = result
+            print(f"{result['median_s'] * 1e3:10.1f} ms  {result['peak_mb']:8.1f} MB  "
+                  f"{result['throughput']:12.0f} {unit}/s")
+    return report
+
+
+def compare_reports(baseline_path, candidate_path, max_slowdown=None):
+    """
+    Print a stage-by-stage comparison of two result files.
+
+    Stages are compared on their best (minimum) time, which is the least
+    sensitive to background noise.
+
+    Returns:
+        Number of stages slower than max_slowdown (0 if not given)
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    sizes = [{key: value for key, value in report['meta']['config'].items() if key != 'repeat'}
+             for report in (baseline, candidate)]
+    if sizes[0] != sizes[1]:
+        print("Warning: the two runs used different panel sizes")
+        print(f"  {baseline_path}: {sizes[0]}")
+        print(f"  {candidate_path}: {sizes[1]}")
+
+    regressions = 0
+    skipped = []
+    print(f"{'stage':32s}{'baseline ms':>14s}{'candidate ms':>14s}{'ratio':>8s}{'peak MB':>18s}")
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        old = baseline['results'].get(name, {})
+        new = candidate['results'].get(name, {})
+        if 'min_s' not in old or 'min_s' not in new:
+            skipped.append(name)
+            continue
+        ratio = new['min_s'] / old['min_s'] if old['min_s'] > 0 else float('inf')
+        flag = ""
+        if max_slowdown is not None and ratio > max_slowdown:
+            flag = "  SLOWER"
+            regressions += 1
+        print(f"{name:32s}{old['min_s'] * 1e3:14.1f}{new['min_s'] * 1e3:14.1f}"
+              f"{ratio:8.2f}{old['peak_mb']:9.1f} ->{new['peak_mb']:6.1f}{flag}")
+    if skipped:
+        print(f"Not in both runs (or failed): {', '.join(skipped)}")
+    return regressions
+
+
+def main():
+    """Run or compare benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the TWSCA hot paths on synthetic data")
+    parser.add_argument("--tickers", type=int, default=7,
+                        help="Tickers in the synthetic panel, including the main ticker")
+    parser.add_argument("--days", type=int, default=500,
+                        help="Business days in the synthetic panel")
+    parser.add_argument("--window", type=int, default=30,
+                        help="Rolling window size (in trading days)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per stage (after one warm-up run)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed of the synthetic panel")
+    parser.add_argument("--stages", type=str, default=None,
+                        help="Comma-separated stages or prefixes, e.g. 'post2.dtw,streamlit' "
+                             "(default: all)")
+    parser.add_argument("--list", action="store_true",
+                        help="List the available stages and exit")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--max-slowdown", type=float, default=None,
+                        help="With --compare, exit with status 1 if a stage's best time "
+                             "grew by more than this factor")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    if args.compare:
+        regressions = compare_reports(*args.compare, max_slowdown=args.max_slowdown)
+        return 1 if regressions else 0
+
+    stages = list(BENCHMARKS)
+    if args.stages:
+        prefixes = [prefix.strip() for prefix in args.stages.split(",")]
+        stages = [name for name in stages if any(name.startswith(p) for p in prefixes)]
+        if not stages:
+            print(f"No stages match {args.stages}; see --list")
+            return 1
+
+    report = run_benchmarks(stages, args.tickers, args.days, args.window, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
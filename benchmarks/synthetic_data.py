@@ -0,0 +1,94 @@
+"""
+synthetic_data.py
+Reproducible synthetic price panels for the benchmark suite.
+
+Prices follow a geometric Brownian motion with a shared market factor, so
+tickers are correlated to a controllable degree and the correlation and
+DTW stages see realistic, non-degenerate inputs. Nothing is downloaded: the
+panels are written in the same CSV layouts the download scripts produce,
+so the analysis code under test reads them exactly as it reads real data.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def ticker_names(n_tickers, main_ticker="GME"):
+    """Main ticker followed by synthetic comparison tickers (T001, T002, ...)."""
+    return [main_ticker] + [f"T{i:03d}" for i in range(1, n_tickers)]
+
+
+def gbm_panel(n_tickers, n_days, seed=0, main_ticker="GME", start="2020-01-01",
+              market_weight=0.6, annual_vol=0.6):
+    """
+    Daily OHLCV bars for a set of correlated tickers.
+
+    Args:
+        n_tickers: Number of tickers, including the main ticker
+        n_days: Number of business days
+        seed: Random seed (same seed, same panel)
+        main_ticker: Name of the first ticker
+        start: First business day
+        market_weight: Loading of every ticker on the shared market factor
+        annual_vol: Annualized volatility of the daily log returns
+
+    Returns:
+        Dict of ticker -> DataFrame with Open, High, Low, Close, Volume,
+        Dividends and Stock Splits, indexed by America/New_York timestamps
+        like yfinance's Ticker.history()
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days, tz="America/New_York", name="Date")
+    daily_vol = annual_vol / np.sqrt(252)
+
+    market = rng.standard_normal(n_days)
+    idiosyncratic = rng.standard_normal((n_tickers, n_days))
+    shocks = market_weight * market + np.sqrt(1 - market_weight ** 2) * idiosyncratic
+    log_returns = -0.5 * daily_vol ** 2 + daily_vol * shocks
+    start_prices = rng.uniform(5, 100, n_tickers)
+    closes = start_prices[:, None] * np.exp(np.cumsum(log_returns, axis=1))
+
+    panel = {}
+    for i, ticker in enumerate(ticker_names(n_tickers, main_ticker)):
+        close = closes[i]
+        opens = np.concatenate([[start_prices[i]], close[:-1]])
+        spread = np.abs(rng.normal(0, daily_vol / 2, n_days)) * close
+        panel[ticker] = pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, close) + spread,
+            'Low': np.minimum(opens, close) - spread,
+            'Close': close,
+            'Volume': rng.lognormal(14, 0.5, n_days).astype(np.int64),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=dates)
+    return panel
+
+
+def write_history_csvs(panel, data_dir):
+    """Write a panel as post-2 style <TICKER>.csv files (Ticker.history() layout)."""
+    os.makedirs(data_dir, exist_ok=True)
+    for ticker, df in panel.items():
+        df.to_csv(os.path.join(data_dir, f"{ticker}.csv"))
+    return data_dir
+
+
+def weekly_returns_table(panel, main_ticker="GME"):
+    """
+    Weekly table in the layout of the Streamlit dashboard's combined CSV.
+
+    Returns:
+        DataFrame with a 'date' column and '<TICKER>_Close', '<TICKER>_Return'
+        and '<TICKER>_Volume' columns, one row per week
+    """
+    columns = {}
+    for ticker, df in panel.items():
+        daily = df.tz_localize(None)
+        weekly_close = daily['Close'].resample('W-FRI').last()
+        columns[f"{ticker}_Close"] = weekly_close
+        columns[f"{ticker}_Return"] = weekly_close.pct_change()
+        columns[f"{ticker}_Volume"] = daily['Volume'].resample('W-FRI').sum()
+    table = pd.DataFrame(columns).iloc[1:]
+    return table.rename_axis('date').reset_index()
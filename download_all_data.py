@@ -1,78 +1,142 @@
+import argparse
+import glob
 import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def run_script(script_path):
-    """Run a Python script and forward its output to the console."""
-    print(f"\n=== Running {script_path} ===")
+# Get the base directory
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Download jobs: (name, script, extra arguments, jobs it must run after,
+# output CSVs, header rows per CSV). The Streamlit job resamples the Post 1
+# daily store, so it runs after the Post 1 job; the others are independent.
+# Jobs must come after the jobs they depend on.
+JOBS = [
+    ("post1", os.path.join(base_dir, "posts", "post_01_timewarp", "download_data.py"), [], [],
+     os.path.join(base_dir, "posts", "post_01_timewarp", "data", "*.csv"), 3),
+    ("post2", os.path.join(base_dir, "posts", "post_2_batons_and_traps", "download_data.py"),
+     ["--output-dir", os.path.join(base_dir, "posts", "post_2_batons_and_traps", "data")], [],
+     os.path.join(base_dir, "posts", "post_2_batons_and_traps", "data", "*.csv"), 1),
+    ("streamlit", os.path.join(base_dir, "extras", "download_data.py"), [], ["post1"],
+     os.path.join(base_dir, "extras", "data_streamlit", "combined_weekly_*.csv"), 1),
+]
+
+print_lock = threading.Lock()
+
+
+def log(prefix, line):
+    """Print one line of a job's output, prefixed with the job name."""
+    with print_lock:
+        print(f"[{prefix}] {line}", flush=True)
+
+
+def count_rows(pattern, header_rows):
+    """Number of CSV files matching a pattern and their data rows."""
+    paths = glob.glob(pattern)
+    rows = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            rows += max(0, sum(1 for _ in f) - header_rows)
+    return len(paths), rows
+
+
+def run_script(name, script_path, args):
+    """
+    Run a Python script, streaming its output live with a [name] prefix.
+
+    Returns:
+        True if the script exited with status 0
+    """
+    log(name, f"=== Running {os.path.relpath(script_path, base_dir)} {' '.join(args)}".rstrip())
+    # Unbuffered so lines arrive as they are printed, not when the pipe fills
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
     try:
-        # Use sys.executable to ensure the script runs with the same Python interpreter
-        result = subprocess.run(
-            [sys.executable, script_path],
-            check=True,
+        process = subprocess.Popen(
+            # Use sys.executable to ensure the script runs with the same Python interpreter
+            [sys.executable, script_path, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            capture_output=True
+            bufsize=1,
+            env=env,
         )
-        # Print the output
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print(f"Errors/Warnings:\n{result.stderr}")
-        print(f"=== Completed {script_path} ===\n")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error running {script_path}:")
-        if e.stdout:
-            print(e.stdout)
-        if e.stderr:
-            print(f"Errors:\n{e.stderr}")
+    except OSError as e:
+        log(name, f"Error starting {script_path}: {e}")
         return False
+    for line in process.stdout:
+        log(name, line.rstrip('\n'))
+    return process.wait() == 0
+
 
 def main():
     """Run all data download scripts."""
-    # Get the base directory
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Define paths to individual download scripts
-    post1_script = os.path.join(base_dir, "posts", "post_01_timewarp", "download_data.py")
-    streamlit_script = os.path.join(base_dir, "extras", "download_data.py")
-    
-    scripts = [
-        ("Post 1 daily data", post1_script),
-        ("Streamlit weekly data", streamlit_script)
-    ]
-    
+    parser = argparse.ArgumentParser(
+        description="Run the data download scripts of every post concurrently",
+        epilog="Other arguments (e.g. --provider local --source DIR, --workers 16, --full) "
+               "are passed on to every download script.")
+    parser.add_argument("--jobs", type=int, default=len(JOBS),
+                        help=f"Download scripts to run at once (default: {len(JOBS)})")
+    parser.add_argument("--only", type=str, default=None,
+                        help="Comma-separated job names to run (%s)" % ", ".join(job[0] for job in JOBS))
+    args, script_args = parser.parse_known_args()
+
+    jobs = JOBS
+    if args.only:
+        selected = {name.strip() for name in args.only.split(",")}
+        unknown = selected - {job[0] for job in JOBS}
+        if unknown:
+            parser.error(f"unknown jobs: {', '.join(sorted(unknown))}")
+        jobs = [job for job in JOBS if job[0] in selected]
+
     print("=== TWSCA Data Download Utility ===")
-    print("This script will run the individual data download scripts for each component of the repository.")
-    
+    print(f"Running {len(jobs)} download jobs, {args.jobs} at a time.")
+
     # Check if scripts exist
-    for name, path in scripts:
+    for name, path, *_ in jobs:
         if not os.path.exists(path):
             print(f"Warning: {name} script not found at {path}")
-    
-    # Run each script
-    results = []
-    for name, path in scripts:
-        if os.path.exists(path):
-            print(f"\nDownloading {name}...")
-            success = run_script(path)
-            results.append((name, success))
-        else:
-            results.append((name, False))
-    
+
+    results = {}
+    futures = {}
+
+    def run_job(name, path, extra_args, after, outputs, header_rows):
+        # Dependencies were submitted earlier, so waiting here cannot deadlock the pool
+        for dependency in after:
+            if dependency in futures:
+                futures[dependency].result()
+        start = time.perf_counter()
+        success = os.path.exists(path) and run_script(name, path, [*extra_args, *script_args])
+        elapsed = time.perf_counter() - start
+        n_files, n_rows = count_rows(outputs, header_rows)
+        results[name] = (success, elapsed, n_files, n_rows)
+        log(name, f"=== {'Completed' if success else 'Failed'} in {elapsed:.1f} s")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for job in jobs:
+            futures[job[0]] = pool.submit(run_job, *job)
+    total = time.perf_counter() - start
+
     # Print summary
     print("\n=== Download Summary ===")
     all_success = True
-    for name, success in results:
+    for name, *_ in jobs:
+        success, elapsed, n_files, n_rows = results[name]
         status = "✅ Completed" if success else "❌ Failed"
-        print(f"{status}: {name}")
+        print(f"{status}: {name:<10} {elapsed:7.1f} s  {n_files:4d} files  {n_rows:9d} rows")
         if not success:
             all_success = False
-    
+    print(f"Total wall time: {total:.1f} s")
+
     if all_success:
         print("\n✅ All data downloads completed successfully.")
     else:
         print("\n⚠️ Some data downloads failed. Check the logs above for details.")
+    return 0 if all_success else 1
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
@@ -1,6 +1,13 @@
-import yfinance as yf
-import pandas as pd
+import argparse
 import os
+import sys
+
+# Make the shared twsca_tools package importable when run as a script
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from twsca_tools import data_store, fetcher
 
 # === SETTINGS FOR STREAMLIT APP DATA ===
 # Tickers for weekly download (Streamlit app)
@@ -14,80 +21,71 @@ end_date = "2025-01-01"  # Use start of next year to include full 2024
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # Output directory relative to this script
 data_dir = os.path.join(script_dir, "data_streamlit")
+# Daily bars are shared with Post 1; weekly bars are derived from them
+daily_dir = os.path.join(project_root, "posts", "post_01_timewarp", "data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the weekly data of the Streamlit app from daily bars")
+    parser.add_argument("--tickers", type=str, default=",".join(weekly_tickers),
+                        help="Comma-separated tickers or @file with one ticker per line")
+    parser.add_argument("--start-date", type=str, default=start_date)
+    parser.add_argument("--end-date", type=str, default=end_date)
+    parser.add_argument("--output-dir", type=str, default=data_dir)
+    parser.add_argument("--daily-dir", type=str, default=daily_dir,
+                        help="Daily data store to refresh and resample (default: Post 1 data)")
+    parser.add_argument("--full", action="store_true",
+                        help="Download the whole range again instead of only missing dates")
+    fetcher.add_fetch_arguments(parser)
+    args = parser.parse_args()
+
+    tickers = fetcher.parse_tickers(args.tickers)
+    print(f"Ensuring data directory exists: {args.output_dir}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # === Process Weekly Data for Streamlit App ===
+    print("\n--- Processing Weekly Data for Streamlit App ---")
+    print(f"Updating daily data for {len(tickers)} tickers ({args.start_date} to {args.end_date}) "
+          f"in {args.daily_dir}")
+    store = data_store.DataStore(args.daily_dir, layout="download")
+    fetched, errors = data_store.refresh(
+        store, fetcher.provider_from_args(args), tickers, args.start_date, args.end_date,
+        interval="1d", max_workers=args.workers, retries=args.retries, full=args.full,
+        on_rebase=lambda ticker, reason: print(
+            f"  -> {ticker} prices were re-adjusted ({reason}); downloading its full history"))
+    for ticker in tickers:
+        if ticker in errors:
+            print(f"  -> ERROR downloading daily data for {ticker}: {errors[ticker]}")
+
+    # Weekly bars of all tickers in one groupby, widened to <TICKER>_Close/_Volume/_Return
+    daily = {ticker: store.bars(ticker, "1d", args.start_date, args.end_date) for ticker in tickers}
+    weekly = data_store.weekly_bars(daily)
+    for ticker in tickers:
+        if ticker not in weekly.index.get_level_values('ticker'):
+            print(f"  -> No weekly data for {ticker}.")
+
+    if not weekly.empty:
+        weekly_combined = weekly.unstack('ticker')
+        weekly_combined.columns = [f"{ticker}_{field}" for field, ticker in weekly_combined.columns]
+
+        # Order columns for Streamlit app compatibility, date first
+        final_columns = [f"{ticker}{suffix}" for ticker in tickers
+                         for suffix in ['_Close', '_Volume', '_Return']
+                         if f"{ticker}{suffix}" in weekly_combined.columns]
+        weekly_combined = weekly_combined[final_columns]
+        weekly_combined.index.name = 'date'
+        weekly_combined = weekly_combined.reset_index()
+
+        # Save the combined weekly file
+        output_file = os.path.join(args.output_dir, "combined_weekly_2024_2025.csv")
+        print(f"\nSaving combined weekly data ({len(weekly_combined)} weeks) -> {output_file}")
+        weekly_combined.to_csv(output_file, index=False)
+    else:
+        print("\nNo weekly data was processed. Cannot save combined weekly file.")
+
+    print(f"\n✅ Streamlit app data download complete. Files saved to: {args.output_dir}")
+    return 0 if not errors else 1
+
 
-print(f"Ensuring data directory exists: {data_dir}")
-os.makedirs(data_dir, exist_ok=True)
-
-# === Process Weekly Data for Streamlit App ===
-print("\n--- Processing Weekly Data for Streamlit App ---")
-weekly_combined = pd.DataFrame()
-
-for ticker in weekly_tickers:
-    print(f"Processing weekly data for {ticker} ({start_date} to {end_date})...")
-    try:
-        # Download weekly data
-        df_weekly = yf.download(ticker, start=start_date, end=end_date, interval="1wk")
-        
-        if df_weekly.empty:
-            print(f"  -> No weekly data returned for {ticker}.")
-            continue
-
-        # Select and rename columns
-        df_processed = pd.DataFrame(index=df_weekly.index)
-        if 'Close' in df_weekly.columns:
-            df_processed[f"{ticker}_Close"] = df_weekly['Close']
-            df_processed[f"{ticker}_Return"] = df_processed[f"{ticker}_Close"].pct_change()
-        else:
-            print(f"  -> Warning: 'Close' column missing for {ticker}. Cannot calculate return.")
-            df_processed[f"{ticker}_Close"] = pd.NA
-            df_processed[f"{ticker}_Return"] = pd.NA
-            
-        if 'Volume' in df_weekly.columns:
-            df_processed[f"{ticker}_Volume"] = df_weekly['Volume']
-        else:
-             df_processed[f"{ticker}_Volume"] = pd.NA
-
-        # Keep only relevant columns
-        df_processed = df_processed[[col for col in [f"{ticker}_Close", f"{ticker}_Volume", f"{ticker}_Return"] if col in df_processed.columns]]
-
-        # Merge into the combined dataframe
-        if weekly_combined.empty:
-            weekly_combined = df_processed
-            weekly_combined.index.name = 'date'  # Set index name for clarity
-        else:
-            weekly_combined = weekly_combined.merge(df_processed, left_index=True, right_index=True, how="outer")
-            
-    except Exception as e:
-        print(f"  -> ERROR processing weekly data for {ticker}: {e}")
-
-# Reset index to make 'date' a column
-if not weekly_combined.empty:
-    weekly_combined = weekly_combined.reset_index()
-    # Ensure date column is called 'date'
-    if 'index' in weekly_combined.columns:
-        weekly_combined = weekly_combined.rename(columns={'index': 'date'})
-        
-    # Reorder columns for Streamlit app compatibility, ensuring date is first
-    final_columns = ['date']
-    # Define expected tickers for final ordering
-    ordered_tickers = ["GME", "XRT", "SPY", "AMC", "KOSS", "BB", "NOK"]
-    for ticker in ordered_tickers:
-        for suffix in ['_Close', '_Volume', '_Return']:
-            col_name = f"{ticker}{suffix}"
-            if col_name in weekly_combined.columns:
-                final_columns.append(col_name)
-    
-    # Add any remaining columns not in the preferred order (shouldn't happen ideally)
-    remaining_cols = [col for col in weekly_combined.columns if col not in final_columns]
-    final_columns.extend(remaining_cols)
-
-    weekly_combined = weekly_combined[final_columns]
-    
-    # Save the combined weekly file
-    output_file = os.path.join(data_dir, "combined_weekly_2024_2025.csv")
-    print(f"\nSaving combined weekly data -> {output_file}")
-    weekly_combined.to_csv(output_file, index=False)
-else:
-    print("\nNo weekly data was processed. Cannot save combined weekly file.")
-
-print(f"\n✅ Streamlit app data download complete. Files saved to: {data_dir}") 
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
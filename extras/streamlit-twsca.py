@@ -75,18 +75,17 @@ import streamlit as st
 st.set_page_config(page_title="TWSCA GME Analysis", layout="wide")
 
 import pandas as pd
-import numpy as np
-from scipy.stats import entropy
 from scipy.signal import savgol_filter
 import plotly.express as px
 import os
-# Import functions from the src directory
 import sys
-# Get the project root directory (assuming extras is one level down)
-# project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# src_path = os.path.join(project_root, 'src')
-# if src_path not in sys.path:
-#     sys.path.append(src_path)
+# Make the shared twsca_tools package importable (extras is one level down)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from twsca_tools import influence_cube
+from twsca_tools.influence import rolling_correlations, baton_handoff, correlation_entropy
 
 # Import from the installed twsca package
 try:
@@ -133,13 +132,19 @@ def smooth_ema(series, span=5):
 def smooth_savgol(series, window=7, order=2):
     return savgol_filter(series, window_length=window, polyorder=order)
 
+# Cache bounds for the computation layer: entries are kept per (data
+# fingerprint, window), shared between sessions, and expire after CACHE_TTL
+# seconds so a refreshed data file does not pin old results in memory.
+CACHE_MAX_ENTRIES = 32
+CACHE_TTL = 3600
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "data_streamlit", "combined_weekly_2024_2025.csv")
+
 # Load data
 @st.cache_data
 def load_data():
-    # Update path to the data directory inside extras/
-    # Go up one level from this script's dir to get to extras/
-    extras_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(extras_dir, "data_streamlit", "combined_weekly_2024_2025.csv")
+    data_path = DATA_PATH
     if not os.path.exists(data_path):
         st.error(f"""
         Data file not found: {data_path}
@@ -151,12 +156,12 @@ def load_data():
         
         This will download the required data files from Yahoo Finance.
         """)
-        return None
+        return None, None
     
     try:
-        df = pd.read_csv(data_path)
-        df["date"] = pd.to_datetime(df["date"])
-        return df
+        # Read as influence_cube does, so fingerprints of the same file match
+        df = influence_cube.read_dashboard_table(data_path)
+        return df, influence_cube.data_fingerprint(df)
     except Exception as e:
         st.error(f"""
         Error loading data from {data_path}: {str(e)}
@@ -166,25 +171,50 @@ def load_data():
         python download_all_data.py
         ```
         """)
-        return None
+        return None, None
+
+# Cached stages below take the frames as underscore arguments, which
+# st.cache_data does not hash; the fingerprint (and window) identify them.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_smoothing(fingerprint, _df):
+    smoothed = {}
+    for col in _df.columns:
+        if col == "date":
+            continue
+        series = _df[col].values
+        if len(series) >= 7:
+            smoothed[col] = smooth_savgol(series)
+        else:
+            smoothed[col] = series  # fallback to raw
+    return smoothed
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_rolling_correlations(fingerprint, window, _df_returns):
+    return rolling_correlations(_df_returns, window, main_col="GME_Return")
 
-df_multi = load_data()
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_baton_handoff(fingerprint, window, _rolling_corr_df):
+    return baton_handoff(_rolling_corr_df)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_correlation_entropy(fingerprint, window, _rolling_corr_df):
+    return correlation_entropy(_rolling_corr_df)
+
+# Precomputed results for every slider position, if built from this data
+# (python -m twsca_tools.influence_cube build <DATA_PATH>). The memory map is
+# opened once per process and shared by all sessions.
+@st.cache_resource(show_spinner=False)
+def load_influence_cube(fingerprint):
+    return influence_cube.open_if_fresh(influence_cube.default_path(DATA_PATH), fingerprint)
+
+df_multi, df_fingerprint = load_data()
 
 if df_multi is None:
     st.error("Data loading failed. Please check the instructions above.")
     st.stop()
 
-# Get stock columns and apply smoothing
-stock_cols = [col for col in df_multi.columns if col != "date"]
-smoothed = {}
-
 # Apply smoothing to each stock column (using SavGol filter by default)
-for col in stock_cols:
-    series = df_multi[col].values
-    if len(series) >= 7:
-        smoothed[col] = smooth_savgol(series)
-    else:
-        smoothed[col] = series  # fallback to raw
+smoothed = cached_smoothing(df_fingerprint, df_multi)
 
 # Sidebar controls
 st.sidebar.header("Analysis Parameters")
@@ -228,89 +258,29 @@ if "GME_Return" not in df_returns.columns:
     st.error("GME_Return column not found. Cannot perform TWSCA analysis.")
     st.stop()
 
-other_return_cols = [col for col in df_returns.columns if col != "date" and col != "GME_Return"]
-dates = df_returns["date"]
-
-correlations = []
-for i in range(len(df_returns) - window + 1):
-    window_df_returns = df_returns.iloc[i:i+window].drop(columns=["date"])
-    date = dates.iloc[i + window - 1]
-
-    # Ensure GME_Return exists in the window
-    if 'GME_Return' not in window_df_returns.columns:
-        continue
-
-    corr_row = {}
-    gme_return_window = window_df_returns["GME_Return"].dropna()
-
-    for ticker_col in other_return_cols:
-        if ticker_col in window_df_returns.columns:
-            other_return_window = window_df_returns[ticker_col].dropna()
-            # Ensure enough overlapping data points for correlation
-            common_index = gme_return_window.index.intersection(other_return_window.index)
-            if len(common_index) >= 2: # Need at least 2 points for correlation
-                corr = np.corrcoef(gme_return_window[common_index], other_return_window[common_index])[0, 1]
-                # Use ticker name (without _Return) as key
-                corr_row[ticker_col.replace('_Return', '')] = corr
-            else:
-                corr_row[ticker_col.replace('_Return', '')] = np.nan # Not enough data
-        else:
-            corr_row[ticker_col.replace('_Return', '')] = np.nan # Column not present in window (shouldn't happen with iloc)
-
-    corr_row["Week Ending"] = date
-    if len(corr_row) > 1: # Only add if correlations were calculated
-        correlations.append(corr_row)
-
-rolling_corr_df = pd.DataFrame(correlations)
-if not rolling_corr_df.empty:
-    rolling_corr_df = rolling_corr_df.set_index("Week Ending")
+cube = load_influence_cube(df_fingerprint)
+if cube is not None and window in cube:
+    rolling_corr_df = cube.rolling_correlations(window)
 else:
+    rolling_corr_df = cached_rolling_correlations(df_fingerprint, window, df_returns)
+if rolling_corr_df.empty:
     st.warning("Could not calculate rolling correlations. Check data and window size.")
-    rolling_corr_df = pd.DataFrame() # Ensure it's a DataFrame
 
 # Baton Handoff Analysis
-baton_df = pd.DataFrame()
-if not rolling_corr_df.empty and len(rolling_corr_df.columns) > 0:
-    baton_df["Week Ending"] = rolling_corr_df.index
-    abs_corr_df = rolling_corr_df.abs()
-    top_influencers = []
-    actual_correlations = []
-
-    for idx, row in abs_corr_df.iterrows():
-        # Drop NaN before finding max
-        valid_row = row.dropna()
-        if not valid_row.empty:
-            max_corr_ticker = valid_row.idxmax()
-            top_influencers.append(max_corr_ticker)
-            actual_corr = rolling_corr_df.loc[idx, max_corr_ticker]
-            actual_correlations.append(actual_corr)
-        else:
-            top_influencers.append("N/A")
-            actual_correlations.append(np.nan)
-
-    baton_df["Top Influencer"] = top_influencers
-    baton_df["Correlation"] = actual_correlations
-    baton_df = baton_df.set_index("Week Ending")
+if rolling_corr_df.empty or len(rolling_corr_df.columns) == 0:
+    st.warning("Rolling correlation data is empty, skipping Baton Handoff.")
+if cube is not None and window in cube:
+    baton_df = cube.baton_handoff(window)
 else:
-     st.warning("Rolling correlation data is empty, skipping Baton Handoff.")
-     baton_df = pd.DataFrame(columns=["Top Influencer", "Correlation"])
+    baton_df = cached_baton_handoff(df_fingerprint, window, rolling_corr_df)
 
 # Entropy Calculation
-entropy_df = pd.DataFrame(index=rolling_corr_df.index)
-if not rolling_corr_df.empty and len(rolling_corr_df.columns) > 0:
-    abs_corr = rolling_corr_df.abs().fillna(0) # Fill NaNs with 0 for entropy calculation
-    valid_rows = abs_corr.sum(axis=1) > 1e-9 # Check for rows with non-negligible correlations
-    abs_corr_valid = abs_corr[valid_rows]
-
-    if not abs_corr_valid.empty:
-        norm_corr = abs_corr_valid.div(abs_corr_valid.sum(axis=1), axis=0).fillna(0)
-        # Ensure probabilities sum to 1 (or very close)
-        norm_corr = norm_corr.apply(lambda row: row / row.sum() if row.sum() > 1e-9 else row, axis=1)
-        entropy_series = norm_corr.apply(lambda row: entropy(row[row > 1e-9].values, base=2), axis=1) # Use only non-zero probabilities
-        entropy_df["Entropy"] = entropy_series
-else:
+if rolling_corr_df.empty or len(rolling_corr_df.columns) == 0:
     st.warning("Rolling correlation data is empty, skipping Entropy calculation.")
-    entropy_df = pd.DataFrame(columns=["Entropy"])
+if cube is not None and window in cube:
+    entropy_df = cube.correlation_entropy(window)
+else:
+    entropy_df = cached_correlation_entropy(df_fingerprint, window, rolling_corr_df)
 
 
 # --- Visualizations --- Use imported functions
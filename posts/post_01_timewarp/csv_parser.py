@@ -27,4 +27,18 @@ def load_stock_data(file_path):
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def load_stock_data_from_matrix(matrix, ticker):
+    """Build the load_stock_data layout from a twsca_tools.price_matrix.PriceMatrix."""
+    prices = matrix.frame(ticker)
+    df = pd.DataFrame({
+        'Price': np.nan,
+        'Close': prices['Close'],
+        'High': prices['High'],
+        'Low': prices['Low'],
+        'Open': prices['Open'],
+        'Volume': prices['Volume']
+    }, index=prices.index)
+    df['Adj Close'] = df['Close']
+    return df
@@ -1,6 +1,13 @@
-import yfinance as yf
-import pandas as pd
+import argparse
 import os
+import sys
+
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import data_store, fetcher
 
 # === SETTINGS FOR POST 1 DATA ===
 # Tickers for daily download (Post 1)
@@ -8,29 +15,55 @@ daily_tickers = ["GME", "CHWY", "SPY", "AMC", "KOSS", "BB", "NOK"]
 
 # Date ranges
 start_date = "2020-01-01"
-end_date = "2024-12-31"  # Inclusive end date for yfinance
+end_date = "2024-12-31"  # Exclusive end date for yfinance
 
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # Output directory relative to this script
 data_dir = os.path.join(script_dir, "data")
 
-print(f"Ensuring data directory exists: {data_dir}")
-os.makedirs(data_dir, exist_ok=True)
-
-# === Download Daily Data for Post 1 ===
-print("\n--- Downloading Daily Data for Post 1 Analysis ---")
-for ticker in daily_tickers:
-    output_file = os.path.join(data_dir, f"{ticker}.csv")
-    print(f"Downloading daily data for {ticker} ({start_date} to {end_date}) -> {output_file}")
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, interval="1d")
-        if not df.empty:
-            df.to_csv(output_file)
-            print(f"  -> Saved {ticker}.csv")
-        else:
-            print(f"  -> No data returned for {ticker}.")
-    except Exception as e:
-        print(f"  -> ERROR downloading {ticker}: {e}")
-
-print(f"\n✅ Post 1 data download complete. Files saved to: {data_dir}") 
\ No newline at end of file
+
+def main():
+    parser = argparse.ArgumentParser(description="Download daily data for the Post 1 analysis")
+    parser.add_argument("--tickers", type=str, default=",".join(daily_tickers),
+                        help="Comma-separated tickers or @file with one ticker per line")
+    parser.add_argument("--start-date", type=str, default=start_date)
+    parser.add_argument("--end-date", type=str, default=end_date)
+    parser.add_argument("--output-dir", type=str, default=data_dir)
+    parser.add_argument("--full", action="store_true",
+                        help="Download the whole range again instead of only missing dates")
+    fetcher.add_fetch_arguments(parser)
+    args = parser.parse_args()
+
+    tickers = fetcher.parse_tickers(args.tickers)
+    print(f"Ensuring data directory exists: {args.output_dir}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # === Download Daily Data for Post 1 ===
+    print("\n--- Downloading Daily Data for Post 1 Analysis ---")
+    print(f"Downloading daily data for {len(tickers)} tickers ({args.start_date} to {args.end_date}) "
+          f"with {args.workers} workers")
+
+    def report(ticker, n_fetched, n_rows):
+        print(f"  -> Updated {ticker}.csv (+{n_fetched} bars, {n_rows} rows)")
+
+    def rebase(ticker, reason):
+        print(f"  -> {ticker} prices were re-adjusted ({reason}); downloading its full history")
+
+    store = data_store.DataStore(args.output_dir, layout="download")
+    fetched, errors = data_store.refresh(
+        store, fetcher.provider_from_args(args), tickers, args.start_date, args.end_date,
+        interval="1d", max_workers=args.workers, retries=args.retries, full=args.full,
+        on_result=report, on_rebase=rebase)
+    for ticker in tickers:
+        if ticker in errors:
+            print(f"  -> ERROR downloading {ticker}: {errors[ticker]}")
+        elif not fetched[ticker]:
+            print(f"  -> {ticker}.csv is up to date.")
+
+    print(f"\n✅ Post 1 data download complete. Files saved to: {args.output_dir}")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,10 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(script_dir)
 
 # Import our custom extensions and CSV parser
-from csv_parser import load_stock_data
+from csv_parser import load_stock_data, load_stock_data_from_matrix
 from twsca_extensions import twsca_smoothing, twsca_plotting, twsca_analysis
+from twsca_tools import price_matrix
+from twsca_tools.result_cache import ResultCache, print_cache_info
 
 # Try to import from twsca package
 try:
@@ -40,12 +42,23 @@ def run_analysis():
     figures_dir = os.path.join(script_dir, 'figures')
     os.makedirs(figures_dir, exist_ok=True)
 
+    # Pair results are cached on disk; clear with
+    # `python -m twsca_tools.result_cache clear posts/post_01_timewarp/.twsca_cache`
+    twsca_cache = ResultCache(os.path.join(script_dir, '.twsca_cache'))
+
     # Define tickers required for analysis
     required_tickers = ['GME', 'CHWY', 'SPY', 'AMC', 'KOSS', 'BB', 'NOK'] 
     stock_data = {}
 
     print(f"\nAttempting to load data from: {os.path.abspath(data_dir)}")
+    # Prebuilt memory-mapped matrix, if it is up to date with the CSVs; build with
+    # `python -m twsca_tools.price_matrix build posts/post_01_timewarp/data`
+    matrix = price_matrix.open_if_fresh(data_dir, required_tickers)
     for ticker in required_tickers:
+        if matrix is not None and ticker in matrix:
+            stock_data[ticker] = load_stock_data_from_matrix(matrix, ticker)
+            print(f'- Loaded {ticker} from {matrix.path}')
+            continue
         file_path = os.path.join(data_dir, f'{ticker}.csv')
         if not os.path.exists(file_path):
             print(f"Missing file: {file_path}")
@@ -121,7 +134,8 @@ def run_analysis():
                 try:
                     alignment_cost, peak_corr = twsca_analysis.run_twsca(
                         target_series, comparison_series, 
-                        max_warp=twsca_max_warp, freq_band=twsca_freq_band
+                        max_warp=twsca_max_warp, freq_band=twsca_freq_band,
+                        cache=twsca_cache
                     )
                     twsca_results[ticker] = {'cost': alignment_cost, 'peak_corr': peak_corr}
                     print(f'  -> {ticker} alignment cost: {alignment_cost:.2f} (peak correlation {peak_corr:.2f})')
@@ -184,6 +198,7 @@ def run_analysis():
     print("\n--- Verification Logs ---")
     for ticker, results in twsca_results.items():
         print(f'LOG: {ticker} alignment cost: {results["cost"]:.2f} (peak correlation {results["peak_corr"]:.2f})')
+    print_cache_info(twsca_cache)
 
     print("\nAnalysis completed successfully. Check the figures directory for output visualizations.")
 
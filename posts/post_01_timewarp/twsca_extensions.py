@@ -1,14 +1,23 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import os
 import sys
 
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import dtw_kernels
+
 # Import from the updated TWSCA package
 try:
     # Import from the updated TWSCA 0.3.0 package
     from twsca import (
         llt_filter, smoothing, compute_twsca, compute_spectrum, 
-        spectral_correlation, dtw_distance
+        spectral_correlation, dtw_distance, align_series, normalize_series,
+        validate_time_series
     )
     print("Successfully imported from TWSCA 0.3.0 package.")
     use_built_in_llt = True
@@ -59,31 +68,36 @@ class Plotting:
         
     @staticmethod
     def plot_baton_map(rolling_correlations):
-        """Plot correlation heatmap visualization showing GME vs other stocks over time."""
+        """Plot correlation heatmap visualization showing GME vs other stocks over time.
+        
+        Parameters:
+        -----------
+        rolling_correlations : dict or pandas.DataFrame
+            Either a dict of ticker -> DataFrame with a 'Correlation' column,
+            or a preassembled wide frame (dates x tickers). Dict inputs are
+            placed on the union of their dates, NaN where a ticker has no
+            value; each ticker is written with a single indexer lookup.
+        """
         # Create a figure with appropriate dimensions
         fig, ax = plt.subplots(figsize=(16, 8))
         
-        # Get all tickers and sort them
-        tickers = sorted(list(rolling_correlations.keys()))
-        
-        # Create a combined DataFrame with all correlations
-        # First, make sure we have a common date range
-        all_dates = set()
-        for ticker, df in rolling_correlations.items():
-            all_dates.update(df.index)
-        all_dates = sorted(list(all_dates))
-        
-        # Create empty correlation matrix 
-        correlation_matrix = np.empty((len(tickers), len(all_dates)))
-        correlation_matrix[:] = np.nan  # Fill with NaN for missing values
-        
-        # Fill in correlation matrix
-        for i, ticker in enumerate(tickers):
-            if ticker in rolling_correlations:
-                df = rolling_correlations[ticker]
-                for j, date in enumerate(all_dates):
-                    if date in df.index:
-                        correlation_matrix[i, j] = df.loc[date, 'Correlation']
+        if isinstance(rolling_correlations, pd.DataFrame):
+            # Wide frame: one column per ticker
+            wide = rolling_correlations.sort_index()
+            tickers = sorted(wide.columns)
+            all_dates = wide.index
+            correlation_matrix = wide[tickers].to_numpy(dtype=float).T
+        else:
+            # Get all tickers and sort them
+            tickers = sorted(rolling_correlations.keys())
+            
+            # Union of all dates, then every ticker scattered onto it at once
+            frames = [rolling_correlations[ticker] for ticker in tickers]
+            all_dates = frames[0].index.append([df.index for df in frames[1:]]).unique().sort_values()
+            correlation_matrix = np.full((len(tickers), len(all_dates)), np.nan)
+            for i, df in enumerate(frames):
+                positions = all_dates.get_indexer(df.index)
+                correlation_matrix[i, positions] = df['Correlation'].to_numpy(dtype=float)
         
         # Plot heatmap
         im = ax.imshow(correlation_matrix, cmap='coolwarm', aspect='auto', 
@@ -116,32 +130,70 @@ class Plotting:
 
 class AnalysisExtensions:
     @staticmethod
-    def run_twsca(target, comparison, max_warp=5, freq_band=[0.02, 0.5]):
-        """Run TWSCA analysis between target and comparison series."""
+    def run_twsca(target, comparison, max_warp=5, freq_band=[0.02, 0.5], max_cost=None,
+                  cache=None):
+        """Run TWSCA analysis between target and comparison series.
+        
+        Follows the same pipeline as ``twsca.compute_twsca`` (LLT filter,
+        normalize, DTW alignment, spectral correlation of the aligned series)
+        but aligns with the shared band-constrained kernel from
+        ``twsca_tools.dtw_kernels``, so the warping path stays within
+        ``max_warp`` samples of the diagonal.
+        
+        Parameters:
+        -----------
+        max_warp : int, default=5
+            Sakoe-Chiba band radius for the DTW alignment
+        max_cost : float, optional
+            Screening threshold; pairs whose alignment cost cannot stay at
+            or below it are rejected via LB_Keogh / early abandoning and
+            returned as (inf, 0.0)
+        cache : twsca_tools.result_cache.ResultCache, optional
+            On-disk result cache keyed on the inputs and parameters; a hit
+            skips the computation entirely
+        """
         try:
             if not use_built_in_llt:
                 raise ImportError("TWSCA package not available")
+            
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.make_key(
+                    [np.asarray(target, dtype=float), np.asarray(comparison, dtype=float)],
+                    {
+                        'analysis': 'run_twsca',
+                        'llt_sigma': 1.5,
+                        'llt_alpha': 0.5,
+                        'normalization': 'zscore',
+                        'dtw_radius': max_warp,
+                        'freq_band': list(freq_band),
+                        'max_cost': max_cost,
+                    }
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return float(cached['alignment_cost']), float(cached['correlation'])
                 
-            # Use the updated compute_twsca function with its new parameters
-            # The updated function accepts direct time series input
-            result = compute_twsca(
-                target, comparison,
-                # Set the DTW radius parameter (equivalent to max_warp)
-                dtw_radius=max_warp,
-                # Use LLT filtering for the input series
-                use_llt=True,
-                llt_sigma=1.5,
-                llt_alpha=0.5,  # Updated to be compatible with TWSCA 0.3.0
-                # Normalize and detrend the series
-                normalize=True,
-                detrend=True
-            )
+            # Same preprocessing as compute_twsca(use_llt=True, normalize=True)
+            s1 = normalize_series(llt_filter(validate_time_series(target), sigma=1.5, alpha=0.5))
+            s2 = normalize_series(llt_filter(validate_time_series(comparison), sigma=1.5, alpha=0.5))
             
-            # Extract alignment cost and correlation from the result
-            # Updated to use the correct key names from TWSCA 0.3.0 result dictionary
-            alignment_cost = result.get('dtw_distance', np.nan)  # Changed from 'alignment_cost'
-            correlation = result.get('spectral_correlation', 0.0)  # Changed from 'correlation'
+            if max_cost is not None:
+                screened = dtw_kernels.dtw_distance(s1, s2, radius=max_warp, abandon_above=max_cost)
+                if not np.isfinite(screened):
+                    if cache is not None:
+                        cache.put(cache_key, {'alignment_cost': np.inf, 'correlation': 0.0})
+                    return np.inf, 0.0
+            
+            # Alignment cost and warping path within the max_warp band
+            alignment_cost, path = dtw_kernels.dtw_distance(
+                s1, s2, radius=max_warp, return_path=True
+            )
+            aligned_s1, aligned_s2 = align_series(s1, s2, path)
+            correlation = spectral_correlation(aligned_s1, aligned_s2)
             
+            if cache is not None:
+                cache.put(cache_key, {'alignment_cost': alignment_cost, 'correlation': correlation})
             return alignment_cost, correlation
         except Exception as e:
             print(f"Error in TWSCA calculation: {e}")
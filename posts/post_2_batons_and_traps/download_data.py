@@ -7,50 +7,61 @@ Downloads required stock data for Time-Warped Spectral Correlation Analysis.
 import os
 import sys
 import argparse
-import pandas as pd
-from datetime import datetime, timedelta
 
-def download_stock_data(tickers, start_date, end_date, output_dir="data"):
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import data_store, fetcher
+
+def download_stock_data(tickers, start_date, end_date, output_dir="data", provider=None,
+                        max_workers=8, retries=3, full=False):
     """
     Download historical data for specified tickers.
     
+    Only the dates not downloaded before are requested (see
+    twsca_tools.data_store) and merged into each CSV. Tickers are fetched
+    concurrently through twsca_tools.fetcher.
+    
     Args:
         tickers: List of stock tickers to download
         start_date: Start date for data download
         end_date: End date for data download
         output_dir: Directory to save CSV files
+        provider: fetcher provider (default: yfinance)
+        max_workers: Concurrent requests
+        retries: Retries per ticker with exponential backoff
+        full: Download the whole range again
+    
+    Returns:
+        Dict of ticker -> exception for the tickers that failed
     """
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
+    if provider is None:
+        provider = fetcher.YFinanceProvider()
+    
+    def report(ticker, n_fetched, n_rows):
+        csv_path = os.path.join(output_dir, f"{ticker}.csv")
+        print(f"Saved {n_fetched} new rows to {csv_path} ({n_rows} rows)")
     
-    # Try to import yfinance, install if needed
-    try:
-        import yfinance as yf
-    except ImportError:
-        print("Installing yfinance...")
-        os.system("pip install yfinance")
-        import yfinance as yf
+    def rebase(ticker, reason):
+        print(f"{ticker} prices were re-adjusted ({reason}); downloading its full history")
     
-    # Download data for each ticker
+    print(f"Downloading data for {len(tickers)} tickers with {max_workers} workers...")
+    store = data_store.DataStore(output_dir, layout="history")
+    fetched, errors = data_store.refresh(store, provider, tickers, start_date, end_date,
+                                         max_workers=max_workers, retries=retries,
+                                         full=full, on_result=report, on_rebase=rebase)
     for ticker in tickers:
-        try:
-            print(f"Downloading data for {ticker}...")
-            stock = yf.Ticker(ticker)
-            data = stock.history(start=start_date, end=end_date)
-            
-            if data.empty:
-                print(f"No data found for {ticker}")
-                continue
-                
-            # Save to CSV
-            csv_path = os.path.join(output_dir, f"{ticker}.csv")
-            data.to_csv(csv_path)
-            print(f"Saved {len(data)} rows to {csv_path}")
-            
-        except Exception as e:
-            print(f"Error downloading data for {ticker}: {e}")
+        if ticker in errors:
+            print(f"Error downloading data for {ticker}: {errors[ticker]}")
+        elif not fetched[ticker]:
+            print(f"{ticker} is up to date")
     
     print(f"Download complete. Data saved to {output_dir}")
+    return errors
 
 def main():
     """Main function to download stock data."""
@@ -58,24 +69,30 @@ def main():
     parser.add_argument("--output-dir", type=str, default="data",
                         help="Directory to save CSV files")
     parser.add_argument("--tickers", type=str, default="GME,CHWY,AMC,KOSS,BB,NOK,SPY",
-                        help="Comma-separated list of tickers to download")
+                        help="Comma-separated list of tickers to download, or @file with one ticker per line")
     parser.add_argument("--start-date", type=str, default="2020-01-01",
                         help="Start date for data download (YYYY-MM-DD)")
     parser.add_argument("--end-date", type=str, default="2023-12-31",
                         help="End date for data download (YYYY-MM-DD)")
+    parser.add_argument("--full", action="store_true",
+                        help="Download the whole range again instead of only missing dates")
+    fetcher.add_fetch_arguments(parser)
     
     args = parser.parse_args()
     
     # Parse arguments
     output_dir = args.output_dir
-    tickers = [ticker.strip() for ticker in args.tickers.split(",")]
+    tickers = fetcher.parse_tickers(args.tickers)
     start_date = args.start_date
     end_date = args.end_date
     
     # Download data
-    download_stock_data(tickers, start_date, end_date, output_dir)
+    errors = download_stock_data(tickers, start_date, end_date, output_dir,
+                                 provider=fetcher.provider_from_args(args),
+                                 max_workers=args.workers, retries=args.retries,
+                                 full=args.full)
     
-    return 0
+    return 0 if not errors else 1
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -8,29 +8,50 @@ including correlation vs DTW distance charts, cycle alignment heatmaps,
 and baton pass/trap zone visualizations.
 """
 
+import hashlib
+import io
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 import numpy as np
 import pandas as pd
 import argparse
 from pathlib import Path
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.colors as mcolors
-import seaborn as sns
 from datetime import datetime, timedelta
 
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import influence, results_store
+
 def load_analysis_results(results_dir, main_ticker="GME"):
     """
-    Load analysis results from CSV files.
+    Load analysis results from the Parquet results store or CSV files.
+    
+    The columnar store written by run_twsca_analysis.py (one typed table
+    per main ticker) is used when present; otherwise the per-pair
+    correlation_*.csv and dtw_*.csv files are parsed.
     
     Args:
-        results_dir: Directory containing CSV files
+        results_dir: Directory containing the analysis results
         main_ticker: Main ticker symbol
     
     Returns:
         Dict of DataFrames with correlation and DTW results
     """
+    store_dir = results_store.store_path(results_dir)
+    if os.path.exists(results_store.partition_path(store_dir, main_ticker)):
+        if results_store.parquet_available():
+            results = results_store.load_results(store_dir, main_ticker)
+            print(f"Loaded {len(results['correlation'])} pairs from {store_dir}")
+            return results
+        print("Warning: pyarrow is not installed, reading CSV results instead")
+    
     results = {'correlation': {}, 'dtw': {}}
     
     # Get list of CSV files in results directory
@@ -85,74 +106,90 @@ def plot_correlation_vs_dtw(results, main_ticker="GME", output_dir="figures"):
         main_ticker: Main ticker symbol
         output_dir: Directory to save plots
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
     # For each comparison ticker
     for ticker in results['correlation'].keys():
         if ticker not in results['dtw']:
             continue
-            
-        # Get correlation and DTW data
-        corr_df = results['correlation'][ticker]
-        dtw_df = results['dtw'][ticker]
-        
-        # Align dates
-        common_dates = corr_df.index.intersection(dtw_df.index)
-        if len(common_dates) == 0:
-            print(f"No common dates for {ticker}")
-            continue
-            
-        # Create figure
-        plt.figure(figsize=(12, 6))
-        
-        # Add a second y-axis
-        ax1 = plt.gca()
-        ax2 = ax1.twinx()
-        
-        # Plot correlation
-        ax1.plot(common_dates, corr_df.loc[common_dates, 'correlation'], 
-                'b-', label='Correlation', linewidth=2)
-        ax1.set_ylabel('Correlation', color='blue', fontsize=12)
-        ax1.tick_params(axis='y', labelcolor='blue')
-        ax1.set_ylim([-1.1, 1.1])
-        
-        # Plot DTW distance (inverse scale so higher means more similar)
-        max_dtw = dtw_df['dtw_distance'].max()
-        if max_dtw == 0:  # Avoid division by zero
-            max_dtw = 1.0
-        normalized_dtw = 1 - (dtw_df.loc[common_dates, 'dtw_distance'] / max_dtw)
-        
-        # Ensure we have valid data (not NaN or infinite)
-        normalized_dtw = normalized_dtw.fillna(0)
-        normalized_dtw = normalized_dtw.replace([np.inf, -np.inf], 0)
-        
-        ax2.plot(common_dates, normalized_dtw, 
-                'r-', label='Cycle Alignment', linewidth=2)
-        ax2.set_ylabel('Cycle Alignment', color='red', fontsize=12)
-        ax2.tick_params(axis='y', labelcolor='red')
-        ax2.set_ylim([-0.1, 1.1])
-        
-        # Format x-axis
-        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax1.xaxis.set_major_locator(mdates.MonthLocator(interval=3))
-        plt.gcf().autofmt_xdate()
-        
-        # Add title and labels
-        plt.title(f"{main_ticker} vs {ticker}: Correlation and Cycle Alignment", fontsize=14)
-        plt.grid(True, alpha=0.3)
-        
-        # Add legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
-        
-        # Save figure
-        output_file = os.path.join(output_dir, f"corr_vs_dtw_{main_ticker}_{ticker}.png")
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"Created chart: {output_file}")
+        plot_pair_correlation_vs_dtw(results['correlation'][ticker], results['dtw'][ticker],
+                                     ticker, main_ticker, output_dir)
+
+def plot_pair_correlation_vs_dtw(corr_df, dtw_df, ticker, main_ticker="GME", output_dir="figures"):
+    """
+    Plot correlation vs DTW distance for one comparison ticker.
+    
+    Args:
+        corr_df: Correlation results of the pair
+        dtw_df: DTW results of the pair
+        ticker: Comparison ticker symbol
+        main_ticker: Main ticker symbol
+        output_dir: Directory to save plots
+    
+    Returns:
+        Path of the chart, or None if the pair has no common dates
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Align dates
+    common_dates = corr_df.index.intersection(dtw_df.index)
+    if len(common_dates) == 0:
+        print(f"No common dates for {ticker}")
+        return None
+        
+    # Create figure
+    plt.figure(figsize=(12, 6))
+    
+    # Add a second y-axis
+    ax1 = plt.gca()
+    ax2 = ax1.twinx()
+    
+    # Plot correlation
+    ax1.plot(common_dates, corr_df.loc[common_dates, 'correlation'], 
+            'b-', label='Correlation', linewidth=2)
+    ax1.set_ylabel('Correlation', color='blue', fontsize=12)
+    ax1.tick_params(axis='y', labelcolor='blue')
+    ax1.set_ylim([-1.1, 1.1])
+    
+    # Plot DTW distance (inverse scale so higher means more similar)
+    max_dtw = dtw_df['dtw_distance'].max()
+    if max_dtw == 0:  # Avoid division by zero
+        max_dtw = 1.0
+    normalized_dtw = 1 - (dtw_df.loc[common_dates, 'dtw_distance'] / max_dtw)
+    
+    # Ensure we have valid data (not NaN or infinite)
+    normalized_dtw = normalized_dtw.fillna(0)
+    normalized_dtw = normalized_dtw.replace([np.inf, -np.inf], 0)
+    
+    ax2.plot(common_dates, normalized_dtw, 
+            'r-', label='Cycle Alignment', linewidth=2)
+    ax2.set_ylabel('Cycle Alignment', color='red', fontsize=12)
+    ax2.tick_params(axis='y', labelcolor='red')
+    ax2.set_ylim([-0.1, 1.1])
+    
+    # Format x-axis
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax1.xaxis.set_major_locator(mdates.MonthLocator(interval=3))
+    plt.gcf().autofmt_xdate()
+    
+    # Add title and labels
+    plt.title(f"{main_ticker} vs {ticker}: Correlation and Cycle Alignment", fontsize=14)
+    plt.grid(True, alpha=0.3)
+    
+    # Add legend
+    lines1, labels1 = ax1.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
+    
+    # Save figure
+    output_file = os.path.join(output_dir, f"corr_vs_dtw_{main_ticker}_{ticker}.png")
+    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    plt.close()
+    
+    print(f"Created chart: {output_file}")
+    return output_file
 
 def create_alignment_heatmap(results, main_ticker="GME", output_dir="figures"):
     """
@@ -163,6 +200,9 @@ def create_alignment_heatmap(results, main_ticker="GME", output_dir="figures"):
         main_ticker: Main ticker symbol
         output_dir: Directory to save plots
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -261,7 +301,7 @@ def create_alignment_heatmap(results, main_ticker="GME", output_dir="figures"):
         axes = [axes]
         
     # Color mapping for stocks
-    cmap = plt.cm.get_cmap('tab10', n_tickers)
+    cmap = plt.get_cmap('tab10', n_tickers)
         
     # Plot each ticker in its own subplot
     for i, ticker in enumerate(alignment_df.columns):
@@ -347,98 +387,18 @@ def create_alignment_heatmap(results, main_ticker="GME", output_dir="figures"):
     
     print(f"Created combined alignment visualization: {combined_file}")
     
-    # Also attempt the traditional heatmap one more time, with clearer labeling
-    # Create a completely manual grid visualization instead of using seaborn heatmap
-    # This should work regardless of data issues
-    
-    # Get dimensions
-    n_stocks = len(alignment_df.columns)
-    n_dates = len(alignment_df.index)
-    
-    # Create figure and axis (only need to do this once)
+    # Traditional heatmap of the full alignment matrix (stocks x dates)
     fig, ax = plt.subplots(figsize=(15, 10))
-    
-    # Set up a color map
-    cmap = plt.cm.YlOrRd
-    
-    # Downsample the dates to make visualization clearer (max 30 columns)
-    if n_dates > 30:
-        # Sample every Nth date
-        step = n_dates // 30 + 1
-        plot_dates = alignment_df.index[::step]
-    else:
-        plot_dates = alignment_df.index
-    
-    # Get the data for plotting
-    plot_data = alignment_df.loc[plot_dates]
-    
-    # Create a grid of rectangles
-    for i, ticker in enumerate(plot_data.columns):
-        for j, date in enumerate(plot_data.index):
-            # Get value (or default to 0.5 if missing)
-            value = plot_data.loc[date, ticker]
-            if pd.isna(value):
-                value = 0.5
-                
-            # Force some variation: add position-based offset to ensure visual difference
-            # This creates an artificial pattern if data is too uniform
-            variation = 0.2 * np.sin(i * 0.5) * np.cos(j * 0.3)
-            display_value = min(1.0, max(0.0, value + variation))
-            
-            # Create rectangle
-            rect = plt.Rectangle(
-                (j, n_stocks - i - 1),  # Position (x, y)
-                1, 1,                    # Width, Height
-                facecolor=cmap(display_value),  # Color based on value
-                edgecolor='black',
-                linewidth=0.5,
-                alpha=0.8
-            )
-            ax.add_patch(rect)
-            
-            # Add text for value
-            text_color = 'black' if display_value < 0.7 else 'white'
-            plt.text(
-                j + 0.5, n_stocks - i - 0.5,  # Center of the cell
-                f"{value:.2f}",
-                ha='center', va='center',
-                color=text_color,
-                fontsize=8,
-                fontweight='bold'
-            )
-    
-    # Set limits and remove ticks
-    ax.set_xlim(0, len(plot_dates))
-    ax.set_ylim(0, n_stocks)
-    
-    # Add ticker labels on y-axis
-    plt.yticks(
-        np.arange(n_stocks) + 0.5,
-        [plot_data.columns[n_stocks - i - 1] for i in range(n_stocks)]
-    )
-    
-    # Add date labels on x-axis (rotated)
-    date_labels = [d.strftime('%Y-%m') for d in plot_dates]
-    plt.xticks(
-        np.arange(len(plot_dates)) + 0.5,
-        date_labels,
-        rotation=45,
-        ha='right'
-    )
-    
-    # Add grid
-    ax.set_axisbelow(True)
-    ax.grid(False)
+    image = draw_heatmap(ax, alignment_df.T.to_numpy(), list(alignment_df.columns),
+                         alignment_df.index, cmap=plt.cm.YlOrRd, vmin=0, vmax=1)
     
     # Add title and labels
-    plt.title(f"Cycle Alignment with {main_ticker} Over Time", fontsize=16, pad=20)
-    plt.xlabel("Date", fontsize=14, labelpad=10)
-    plt.ylabel("Stock", fontsize=14, labelpad=10)
+    ax.set_title(f"Cycle Alignment with {main_ticker} Over Time", fontsize=16, pad=20)
+    ax.set_xlabel("Date", fontsize=14, labelpad=10)
+    ax.set_ylabel("Stock", fontsize=14, labelpad=10)
     
     # Add colorbar
-    sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(0, 1))
-    sm.set_array([])
-    cbar = plt.colorbar(sm, ax=ax, label="Alignment Strength")
+    plt.colorbar(image, ax=ax, label="Alignment Strength")
     
     plt.tight_layout()
     heatmap_file = os.path.join(output_dir, f"alignment_heatmap_{main_ticker}.png")
@@ -447,6 +407,59 @@ def create_alignment_heatmap(results, main_ticker="GME", output_dir="figures"):
     
     print(f"Created heatmap: {heatmap_file}")
 
+def draw_heatmap(ax, values, row_labels, dates, cmap=None, vmin=None, vmax=None,
+                 annotate=None, max_annotated_cells=400):
+    """
+    Draw a (rows x dates) matrix as a single raster image.
+    
+    The whole matrix is one imshow artist, so drawing time does not grow
+    with the number of cells; every date keeps its own column. NaN cells
+    are shown in light gray.
+    
+    Args:
+        ax: Matplotlib axes
+        values: Array of shape (n_rows, n_dates)
+        row_labels: Label of every row
+        dates: DatetimeIndex of the columns
+        cmap: Colormap
+        vmin: Value mapped to the bottom of the colormap
+        vmax: Value mapped to the top of the colormap
+        annotate: Write each value into its cell; None does so only when
+            the grid has at most max_annotated_cells cells
+        max_annotated_cells: Cell count up to which annotate=None labels cells
+    
+    Returns:
+        The AxesImage (e.g. for a colorbar)
+    """
+    import matplotlib.pyplot as plt
+    
+    values = np.ma.masked_invalid(np.asarray(values, dtype=float))
+    n_rows, n_dates = values.shape
+    cmap = plt.get_cmap(cmap).copy()
+    cmap.set_bad('lightgray')
+    image = ax.imshow(values, aspect='auto', interpolation='nearest', cmap=cmap,
+                      vmin=vmin, vmax=vmax)
+    
+    # Rows are labeled individually (or every few rows for tall grids), dates
+    # through a locator on the column index
+    row_step = max(1, n_rows // 60)
+    ax.set_yticks(np.arange(0, n_rows, row_step))
+    ax.set_yticklabels(list(row_labels)[::row_step])
+    ax.xaxis.set_major_locator(plt.MaxNLocator(nbins=12, integer=True))
+    ax.xaxis.set_major_formatter(plt.FuncFormatter(
+        lambda x, _: dates[int(x)].strftime('%Y-%m-%d') if 0 <= x < n_dates else ''))
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    
+    if annotate is None:
+        annotate = n_rows * n_dates <= max_annotated_cells
+    if annotate:
+        norm = image.norm
+        for i, j in zip(*np.nonzero(~np.ma.getmaskarray(values))):
+            value = values[i, j]
+            ax.text(j, i, f"{value:.2f}", ha='center', va='center', fontsize=8,
+                    fontweight='bold', color='black' if norm(value) < 0.7 else 'white')
+    return image
+
 def plot_baton_pass_visualization(results, main_ticker="GME", output_dir="figures"):
     """
     Create visualization showing baton pass and trap zone events.
@@ -456,6 +469,9 @@ def plot_baton_pass_visualization(results, main_ticker="GME", output_dir="figure
         main_ticker: Main ticker symbol
         output_dir: Directory to save plots
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -517,8 +533,10 @@ def plot_baton_pass_visualization(results, main_ticker="GME", output_dir="figure
     influence_df = corr_df.abs() * alignment_df
     
     # Find the stock with highest influence for each date
-    max_influence = influence_df.idxmax(axis=1)
-    max_influence_value = influence_df.max(axis=1)
+    positions, max_values = influence.top_influencer(influence_df.to_numpy())
+    tickers = np.array(list(influence_df.columns) + [None], dtype=object)
+    max_influence = pd.Series(tickers[positions], index=influence_df.index)  # -1 -> None
+    max_influence_value = pd.Series(max_values, index=influence_df.index)
     
     # Replace NaN values in results
     max_influence = max_influence.ffill().bfill()
@@ -528,7 +546,7 @@ def plot_baton_pass_visualization(results, main_ticker="GME", output_dir="figure
     plt.figure(figsize=(15, 8))
     
     # Get a colormap with enough colors for all tickers
-    cmap = plt.cm.get_cmap('tab10', len(corr_data))
+    cmap = plt.get_cmap('tab10', len(corr_data))
     
     # Plot the influence band using scatter
     for i, ticker in enumerate(influence_df.columns):
@@ -584,6 +602,193 @@ def plot_baton_pass_visualization(results, main_ticker="GME", output_dir="figure
     # Return the transition dates for annotation
     return transition_dates
 
+def figure_tasks(results, main_ticker="GME", output_dir="figures"):
+    """
+    Split the visualizations into independent rendering tasks.
+    
+    Each task carries only the slice of the results its figures need, so
+    it can be shipped to a worker process cheaply.
+    
+    Args:
+        results: Dict of analysis results
+        main_ticker: Main ticker symbol
+        output_dir: Directory to save plots
+    
+    Returns:
+        List of (label, function, kwargs, output files) tuples in a fixed order
+    """
+    tasks = []
+    for ticker in results['correlation'].keys():
+        if ticker not in results['dtw']:
+            continue
+        tasks.append((f"correlation vs DTW chart for {ticker}", plot_pair_correlation_vs_dtw, {
+            'corr_df': results['correlation'][ticker],
+            'dtw_df': results['dtw'][ticker],
+            'ticker': ticker,
+            'main_ticker': main_ticker,
+            'output_dir': output_dir,
+        }, [f"corr_vs_dtw_{main_ticker}_{ticker}.png"]))
+    tasks.append(("alignment heatmap", create_alignment_heatmap, {
+        'results': {'dtw': results['dtw']},
+        'main_ticker': main_ticker,
+        'output_dir': output_dir,
+    }, [f"alignment_grid_{main_ticker}.png", f"alignment_combined_{main_ticker}.png",
+        f"alignment_heatmap_{main_ticker}.png"]))
+    tasks.append(("baton pass visualization", plot_baton_pass_visualization, {
+        'results': {'correlation': results['correlation'], 'dtw': results['dtw']},
+        'main_ticker': main_ticker,
+        'output_dir': output_dir,
+    }, [f"influence_band_{main_ticker}.png"]))
+    return tasks
+
+# Bump when figure code changes so every figure is rebuilt once
+FIGURE_VERSION = 1
+MANIFEST_FILE = ".figure_manifest.json"
+
+def task_fingerprint(function, kwargs):
+    """
+    Hash of a rendering task's function, input slices and parameters.
+    
+    DataFrames are hashed by content (values, index and column names), so
+    a ticker's figure hash only changes when its own results change.
+    """
+    digest = hashlib.sha1(f"{FIGURE_VERSION}:{function.__name__}".encode())
+    
+    def feed(value):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+            names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr(list(names)).encode())
+        elif isinstance(value, dict):
+            for key in sorted(value):
+                digest.update(repr(key).encode())
+                feed(value[key])
+        else:
+            digest.update(repr(value).encode())
+    
+    feed(kwargs)
+    return digest.hexdigest()
+
+class FigureManifest:
+    """
+    Record of the input hash each figure was last rendered from.
+    
+    Stored as <output_dir>/.figure_manifest.json, keyed by the task's first
+    output file.
+    
+    Args:
+        output_dir: Figure directory
+    """
+    
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+    
+    def is_current(self, fingerprint, outputs):
+        """True if the outputs exist and were rendered from this fingerprint."""
+        entry = self.entries.get(outputs[0])
+        return (entry is not None and entry.get('hash') == fingerprint
+                and all(os.path.exists(os.path.join(self.output_dir, name)) for name in outputs))
+    
+    def record(self, fingerprint, outputs, summary=None):
+        """Record rendered outputs, with an optional JSON summary of the task result."""
+        entry = {'hash': fingerprint, 'outputs': list(outputs)}
+        if summary is not None:
+            entry['summary'] = summary
+        self.entries[outputs[0]] = entry
+    
+    def summary(self, outputs):
+        """Summary recorded with the outputs, or None."""
+        return self.entries.get(outputs[0], {}).get('summary')
+    
+    def save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def _init_render_worker():
+    """Pool initializer: render off-screen."""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+def _render_task(function, kwargs):
+    """Pool task: render one task, capturing its console output."""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        result = function(**kwargs)
+    return result, log.getvalue()
+
+def render_figures(tasks, jobs=1, on_done=None):
+    """
+    Render figure tasks, serially or in a process pool.
+    
+    With jobs > 1 the tasks run in worker processes with the Agg backend.
+    Their console output is replayed in task order, so the log (like the
+    file names) does not depend on scheduling. A failing task does not stop
+    the others; the first failure is re-raised once every task has run.
+    
+    Args:
+        tasks: List from figure_tasks
+        jobs: Number of worker processes (1 renders in this process)
+        on_done: Optional callback(task, result), called as each task
+            succeeds
+    
+    Returns:
+        List of task results in task order (None for failed tasks)
+    """
+    results, error = [], None
+    
+    def finish(task, outcome):
+        nonlocal error
+        try:
+            result = outcome()
+        except Exception as e:
+            print(f"Failed to generate {task[0]}: {e}")
+            error = error or e
+            result = None
+        else:
+            if on_done is not None:
+                on_done(task, result)
+        results.append(result)
+    
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            label, function, kwargs, _ = task
+            print(f"Generating {label}...")
+            finish(task, lambda: function(**kwargs))
+    else:
+        print(f"Rendering {len(tasks)} figure tasks on {jobs} workers")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_render_worker) as pool:
+            futures = [pool.submit(_render_task, function, kwargs)
+                       for _, function, kwargs, _ in tasks]
+            for task, future in zip(tasks, futures):
+                print(f"Generating {task[0]}...")
+                
+                def replay(future=future):
+                    result, log = future.result()
+                    print(log, end='')
+                    return result
+                
+                finish(task, replay)
+    
+    if error is not None:
+        raise error
+    return results
+
+def outputs_written(output_dir, outputs, since):
+    """True if every output file exists and was written at or after `since`."""
+    # Allow for file systems whose timestamps are coarser than time.time()
+    since -= 1.0
+    return all(os.path.exists(path) and os.path.getmtime(path) >= since
+               for path in (os.path.join(output_dir, name) for name in outputs))
+
 def main():
     """Main function to generate visualizations."""
     parser = argparse.ArgumentParser(description="Generate visualizations for TWSCA results")
@@ -593,6 +798,10 @@ def main():
                         help="Directory to save visualizations")
     parser.add_argument("--main-ticker", type=str, default="GME",
                         help="Main ticker symbol")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for rendering figures (default: 1)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render every figure, even if its inputs are unchanged")
     
     args = parser.parse_args()
     
@@ -609,29 +818,53 @@ def main():
         print("No analysis results found. Run run_twsca_analysis.py first.")
         return 1
     
-    # Create visualizations
-    print("Generating correlation vs DTW charts...")
-    plot_correlation_vs_dtw(results, main_ticker, output_dir)
-    
-    print("Generating alignment heatmap...")
-    create_alignment_heatmap(results, main_ticker, output_dir)
+    # Create visualizations, skipping figures whose inputs are unchanged
+    manifest = FigureManifest(output_dir)
+    tasks, fingerprints, n_skipped = [], {}, 0
+    n_events = None
+    for task in figure_tasks(results, main_ticker, output_dir):
+        fingerprint = task_fingerprint(task[1], task[2])
+        if not args.force and manifest.is_current(fingerprint, task[3]):
+            n_skipped += 1
+            if task[1] is plot_baton_pass_visualization:
+                # Report the events found when the figure was rendered
+                n_events = (manifest.summary(task[3]) or {}).get('events')
+                if n_events is None:
+                    print("Baton pass visualization is up to date "
+                          "(run with --force to report its events)")
+            continue
+        tasks.append(task)
+        fingerprints[task[3][0]] = fingerprint
+    
+    # Record each task as it finishes and save even if a later one fails,
+    # leaving out tasks that returned without writing their figures
+    # (e.g. no common dates); those are retried on the next run
+    rebuilt = []
+    started = time.time()
+    
+    def on_done(task, result):
+        nonlocal n_events
+        summary = None
+        if task[1] is plot_baton_pass_visualization and result is not None:
+            n_events = len(result)
+            summary = {'events': n_events}
+        if outputs_written(output_dir, task[3], started):
+            manifest.record(fingerprints[task[3][0]], task[3], summary)
+            rebuilt.append(task)
     
-    print("Generating baton pass visualization...")
-    transition_dates = plot_baton_pass_visualization(results, main_ticker, output_dir)
+    try:
+        render_figures(tasks, jobs=args.jobs, on_done=on_done)
+    finally:
+        manifest.save()
+        n_figures = sum(len(task[3]) for task in rebuilt)
+        print(f"Rebuilt {len(rebuilt)} figure tasks ({n_figures} figures), "
+              f"skipped {n_skipped} unchanged, {len(tasks) - len(rebuilt)} not written")
     
-    if transition_dates is not None:
-        print(f"Identified {len(transition_dates)} potential baton pass events")
+    if n_events is not None:
+        print(f"Identified {n_events} potential baton pass events")
     
     print("Visualization generation complete.")
     return 0
 
 if __name__ == "__main__":
-    # Try to install required packages if they're missing
-    try:
-        import seaborn
-    except ImportError:
-        print("Installing seaborn...")
-        os.system("pip install seaborn")
-        import seaborn as sns
-    
     sys.exit(main())
@@ -7,19 +7,45 @@ This script implements the Time-Warped Spectral Correlation Analysis
 technique using the official twsca package.
 """
 
+import hashlib
+import json
 import os
 import sys
+from contextlib import nullcontext
 import numpy as np
 import pandas as pd
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
 from pathlib import Path
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import dtw_kernels, pairwise, price_matrix, results_store, startup, streaming, windowed
+from twsca_tools.result_cache import ResultCache, print_cache_info
+
+# LLT filter settings used for both series of every pair
+LLT_SIGMA = 1.0
+LLT_ALPHA = 0.5
+# Samples on either side an LLT output depends on
+LLT_REACH = streaming.llt_reach(LLT_SIGMA)
+
+# Normalization anchors of the stored pairs, per main ticker
+ANCHOR_FILE = "normalization_anchors.json"
 
 def load_stock_data(data_dir, tickers):
     """
     Load stock data for specified tickers from CSV files.
     
+    If <data_dir>/price_matrix holds an up-to-date memory-mapped matrix
+    (see twsca_tools.price_matrix) the frames come from it without parsing
+    any CSV; otherwise each CSV is read.
+    
     Args:
         data_dir: Directory containing CSV files
         tickers: List of stock tickers to load
@@ -28,6 +54,16 @@ def load_stock_data(data_dir, tickers):
         Dict of DataFrames with ticker as key
     """
     data_frames = {}
+    matrix = price_matrix.open_if_fresh(data_dir, tickers)
+    if matrix is not None:
+        for ticker in tickers:
+            if ticker in matrix:
+                data_frames[ticker] = matrix.frame(ticker)
+            else:
+                print(f"Data file not found: {os.path.join(data_dir, f'{ticker}.csv')}")
+        print(f"Loaded {len(data_frames)} tickers from {matrix.path}")
+        return data_frames
+    
     for ticker in tickers:
         csv_path = os.path.join(data_dir, f"{ticker}.csv")
         if os.path.exists(csv_path):
@@ -43,8 +79,378 @@ def load_stock_data(data_dir, tickers):
     
     return data_frames
 
+def _pair_frames(common_dates, window, correlations, distances):
+    """Wrap windowed results in DataFrames indexed by window end date."""
+    result_dates = common_dates[window:]
+    
+    # Make sure we have the right number of dates
+    if len(result_dates) != len(correlations):
+        # Trim to match the shorter length
+        min_len = min(len(result_dates), len(correlations))
+        result_dates = result_dates[:min_len]
+        correlations = correlations[:min_len]
+        distances = distances[:min_len]
+    
+    corr_df = pd.DataFrame({'correlation': correlations}, index=result_dates)
+    dtw_df = pd.DataFrame({'dtw_distance': distances}, index=result_dates)
+    return corr_df, dtw_df
+
+def _resume_position(result_dates, since):
+    """Number of leading result dates at or before ``since``."""
+    # Compare as UTC timestamps so string, naive and tz-aware indexes all work
+    stamps = pd.to_datetime(pd.Index(result_dates).astype(str), utc=True)
+    return int(np.searchsorted(stamps, pd.to_datetime(since, utc=True), side='right'))
+
+def read_last_result_date(output_dir, main_ticker, ticker):
+    """
+    Last date present in both result files of a pair.
+    
+    Args:
+        output_dir: Directory with the analysis results
+        main_ticker: Main ticker symbol
+        ticker: Comparison ticker symbol
+    
+    Returns:
+        Date label as written in the files, or None if either file is
+        missing or empty
+    """
+    last_dates = []
+    for prefix in ("correlation", "dtw"):
+        path = os.path.join(output_dir, f"{prefix}_{main_ticker}_vs_{ticker}.csv")
+        if not os.path.exists(path):
+            return None
+        index = pd.read_csv(path, index_col=0, usecols=[0]).index
+        if len(index) == 0:
+            return None
+        last_dates.append(index[-1])
+    return min(last_dates, key=lambda date: pd.to_datetime(date, utc=True))
+
+def append_rows_atomically(path, df):
+    """
+    Write new rows over the tail of a result CSV.
+    
+    Rows of the file dated on or after the first new row are replaced by
+    the new rows (a resumed run recomputes the last few stored windows, see
+    analyze_pair); earlier rows are kept byte for byte. The result is
+    written to a temporary file next to the original that replaces it with
+    os.replace, so readers never see a partially written file.
+    
+    Args:
+        path: Existing CSV written by perform_twsca_analysis
+        df: New rows (same columns, index of result dates)
+    
+    Returns:
+        Number of rows written
+    """
+    if df.empty:
+        return 0
+    existing = pd.read_csv(path, index_col=0, usecols=[0]).index
+    # Rows dated strictly before the first new row are kept
+    stamps = pd.to_datetime(existing.astype(str), utc=True)
+    keep = int(np.searchsorted(stamps, pd.to_datetime(str(df.index[0]), utc=True), side='left'))
+    
+    tmp_path = f"{path}.tmp"
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        # Header line plus the kept rows
+        for _ in range(keep + 1):
+            line = src.readline()
+            dst.write(line if line.endswith(b"\n") else line + b"\n")
+    df.to_csv(tmp_path, mode='a', header=False)
+    os.replace(tmp_path, path)
+    return len(df)
+
+def _anchor_fingerprint(main_prices, comparison_prices, through):
+    """Hash of a pair's aligned prices (and dates) up to and including ``through``."""
+    common_dates = main_prices.index.intersection(comparison_prices.index)
+    dates = common_dates[:_resume_position(common_dates, through)]
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(pd.Index(dates), index=False).to_numpy().tobytes())
+    for prices in (main_prices, comparison_prices):
+        digest.update(np.ascontiguousarray(prices.loc[dates].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+def normalization_anchor(main_prices, comparison_prices, anchor=None):
+    """
+    Normalization anchor of a pair for incremental runs.
+    
+    Windows are z-scored with the mean and standard deviation of the whole
+    smoothed series, so a grown history would rescale every window. The
+    anchor keeps the z-score parameters of the run that first computed the
+    pair; resumed runs normalize with them, so appended rows match the
+    stored ones. It also fingerprints the prices the stored rows were
+    computed from, so changed history forces a full rebuild.
+    
+    Args:
+        main_prices: Close prices of the main ticker (Series)
+        comparison_prices: Close prices of the comparison ticker (Series)
+        anchor: Previous anchor whose z-score parameters are kept (None
+            computes them from the current history)
+    
+    Returns:
+        Dict with 'main' and 'comparison' ([mean, std] of the LLT-smoothed
+        series), 'through' (last common date) and 'fingerprint'
+    """
+    import twsca
+    
+    common_dates = main_prices.index.intersection(comparison_prices.index)
+    if anchor is None:
+        anchor = {}
+        for name, prices in (('main', main_prices), ('comparison', comparison_prices)):
+            smoothed = twsca.llt_filter(prices.loc[common_dates].values,
+                                        sigma=LLT_SIGMA, alpha=LLT_ALPHA)
+            anchor[name] = [float(np.mean(smoothed)), float(np.std(smoothed))]
+    through = str(common_dates[-1]) if len(common_dates) else None
+    return {
+        'main': anchor['main'],
+        'comparison': anchor['comparison'],
+        'through': through,
+        'fingerprint': None if through is None else
+            _anchor_fingerprint(main_prices, comparison_prices, through),
+    }
+
+def anchor_matches(anchor, main_prices, comparison_prices):
+    """True if the prices an anchor was recorded from are unchanged."""
+    if not anchor or anchor.get('through') is None:
+        return False
+    return anchor['fingerprint'] == _anchor_fingerprint(main_prices, comparison_prices,
+                                                        anchor['through'])
+
+def _zscore(series, mean, std):
+    """Z-score with given parameters (zeros for a constant series, like twsca)."""
+    if std == 0:
+        return np.zeros_like(series)
+    return (series - mean) / std
+
+def read_anchors(output_dir, main_ticker):
+    """Stored normalization anchors of a main ticker (ticker -> anchor)."""
+    try:
+        with open(os.path.join(output_dir, ANCHOR_FILE)) as f:
+            return json.load(f).get(main_ticker, {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_anchors(output_dir, main_ticker, anchors, remove=()):
+    """
+    Store the normalization anchors of a main ticker, keeping other main tickers.
+    
+    Args:
+        output_dir: Directory with the analysis results
+        main_ticker: Main ticker symbol
+        anchors: Dict of ticker -> anchor to store
+        remove: Tickers whose stored anchor no longer applies
+    """
+    path = os.path.join(output_dir, ANCHOR_FILE)
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except (FileNotFoundError, ValueError):
+        if not anchors:
+            return
+        stored = {}
+    entries = {ticker: anchor for ticker, anchor in stored.get(main_ticker, {}).items()
+               if ticker not in remove}
+    stored[main_ticker] = {**entries, **anchors}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def analyze_pair(main_prices, comparison_prices, ticker, window=30, dtw_mode='full',
+                 max_warp=None, dtw_threshold=None, cache=None, since=None,
+                 spectrum_cache=None, anchor=None):
+    """
+    Run the windowed TWSCA computation for one main/comparison pair.
+    
+    Covers alignment to common dates, LLT smoothing, normalization and the
+    windowed correlation/DTW. Runs unchanged in the main process or in a
+    worker of the process pool.
+    
+    Args:
+        main_prices: Close prices of the main ticker (Series)
+        comparison_prices: Close prices of the comparison ticker (Series)
+        ticker: Comparison ticker symbol (for log messages)
+        window: Rolling window size (in trading days)
+        dtw_mode: 'full' or 'incremental' (see perform_twsca_analysis)
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: Abandon windows whose DTW distance exceeds this value
+        cache: Optional ResultCache; a hit skips the TWSCA computation
+        since: Last result date already on disk; only windows dated after it
+            are computed, plus the last stored windows whose smoothing
+            changes as the history grows (the LLT filter looks LLT_REACH
+            samples ahead), which the caller must replace
+        spectrum_cache: Optional windowed.SpectrumCache holding the prepared
+            main series and its window spectra across comparisons
+        anchor: Optional normalization anchor (see normalization_anchor);
+            the series are z-scored with its parameters instead of their
+            own, so a resumed run normalizes like the run it continues
+    
+    Returns:
+        Tuple of (correlation DataFrame, DTW DataFrame), or None if the pair
+        could not be analyzed
+    """
+    import twsca
+    
+    # Align both series to common dates
+    common_dates = main_prices.index.intersection(comparison_prices.index)
+    if len(common_dates) < window:
+        print(f"Not enough common dates for {ticker}")
+        return None
+        
+    aligned_main = main_prices.loc[common_dates]
+    aligned_comp = comparison_prices.loc[common_dates]
+    
+    # First window still to be computed (all of them unless resuming)
+    first_window = 0
+    if since is not None:
+        first_window = _resume_position(common_dates[window:], since)
+        if first_window >= len(common_dates) - window:
+            print(f"  {ticker}: up to date")
+            return _pair_frames(common_dates[first_window:], window, [], [])
+        # Windows reaching into the last LLT_REACH stored samples were
+        # smoothed against the old end of the series; compute them again
+        first_window = max(0, first_window - LLT_REACH + 1)
+    
+    # Results depend only on the aligned inputs and the parameters
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            [aligned_main.to_numpy(dtype=float), aligned_comp.to_numpy(dtype=float)],
+            {
+                'analysis': 'windowed_twsca',
+                'window': window,
+                'llt_sigma': LLT_SIGMA,
+                'llt_alpha': LLT_ALPHA,
+                'normalization': 'zscore' if anchor is None else
+                    ['zscore', anchor['main'], anchor['comparison']],
+                'dtw_mode': dtw_mode,
+                'dtw_radius': max_warp,
+                'dtw_threshold': dtw_threshold,
+                'first_window': first_window,
+            }
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"  {ticker}: loaded {len(cached['correlations'])} points from cache")
+            return _pair_frames(common_dates[first_window:], window,
+                                list(cached['correlations']), list(cached['distances']))
+    
+    # Run the windowed analysis
+    try:
+        # First, smooth the series using LLT filter and normalize them; the
+        # main series only depends on the common dates, so it is prepared
+        # once per calendar and shared by all comparisons
+        def normalize(smoothed, name):
+            if anchor is None:
+                return twsca.normalize_series(smoothed)
+            return _zscore(smoothed, *anchor[name])
+        
+        def prepare_main():
+            smoothed_main = twsca.llt_filter(aligned_main.values, sigma=LLT_SIGMA, alpha=LLT_ALPHA)
+            return normalize(smoothed_main, 'main')
+        
+        if spectrum_cache is not None:
+            main_params = () if anchor is None else tuple(anchor['main'])
+            main_spectra = spectrum_cache.get(
+                spectrum_cache.key(common_dates, LLT_SIGMA, LLT_ALPHA, *main_params),
+                prepare_main)
+        else:
+            main_spectra = windowed.SeriesSpectra(prepare_main())
+        normalized_main = main_spectra.normalized
+        
+        smoothed_comp = twsca.llt_filter(aligned_comp.values, sigma=LLT_SIGMA, alpha=LLT_ALPHA)
+        normalized_comp = normalize(smoothed_comp, 'comparison')
+        
+        # Only the windows from first_window onward are needed
+        tail_main = normalized_main[first_window:]
+        tail_comp = normalized_comp[first_window:]
+        
+        # Batched window engine: all windows are strided views and the
+        # spectra of every window come from one FFT pass (the main series'
+        # spectra are reused across comparisons)
+        comp_spectra = windowed.window_spectra(windowed.sliding_windows(tail_comp, window))
+        correlations = list(windowed.correlate_spectra(
+            main_spectra.spectra(window, first_window), comp_spectra))
+        if dtw_mode == 'incremental':
+            distances = list(dtw_kernels.rolling_dtw_distances(
+                tail_main, tail_comp, window,
+                radius=max_warp, abandon_above=dtw_threshold))
+        else:
+            if max_warp is None and dtw_threshold is None:
+                dtw_fn = twsca.dtw_distance
+            else:
+                dtw_fn = partial(dtw_kernels.dtw_distance, radius=max_warp,
+                                 abandon_above=dtw_threshold)
+            distances = list(windowed.windowed_dtw_distances(
+                tail_main, tail_comp, window, dtw_fn))
+        
+        if cache is not None:
+            cache.put(cache_key, {
+                'correlations': np.asarray(correlations, dtype=float),
+                'distances': np.asarray(distances, dtype=float),
+            })
+        
+        print(f"  {ticker}: completed analysis with {len(correlations)} points")
+        return _pair_frames(common_dates[first_window:], window, correlations, distances)
+        
+    except Exception as e:
+        print(f"Error in TWSCA analysis for {ticker}: {e}")
+        return None
+
+# Main price series attached from shared memory in each pool worker, and the
+# spectrum cache of its prepared windows (one per worker)
+_worker_main_prices = None
+_worker_shm = None
+_worker_spectrum_cache = None
+
+def _init_worker(shm_name, length, index, name):
+    """Pool initializer: attach to the shared main price series once per worker."""
+    global _worker_main_prices, _worker_shm, _worker_spectrum_cache
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray((length,), dtype=np.float64, buffer=_worker_shm.buf)
+    _worker_main_prices = pd.Series(values, index=index, name=name, copy=False)
+    _worker_spectrum_cache = windowed.SpectrumCache()
+
+def _analyze_pair_task(ticker, comparison_prices, since, anchor, pair_kwargs):
+    """Pool task: analyze one comparison ticker against the shared main series."""
+    return analyze_pair(_worker_main_prices, comparison_prices, ticker, since=since,
+                        anchor=anchor, spectrum_cache=_worker_spectrum_cache, **pair_kwargs)
+
+def run_pairs_in_pool(main_prices, tasks, pair_kwargs, workers):
+    """
+    Analyze comparison tickers in a process pool.
+    
+    The main price values are placed in a shared memory block that every
+    worker maps once (the index travels once per worker with the pool
+    initializer), so only the comparison series is pickled per task.
+    
+    Args:
+        main_prices: Close prices of the main ticker (Series)
+        tasks: List of (ticker, comparison_prices, since, anchor) tuples
+        pair_kwargs: Keyword arguments for analyze_pair
+        workers: Number of worker processes
+    
+    Returns:
+        List of analyze_pair results in the same order as tasks
+    """
+    values = np.ascontiguousarray(main_prices.to_numpy(dtype=np.float64))
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, len(values), main_prices.index,
+                                           main_prices.name)) as pool:
+            futures = [pool.submit(_analyze_pair_task, ticker, prices, since, anchor, pair_kwargs)
+                       for ticker, prices, since, anchor in tasks]
+            # Collect in submission order so the merge is deterministic
+            return [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
 def perform_twsca_analysis(data_frames, main_ticker, comparison_tickers, 
-                          window=30, output_dir='output'):
+                          window=30, output_dir='output', dtw_mode='full',
+                          max_warp=None, dtw_threshold=None, workers=1, cache=None,
+                          incremental=False, output_format='parquet'):
     """
     Perform Time-Warped Spectral Correlation Analysis using the official twsca package.
     
@@ -54,17 +460,28 @@ def perform_twsca_analysis(data_frames, main_ticker, comparison_tickers,
         comparison_tickers: List of tickers to compare against
         window: Rolling window size (in trading days)
         output_dir: Directory to save results
+        dtw_mode: 'full' solves every window independently with
+            twsca.dtw_distance; 'incremental' reuses the cost matrix of the
+            previous window (see twsca_tools.dtw_kernels)
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: If set, windows whose DTW distance exceeds this value
+            are abandoned early and reported as inf
+        workers: Number of processes for the per-ticker work (1 runs serially)
+        cache: Optional ResultCache for per-pair results
+        incremental: Only compute windows dated after the last stored row
+            of each pair and append them, z-scored with the pair's stored
+            normalization anchor; the returned results then hold just the
+            new rows (and the few recomputed stored ones). A pair whose
+            stored rows came from different prices is recomputed in full
+        output_format: 'parquet' writes one columnar table per main ticker
+            under <output_dir>/twsca_results (see twsca_tools.results_store);
+            'csv' writes the per-pair correlation_*.csv / dtw_*.csv files
     
     Returns:
         Dict containing analysis results
     """
     # Import the official twsca package
-    try:
-        import twsca
-    except ImportError:
-        print("Installing official twsca package...")
-        os.system("pip install twsca")
-        import twsca
+    twsca = startup.require('twsca', 'twsca>=0.3.0')
     
     # Print package information
     try:
@@ -89,110 +506,212 @@ def perform_twsca_analysis(data_frames, main_ticker, comparison_tickers,
     # Extract price series for analysis
     main_prices = main_stock['Close']
     
-    # Run TWSCA for each comparison ticker
+    store_dir = results_store.store_path(output_dir)
+    stored_dates = {}
+    if incremental and output_format == 'parquet':
+        stored_dates = results_store.last_result_dates(store_dir, main_ticker)
+    stored_anchors = read_anchors(output_dir, main_ticker) if incremental else {}
+    
+    # Collect the comparison tickers to run, with the normalization anchor
+    # each one is stored with after an incremental run
+    tasks, anchors = [], {}
     for ticker in comparison_tickers:
         if ticker not in data_frames:
             print(f"Comparison ticker {ticker} not found in data")
             continue
-        
-        print(f"Running TWSCA analysis for {main_ticker} vs {ticker}")
         comparison_prices = data_frames[ticker]['Close']
-        
-        # Align both series to common dates
-        common_dates = main_prices.index.intersection(comparison_prices.index)
-        if len(common_dates) < window:
-            print(f"Not enough common dates for {ticker}")
-            continue
-            
-        aligned_main = main_prices.loc[common_dates]
-        aligned_comp = comparison_prices.loc[common_dates]
-        
-        # Run the analysis using the compute_twsca function
-        try:
-            # First, smooth the series using LLT filter
-            smoothed_main = twsca.llt_filter(aligned_main.values)
-            smoothed_comp = twsca.llt_filter(aligned_comp.values)
-            
-            # Normalize the series
-            normalized_main = twsca.normalize_series(smoothed_main)
-            normalized_comp = twsca.normalize_series(smoothed_comp)
-            
-            # Compute TWSCA analysis - use the appropriate function
-            results_dict = twsca.compute_twsca(
-                normalized_main, normalized_comp, 
-                window_size=window
-            )
-            
-            # Extract results
-            correlations = results_dict.get('correlations', [])
-            distances = results_dict.get('distances', [])
-            
-            # If results are empty, try directly with spectral_correlation and dtw_distance
-            if not correlations or not distances:
-                print("  Using lower-level functions for analysis")
-                
-                # Manual computation using window-based approach
-                corr_values = []
-                dtw_values = []
-                
-                for i in range(window, len(normalized_main)):
-                    # Get window segments
-                    segment1 = normalized_main[i-window:i]
-                    segment2 = normalized_comp[i-window:i]
-                    
-                    # Calculate spectral correlation
-                    corr = twsca.spectral_correlation(segment1, segment2)
-                    corr_values.append(corr)
-                    
-                    # Calculate DTW distance
-                    dist = twsca.dtw_distance(segment1, segment2)
-                    # Extract just the distance value, not the warping path
-                    # The result may be a tuple with (distance, path)
-                    if isinstance(dist, tuple) and len(dist) > 0:
-                        dist_value = float(dist[0])  # Extract just the distance value
-                    else:
-                        dist_value = float(dist)  # If it's already a scalar
-                    dtw_values.append(dist_value)
-                
-                correlations = corr_values
-                distances = dtw_values
-            
-            # Create DataFrames with results
-            result_dates = common_dates[window:]
-            
-            # Make sure we have the right number of dates
-            if len(result_dates) != len(correlations):
-                # Trim to match the shorter length
-                min_len = min(len(result_dates), len(correlations))
-                result_dates = result_dates[:min_len]
-                correlations = correlations[:min_len]
-                distances = distances[:min_len]
-            
-            corr_df = pd.DataFrame({'correlation': correlations}, index=result_dates)
-            dtw_df = pd.DataFrame({'dtw_distance': distances}, index=result_dates)
-            
-            results['correlation'][ticker] = corr_df
-            results['dtw'][ticker] = dtw_df
-            
-            print(f"  Completed analysis with {len(correlations)} points")
-            
-        except Exception as e:
-            print(f"Error in TWSCA analysis for {ticker}: {e}")
+        since = None
+        if incremental and output_format == 'parquet':
+            since = stored_dates.get(ticker)
+        elif incremental:
+            since = read_last_result_date(output_dir, main_ticker, ticker)
+        anchor = stored_anchors.get(ticker) if since is not None else None
+        if since is not None and not anchor_matches(anchor, main_prices, comparison_prices):
+            print(f"Warning: {ticker} has no normalization anchor or its prices up to {since} "
+                  f"changed; recomputing all of its windows")
+            since, anchor = None, None
+        elif since is not None:
+            print(f"  {ticker}: resuming after {since} with the stored normalization anchor")
+        if incremental:
+            anchors[ticker] = normalization_anchor(main_prices, comparison_prices, anchor)
+        tasks.append((ticker, comparison_prices, since, anchors.get(ticker)))
+    
+    pair_kwargs = {
+        'window': window,
+        'dtw_mode': dtw_mode,
+        'max_warp': max_warp,
+        'dtw_threshold': dtw_threshold,
+        'cache': cache,
+    }
+    
+    # Run TWSCA for each comparison ticker
+    if workers > 1 and len(tasks) > 1:
+        print(f"Running TWSCA analysis for {len(tasks)} tickers on {workers} workers")
+        pair_results = run_pairs_in_pool(main_prices, tasks, pair_kwargs, workers)
+    else:
+        pair_results = []
+        spectrum_cache = windowed.SpectrumCache()
+        for ticker, comparison_prices, since, anchor in tasks:
+            print(f"Running TWSCA analysis for {main_ticker} vs {ticker}")
+            pair_results.append(analyze_pair(main_prices, comparison_prices, ticker,
+                                             since=since, anchor=anchor,
+                                             spectrum_cache=spectrum_cache, **pair_kwargs))
+    
+    # Merge in comparison-ticker order
+    for (ticker, _, _, _), pair_result in zip(tasks, pair_results):
+        if pair_result is None:
             continue
+        results['correlation'][ticker], results['dtw'][ticker] = pair_result
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Save results
-    for ticker, corr_df in results['correlation'].items():
-        corr_df.to_csv(os.path.join(output_dir, f"correlation_{main_ticker}_vs_{ticker}.csv"))
-    
-    for ticker, dtw_df in results['dtw'].items():
-        dtw_df.to_csv(os.path.join(output_dir, f"dtw_{main_ticker}_vs_{ticker}.csv"))
+    # Save results (replacing only the recomputed tail in incremental mode)
+    if output_format == 'parquet':
+        written = results_store.write_results(store_dir, main_ticker, results['correlation'],
+                                              results['dtw'], append=incremental)
+        print(f"Wrote {written} rows to {results_store.partition_path(store_dir, main_ticker)}")
+    else:
+        for kind in ('correlation', 'dtw'):
+            for ticker, df in results[kind].items():
+                path = os.path.join(output_dir, f"{kind}_{main_ticker}_vs_{ticker}.csv")
+                if incremental and os.path.exists(path):
+                    appended = append_rows_atomically(path, df)
+                    print(f"Appended {appended} rows to {path}")
+                else:
+                    df.to_csv(path)
+    # A plain run re-normalizes the pairs it writes over their whole history,
+    # so anchors stored by earlier incremental runs no longer apply to them
+    write_anchors(output_dir, main_ticker,
+                  {ticker: anchors[ticker] for ticker in results['correlation'] if ticker in anchors},
+                  remove=results['correlation'])
     
     print(f"Analysis results saved to {output_dir}")
     return results
 
+def perform_all_pairs_analysis(data_frames, tickers, window=30, output_dir='output',
+                               dtw_mode='full', max_warp=None, dtw_threshold=None):
+    """
+    Windowed TWSCA of every pair of tickers (N x N influence network).
+    
+    Each ticker is smoothed, normalized and transformed once on the dates
+    common to all tickers; correlations of all pairs come from tiled matrix
+    products and DTW runs once per unordered pair (see twsca_tools.pairwise).
+    Results go to a condensed per-window matrix store instead of per-pair
+    files.
+    
+    Args:
+        data_frames: Dict of DataFrames with ticker as key
+        tickers: Tickers forming the network
+        window: Rolling window size (in trading days)
+        output_dir: Directory to save results
+        dtw_mode: 'full' or 'incremental' (see perform_twsca_analysis)
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: If set, windows whose DTW distance exceeds this value
+            are reported as inf
+    
+    Returns:
+        PairStore over the written results, or None if nothing could be computed
+    """
+    prices = {}
+    for ticker in tickers:
+        if ticker not in data_frames:
+            print(f"Ticker {ticker} not found in data")
+            continue
+        prices[ticker] = data_frames[ticker]['Close']
+    if len(prices) < 2:
+        print("All-pairs analysis needs at least two tickers")
+        return None
+    
+    print(f"Running all-pairs TWSCA analysis for {len(prices)} tickers "
+          f"({pairwise.n_pairs(len(prices))} pairs)")
+    try:
+        result = pairwise.compute_all_pairs(
+            prices, window=window, llt_sigma=LLT_SIGMA, llt_alpha=LLT_ALPHA,
+            dtw_mode=dtw_mode, max_warp=max_warp, dtw_threshold=dtw_threshold
+        )
+    except ValueError as e:
+        print(f"Error in all-pairs analysis: {e}")
+        return None
+    
+    store_dir = pairwise.write_pair_store(
+        pairwise.store_path(output_dir, window), result, window,
+        params={'llt_sigma': LLT_SIGMA, 'llt_alpha': LLT_ALPHA, 'dtw_mode': dtw_mode,
+                'max_warp': max_warp, 'dtw_threshold': dtw_threshold}
+    )
+    print(f"Wrote {len(result['dates'])} windows x {result['correlation'].shape[1]} pairs "
+          f"to {store_dir}")
+    return pairwise.PairStore(store_dir)
+
+def perform_streaming_analysis(data_dir, main_ticker, comparison_tickers, window=30,
+                               output_dir='output', max_warp=None, dtw_threshold=None,
+                               chunk_size=100_000, column='Close', output_format='parquet'):
+    """
+    Windowed TWSCA with bounded memory for long, high-resolution histories.
+    
+    Each pair is read in chunks of chunk_size rows and scored from a ring
+    buffer of the last `window` samples (see twsca_tools.streaming); result
+    rows are written as they are produced. Windows are z-scored one by one
+    instead of normalizing the whole series, so values differ from
+    perform_twsca_analysis.
+    
+    Args:
+        data_dir: Directory containing one CSV per ticker
+        main_ticker: Main ticker to analyze (e.g., 'GME')
+        comparison_tickers: List of tickers to compare against
+        window: Rolling window size (in samples)
+        output_dir: Directory to save results
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: If set, windows whose DTW distance exceeds this value
+            are reported as inf
+        chunk_size: CSV rows read per chunk
+        column: Price column to analyze
+        output_format: 'parquet' or 'csv' (see perform_twsca_analysis)
+    
+    Returns:
+        Dict of ticker -> number of result rows written
+    """
+    main_path = os.path.join(data_dir, f"{main_ticker}.csv")
+    if not os.path.exists(main_path):
+        print(f"Data file not found: {main_path}")
+        return {}
+    
+    os.makedirs(output_dir, exist_ok=True)
+    store_dir = results_store.store_path(output_dir)
+    rows_written = {}
+    writer = (results_store.ResultsWriter(store_dir, main_ticker)
+              if output_format == 'parquet' else nullcontext())
+    with writer:
+        for ticker in comparison_tickers:
+            comparison_path = os.path.join(data_dir, f"{ticker}.csv")
+            if not os.path.exists(comparison_path):
+                print(f"Data file not found: {comparison_path}")
+                continue
+            
+            print(f"Streaming TWSCA analysis for {main_ticker} vs {ticker}")
+            rows = streaming.stream_pair(
+                main_path, comparison_path, ticker, window=window, column=column,
+                chunk_size=chunk_size, llt_sigma=LLT_SIGMA, llt_alpha=LLT_ALPHA,
+                max_warp=max_warp, dtw_threshold=dtw_threshold
+            )
+            count = 0
+            for batch in rows:
+                if output_format == 'parquet':
+                    writer.write(batch)
+                else:
+                    # Same per-pair CSV files as the batch path, appended batch by batch
+                    batch = batch.set_index('date').rename_axis('Date')
+                    for kind, value_column in (('correlation', 'correlation'), ('dtw', 'dtw_distance')):
+                        path = os.path.join(output_dir, f"{kind}_{main_ticker}_vs_{ticker}.csv")
+                        batch[[value_column]].to_csv(path, mode='a' if count else 'w',
+                                                      header=not count)
+                count += len(batch)
+            rows_written[ticker] = count
+            print(f"  {ticker}: wrote {count} windows")
+    
+    print(f"Analysis results saved to {output_dir}")
+    return rows_written
+
 def main():
     """Main function to run TWSCA analysis."""
     parser = argparse.ArgumentParser(description="Run Time-Warped Spectral Correlation Analysis")
@@ -206,6 +725,45 @@ def main():
                         help="Comma-separated list of tickers to compare against")
     parser.add_argument("--window", type=int, default=30,
                         help="Rolling window size (in trading days)")
+    parser.add_argument("--dtw-mode", type=str, default="full", choices=["full", "incremental"],
+                        help="DTW per window: 'full' recomputes each window, 'incremental' "
+                             "updates the previous window's cost matrix")
+    parser.add_argument("--max-warp", type=int, default=None,
+                        help="Sakoe-Chiba band radius for DTW (default: unconstrained)")
+    parser.add_argument("--dtw-threshold", type=float, default=None,
+                        help="Abandon windows whose DTW distance exceeds this value")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes for per-ticker analysis (default: 1)")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Result cache directory (default: <output-dir>/.twsca_cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=512,
+                        help="Evict least recently used cache entries above this size")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every pair without reading or writing the cache")
+    parser.add_argument("--cache-info", action="store_true",
+                        help="Print cache statistics and exit")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="Remove all cache entries and exit")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only compute windows after the last date in the existing "
+                             "output files and append them, z-scored like the stored rows "
+                             "(pairs whose stored prices changed are recomputed in full)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read each pair in chunks and write results as they are computed "
+                             "(bounded memory for minute/tick data; windows are z-scored "
+                             "individually)")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="CSV rows read per chunk with --stream")
+    parser.add_argument("--price-column", type=str, default="Close",
+                        help="Price column analyzed with --stream")
+    parser.add_argument("--all-pairs", action="store_true",
+                        help="Analyze every pair of the main and comparison tickers and write "
+                             "N x N correlation/DTW matrices per window")
+    parser.add_argument("--build-price-matrix", action="store_true",
+                        help="Rebuild <data-dir>/price_matrix from the CSVs before loading")
+    parser.add_argument("--output-format", type=str, default="parquet", choices=["parquet", "csv"],
+                        help="'parquet' writes one columnar results table per main ticker, "
+                             "'csv' writes two CSV files per pair")
     
     args = parser.parse_args()
     
@@ -215,32 +773,70 @@ def main():
     main_ticker = args.main_ticker
     comparison_tickers = [ticker.strip() for ticker in args.comparison_tickers.split(",")]
     window = args.window
+    dtw_mode = args.dtw_mode
+    max_warp = args.max_warp
+    dtw_threshold = args.dtw_threshold
+    workers = args.workers
+    output_format = args.output_format
+    if output_format == 'parquet' and not results_store.parquet_available():
+        print("Warning: pyarrow is not installed, writing CSV output instead")
+        output_format = 'csv'
+    
+    cache = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or os.path.join(output_dir, ".twsca_cache")
+        cache = ResultCache(cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    if args.cache_info or args.clear_cache:
+        if cache is None:
+            print("Cache is disabled (--no-cache)")
+            return 1
+        if args.clear_cache:
+            print(f"Removed {cache.clear()} cache entries")
+        print_cache_info(cache)
+        return 0
+    
+    if args.stream:
+        print(f"Streaming TWSCA analysis with window={window}, chunk_size={args.chunk_size}")
+        perform_streaming_analysis(
+            data_dir, main_ticker, comparison_tickers, window=window,
+            output_dir=output_dir, max_warp=max_warp, dtw_threshold=dtw_threshold,
+            chunk_size=args.chunk_size, column=args.price_column,
+            output_format=output_format
+        )
+        print("Analysis complete.")
+        return 0
     
     # Load data
     print(f"Loading data from {data_dir}")
     all_tickers = [main_ticker] + comparison_tickers
+    if args.build_price_matrix:
+        matrix_dir = price_matrix.build_price_matrix(data_dir)
+        print(f"Built price matrix in {matrix_dir}")
     data_frames = load_stock_data(data_dir, all_tickers)
     
     if not data_frames:
         print("No data loaded. Exiting.")
         return 1
     
+    if args.all_pairs:
+        store = perform_all_pairs_analysis(
+            data_frames, all_tickers, window=window, output_dir=output_dir,
+            dtw_mode=dtw_mode, max_warp=max_warp, dtw_threshold=dtw_threshold
+        )
+        print("Analysis complete.")
+        return 0 if store is not None else 1
+    
     # Perform analysis
-    print(f"Running TWSCA analysis with window={window}")
+    print(f"Running TWSCA analysis with window={window}, dtw_mode={dtw_mode}")
     results = perform_twsca_analysis(
         data_frames, main_ticker, comparison_tickers,
-        window=window, output_dir=output_dir
+        window=window, output_dir=output_dir, dtw_mode=dtw_mode,
+        max_warp=max_warp, dtw_threshold=dtw_threshold, workers=workers,
+        cache=cache, incremental=args.incremental, output_format=output_format
     )
     
     print("Analysis complete.")
     return 0
 
 if __name__ == "__main__":
-    # Try to install required packages if they're missing
-    try:
-        import twsca
-    except ImportError:
-        print("Installing twsca package...")
-        os.system("pip install twsca")
-    
     sys.exit(main())
@@ -1,37 +1,49 @@
-import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from scipy import signal
-
-# First ensure required packages are installed
 import sys
 import subprocess
+import argparse
+
+# Make the shared twsca_tools package importable when run as a script
+repo_root = os.path.dirname(os.path.abspath(__file__))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from twsca_tools import startup
+
+# Packages checked (and with --install, installed) by running this script.
+# Nothing is checked or installed on import.
+required_packages = ['twsca>=0.3.0', 'seaborn', 'tqdm']
+
+# TWSCA functions re-exported from the twsca package on first access
+_TWSCA_NAMES = ('llt_filter', 'analysis', 'spectral', 'spectral_correlation',
+                'compute_twsca', 'compute_twsca_matrix')
 
 def install_package(package):
     subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
 
-# Install required packages
-required_packages = ['twsca>=0.3.0', 'seaborn', 'tqdm']
-for package in required_packages:
-    try:
-        __import__(package.split('>=')[0])
-        print(f"{package} already installed")
-    except ImportError:
-        print(f"Installing {package}...")
-        install_package(package)
-        print(f"{package} installed successfully")
-
-# Import TWSCA after ensuring it's installed
-try:
-    from twsca import (
-        llt_filter, analysis, spectral, spectral_correlation, 
-        compute_twsca, compute_twsca_matrix
-    )
-    use_built_in_llt = True
-except ImportError as e:
-    print(f"Warning: Could not import from TWSCA package: {e}")
-    use_built_in_llt = False
+def check_packages(install=False):
+    """
+    Report required packages that are missing, installing them if asked.
+
+    Returns:
+        List of the packages still missing
+    """
+    missing = startup.missing(required_packages)
+    for package in missing:
+        if install:
+            print(f"Installing {package}...")
+            install_package(package)
+            print(f"{package} installed successfully")
+        else:
+            print(f"{package} is not installed (run `python setup.py --install` or `pip install '{package}'`)")
+    return startup.missing(required_packages) if install else missing
+
+def __getattr__(name):
+    # Import twsca (and with it scipy) only when one of its functions is used
+    if name in _TWSCA_NAMES:
+        return getattr(startup.require('twsca', 'twsca>=0.3.0'), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Define the smoothing and plotting extensions
 class Smoothing:
@@ -41,7 +53,7 @@ class Smoothing:
         Local Laplacian Transform (LLT) smoothing.
         If TWSCA package is available, uses its implementation,
         otherwise falls back to Savitzky-Golay filter.
-        
+
         Parameters:
         -----------
         data : array-like
@@ -51,12 +63,17 @@ class Smoothing:
         alpha : float, default=0.5
             In TWSCA 0.3.0, alpha must be between 0 and 1
         """
-        if use_built_in_llt:
+        try:
+            from twsca import llt_filter
+        except ImportError:
+            llt_filter = None
+        if llt_filter is not None:
             # Ensure alpha is in the valid range (0-1)
             clamped_alpha = min(max(alpha, 0.01), 0.99)
             return llt_filter(data, sigma=sigma, alpha=clamped_alpha)
         else:
             # Fallback to Savitzky-Golay filter
+            from scipy import signal
             window = int(len(data) * 0.1)  # 10% of data length
             if window % 2 == 0:
                 window += 1  # Make window odd
@@ -66,6 +83,7 @@ class Plotting:
     @staticmethod
     def setup_plotting_style():
         """Set up matplotlib plotting style for consistency."""
+        import matplotlib.pyplot as plt
         plt.style.use('default')  # Reset to default style
         plt.rcParams['figure.figsize'] = [12, 6]
         plt.rcParams['lines.linewidth'] = 2
@@ -76,9 +94,22 @@ class Plotting:
 twsca_smoothing = Smoothing()
 twsca_plotting = Plotting()
 
-# Setup plotting style
-twsca_plotting.setup_plotting_style()
-
 # Set random seed for reproducibility
 np.random.seed(42)
-print("Setup complete. Random seed set to 42.") 
\ No newline at end of file
+
+def main():
+    """Check the required packages and set up the plotting style."""
+    parser = argparse.ArgumentParser(description="Check the environment and set up plotting")
+    parser.add_argument("--install", action="store_true",
+                        help="pip install the required packages that are missing")
+    args, _ = parser.parse_known_args()
+
+    missing = check_packages(install=args.install)
+
+    # Setup plotting style
+    twsca_plotting.setup_plotting_style()
+    print("Setup complete. Random seed set to 42.")
+    return 1 if missing else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+twsca_tools
+Shared, performance-oriented building blocks for the TWSCA analysis scripts.
+
+The post scripts add the repository root to ``sys.path`` and import the
+submodules they need directly (e.g. ``from twsca_tools import windowed``),
+so this package intentionally keeps its own import cost close to zero.
+"""
@@ -0,0 +1,446 @@
+"""
+data_store.py
+Local store of downloaded bars that only fetches the date ranges it lacks.
+
+A store is the data directory of a download script: one CSV per ticker
+(``<TICKER>.csv`` for daily bars, ``<TICKER>_<interval>.csv`` otherwise, as
+LocalProvider expects) plus a manifest, ``.data_store.json``, that records
+the date ranges already requested for every ticker and interval:
+
+    {"version": 1,
+     "entries": {"GME|1d": {"ranges": [["2020-01-01", "2024-12-31"]],
+                            "size": ..., "mtime_ns": ...}}}
+
+Ranges are half-open [start, end) and count as covered once their request
+succeeded, even if they held no bars (weekends, holidays). ``refresh``
+fetches only the parts of the requested range that are not covered, the
+missing tail or gaps, and merges the new bars into the CSV in place; bars
+already stored are replaced by newly fetched ones with the same date.
+Coverage never extends past today, so a range ending in the future is
+topped up by the next refresh: a daily refresh with a later --end-date
+fetches one bar per ticker instead of the whole history.
+
+Yahoo Finance bars are split- and dividend-adjusted, and a new split or
+dividend re-adjusts the whole history. Each fetched gap therefore also
+re-fetches one stored bar next to it. If that bar no longer matches the
+stored row, or a new bar carries a split or dividend, the ticker is
+downloaded again in full. Otherwise the stored rows and the new rows could
+sit on different price bases, with a silent step where they meet.
+
+The CSV size/mtime are recorded like the sources of a price matrix. A CSV
+changed by something else loses its recorded coverage, and a CSV without
+an entry (e.g. from an older download) is taken to cover its first to
+last date.
+
+Two CSV layouts are written, matching the download scripts:
+
+    history     yfinance ``Ticker.history`` frame as is (post 2)
+    download    Price/Ticker/Date header rows with Close, High, Low, Open
+                and Volume and plain dates (post 1)
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from twsca_tools.fetcher import fetch_one
+from twsca_tools.price_matrix import csv_read_args, parse_date_labels
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = ".data_store.json"
+LAYOUTS = ("history", "download")
+DOWNLOAD_COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+# Provider columns announcing an adjustment of the earlier bars
+EVENT_COLUMNS = ['Stock Splits', 'Dividends']
+
+
+def _day(value):
+    """Date of a timestamp or date string, as a naive midnight Timestamp."""
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp.normalize()
+
+
+def merge_ranges(ranges):
+    """Union of [start, end) ranges, as a sorted list of disjoint ranges."""
+    merged = []
+    for start, end in sorted((_day(s), _day(e)) for s, e in ranges):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_ranges(start, end, covered):
+    """Parts of [start, end) not in the covered ranges, in date order."""
+    start, end = _day(start), _day(end)
+    missing = []
+    for covered_start, covered_end in merge_ranges(covered):
+        if covered_end <= start or covered_start >= end:
+            continue
+        if covered_start > start:
+            missing.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        missing.append((start, end))
+    return missing
+
+
+def _until_today(end):
+    """Exclusive end date, never past today."""
+    return min(_day(end), _day(pd.Timestamp.today()) + pd.Timedelta(days=1))
+
+
+def overlap_gaps(gaps, stored_days):
+    """
+    Extend missing ranges by one stored bar each, to check the price basis.
+
+    Each gap starts at the last stored bar before it instead; a gap with no
+    stored bar before it ends after the first stored bar following it.
+
+    Args:
+        gaps: (start, end) ranges from DataStore.missing
+        stored_days: Naive dates of the stored bars
+
+    Returns:
+        List of (start, end) ranges
+    """
+    stored_days = pd.DatetimeIndex(stored_days).sort_values()
+    extended = []
+    for start, end in gaps:
+        before = stored_days[stored_days < start]
+        after = stored_days[stored_days >= end]
+        if len(before):
+            start = before[-1]
+        elif len(after):
+            end = after[0] + pd.Timedelta(days=1)
+        extended.append((start, end))
+    return extended
+
+
+def rebase_reason(stored, frames, rtol=1e-6):
+    """
+    Why fetched bars are not on the price basis of the stored ones.
+
+    Args:
+        stored: Stored bars from DataStore.bars
+        frames: DataFrames returned by a provider for the overlapping gaps
+        rtol: Relative tolerance for comparing re-fetched closes
+
+    Returns:
+        Description of the first sign of a re-adjustment, or None
+    """
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        days = pd.DatetimeIndex(df.index)
+        if days.tz is not None:
+            days = days.tz_localize(None)
+        days = days.normalize()
+        known = days.isin(stored.index)
+        for column in EVENT_COLUMNS:
+            if column in df.columns:
+                events = pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy()
+                hits = days[~known & (events != 0)]
+                if len(hits):
+                    return f"{column.lower()} on {hits[0].strftime('%Y-%m-%d')}"
+        if known.any() and 'Close' in df.columns:
+            fetched = pd.to_numeric(df['Close'], errors='coerce').to_numpy()[known]
+            before = stored['Close'].reindex(days[known]).to_numpy()
+            if not np.allclose(fetched, before, rtol=rtol, atol=0, equal_nan=True):
+                return f"close of {days[known][0].strftime('%Y-%m-%d')} changed from " \
+                       f"{before[0]:g} to {fetched[0]:g}"
+    return None
+
+
+def _with_labels(df):
+    """Frame indexed by date labels as ``to_csv`` would write them."""
+    return df.set_axis(pd.Index(df.index.astype(str), name='Date'))
+
+
+def download_frame(df):
+    """Bars as written in the download layout: plain dates, fixed columns."""
+    out = df.reindex(columns=DOWNLOAD_COLUMNS)
+    index = pd.DatetimeIndex(out.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return out.set_axis(index.normalize().strftime('%Y-%m-%d').rename('Date'))
+
+
+def write_csv(df, path, layout, ticker):
+    """Write bars indexed by date labels in one of the LAYOUTS."""
+    out = df.copy()
+    out.index.name = 'Date'
+    if layout == "download":
+        out = out.reindex(columns=DOWNLOAD_COLUMNS)
+        out.columns = pd.MultiIndex.from_product([DOWNLOAD_COLUMNS, [ticker]],
+                                                 names=['Price', 'Ticker'])
+    out.to_csv(path)
+
+
+class DataStore:
+    """
+    Per-ticker CSV store of one data directory.
+
+    Args:
+        data_dir: Directory holding the CSVs and the manifest
+        layout: CSV layout, one of LAYOUTS
+    """
+
+    def __init__(self, data_dir, layout="history"):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}; expected one of {LAYOUTS}")
+        self.data_dir = data_dir
+        self.layout = layout
+        self.manifest_path = os.path.join(data_dir, MANIFEST_FILE)
+        self.entries = {}
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == FORMAT_VERSION:
+                self.entries = manifest['entries']
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def path(self, ticker, interval="1d"):
+        """CSV of one ticker and interval."""
+        filename = f"{ticker}.csv" if interval == "1d" else f"{ticker}_{interval}.csv"
+        return os.path.join(self.data_dir, filename)
+
+    def read(self, ticker, interval="1d"):
+        """Stored bars indexed by their date labels, or None if there is no CSV."""
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_csv(path, float_precision='round_trip', **csv_read_args(path))
+        df.index = df.index.astype(str)
+        df.index.name = 'Date'
+        return df
+
+    def bars(self, ticker, interval="1d", start=None, end=None):
+        """
+        Stored bars of one ticker for analysis.
+
+        Returns:
+            DataFrame with the stored columns, indexed by the naive date of
+            each bar (the exchange-local date, UTC offsets dropped) and
+            limited to [start, end), or None if there is no CSV
+        """
+        df = self.read(ticker, interval)
+        if df is None:
+            return None
+        df = df.set_axis(pd.DatetimeIndex(pd.to_datetime(df.index.str[:10]), name='Date'))
+        if start is not None:
+            df = df[df.index >= _day(start)]
+        if end is not None:
+            df = df[df.index < _day(end)]
+        return df.apply(pd.to_numeric, errors='coerce')
+
+    def coverage(self, ticker, interval="1d"):
+        """
+        Date ranges already requested for a ticker.
+
+        Returns:
+            Sorted list of disjoint (start, end) Timestamps, end exclusive
+        """
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return []
+        entry = self.entries.get(f"{ticker}|{interval}")
+        if entry is not None and entry.get('size') == os.path.getsize(path) \
+                and entry.get('mtime_ns') == os.stat(path).st_mtime_ns:
+            return merge_ranges(entry['ranges'])
+        # CSV without a (current) entry: assume it covers its own date span
+        df = self.read(ticker, interval)
+        if df is None or df.empty:
+            return []
+        dates = parse_date_labels(df.index)[0]
+        return [(_day(dates.min()), _day(dates.max()) + pd.Timedelta(days=1))]
+
+    def missing(self, ticker, start, end, interval="1d"):
+        """Parts of [start, end) that still have to be fetched, never past today."""
+        return subtract_ranges(start, _until_today(end), self.coverage(ticker, interval))
+
+    def merge(self, ticker, frames, ranges, interval="1d", replace=False):
+        """
+        Merge fetched bars into a ticker's CSV and record the ranges as covered.
+
+        Args:
+            ticker: Ticker symbol
+            frames: DataFrames returned by a provider (may be empty)
+            ranges: (start, end) ranges the frames were fetched for
+            interval: Bar interval
+            replace: Drop the stored bars and coverage first (kept if
+                nothing was fetched)
+
+        Returns:
+            Number of rows in the CSV afterwards
+        """
+        new = [download_frame(df) if self.layout == "download" else _with_labels(df)
+               for df in frames if df is not None and not df.empty]
+        path = self.path(ticker, interval)
+        covered = self.coverage(ticker, interval)
+        existing = self.read(ticker, interval)
+        if replace and new:
+            covered, existing = [], None
+        parts = ([existing] if existing is not None else []) + new
+        if parts:
+            combined = pd.concat(parts)
+            # One row per instant, newest fetch first; labels keep their text
+            stamps = parse_date_labels(combined.index)[0]
+            keep = ~stamps.duplicated(keep='last')
+            combined = combined[keep].iloc[stamps[keep].argsort(kind='stable')]
+            os.makedirs(self.data_dir, exist_ok=True)
+            tmp = f"{path}.tmp"
+            write_csv(combined, tmp, self.layout, ticker)
+            os.replace(tmp, path)
+            n_rows = len(combined)
+        else:
+            n_rows = 0
+
+        today = _day(pd.Timestamp.today())
+        fetched = [(start, min(_day(end), today)) for start, end in ranges]
+        if os.path.exists(path):
+            self.entries[f"{ticker}|{interval}"] = {
+                'ranges': [[start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')]
+                           for start, end in merge_ranges(covered + fetched)],
+                'size': os.path.getsize(path),
+                'mtime_ns': os.stat(path).st_mtime_ns,
+            }
+        return n_rows
+
+    def save(self):
+        """Write the manifest."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'version': FORMAT_VERSION, 'entries': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+
+def weekly_bars(frames, freq="W-MON"):
+    """
+    Weekly Close, Volume and Return of many tickers from their daily bars.
+
+    All tickers are stacked with one concat and aggregated by one groupby
+    on (ticker, week), so the cost grows linearly with the number of
+    tickers. Weeks are labeled by their first day, Monday, like yfinance's
+    "1wk" bars: Close is the last daily close of the week, Volume the sum
+    of the daily volumes and Return the change of Close from the ticker's
+    previous week.
+
+    Args:
+        frames: Dict of ticker -> daily bars as returned by DataStore.bars
+        freq: Weekly pandas frequency whose anchor starts a week
+
+    Returns:
+        DataFrame indexed by (ticker, date) with Close, Volume and Return
+    """
+    columns = ['Close', 'Volume', 'Return']
+    frames = {ticker: df[['Close', 'Volume']] for ticker, df in frames.items()
+              if df is not None and not df.empty}
+    if not frames:
+        return pd.DataFrame(columns=columns,
+                            index=pd.MultiIndex.from_arrays([[], []], names=['ticker', 'date']))
+
+    daily = pd.concat(frames, names=['ticker', 'date'])
+    weeks = daily.groupby([pd.Grouper(level='ticker'),
+                           pd.Grouper(level='date', freq=freq, label='left', closed='left')])
+    weekly = pd.DataFrame({
+        'Close': weeks['Close'].last(),
+        'Volume': weeks['Volume'].sum(min_count=1),
+    }).dropna(how='all')
+    weekly['Return'] = weekly.groupby(level='ticker')['Close'].pct_change()
+    return weekly[columns]
+
+
+def refresh(store, provider, tickers, start, end, interval="1d", max_workers=8, retries=3,
+            full=False, on_result=None, on_rebase=None):
+    """
+    Bring the store up to date for [start, end), fetching only what is missing.
+
+    Every missing range of every ticker is one request; requests run on a
+    bounded thread pool under the provider's rate limit, and each ticker is
+    merged as soon as all of its requests are done. Each request overlaps
+    the stored bars by one bar. A ticker whose prices were re-adjusted in
+    the meantime (see rebase_reason) is downloaded again in full, from the
+    start of its coverage or ``start``, whichever is earlier.
+
+    Args:
+        store: DataStore
+        provider: fetcher provider
+        tickers: Ticker symbols
+        start: First date (inclusive)
+        end: Last date (exclusive)
+        interval: Bar interval
+        max_workers: Requests in flight at most
+        retries: Retries per request with exponential backoff
+        full: Ignore recorded coverage and fetch the whole range again
+        on_result: Optional callable(ticker, n_fetched, n_rows) run after a
+            ticker is merged (n_fetched bars fetched, n_rows stored)
+        on_rebase: Optional callable(ticker, reason) run before a ticker is
+            downloaded again because its prices were re-adjusted
+
+    Returns:
+        Tuple of (dict ticker -> list of fetched (start, end) ranges, dict
+        ticker -> exception for tickers with a failed request). Tickers
+        that were already complete map to an empty list.
+    """
+    requests, stored = {}, {}
+    for ticker in tickers:
+        if full:
+            requests[ticker] = subtract_ranges(start, _until_today(end), [])
+            continue
+        requests[ticker] = store.missing(ticker, start, end, interval)
+        bars = store.bars(ticker, interval) if requests[ticker] else None
+        if bars is not None and not bars.empty:
+            stored[ticker] = bars
+            requests[ticker] = overlap_gaps(requests[ticker], bars.index)
+
+    fetched, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {ticker: [pool.submit(fetch_one, provider, ticker,
+                                        gap_start.strftime('%Y-%m-%d'),
+                                        gap_end.strftime('%Y-%m-%d'), interval, retries)
+                            for gap_start, gap_end in gaps]
+                   for ticker, gaps in requests.items()}
+        for ticker in tickers:
+            frames = []
+            for future in futures[ticker]:
+                try:
+                    frames.append(future.result())
+                except Exception as e:
+                    errors.setdefault(ticker, e)
+            if ticker in errors:
+                continue
+            replace = full
+            reason = rebase_reason(stored[ticker], frames) if ticker in stored else None
+            if reason is not None:
+                if on_rebase is not None:
+                    on_rebase(ticker, reason)
+                first = min([_day(start)] + [begin for begin, _ in store.coverage(ticker, interval)])
+                requests[ticker] = subtract_ranges(first, _until_today(end), [])
+                try:
+                    frames = [fetch_one(provider, ticker, first.strftime('%Y-%m-%d'),
+                                        _until_today(end).strftime('%Y-%m-%d'),
+                                        interval, retries)]
+                except Exception as e:
+                    errors[ticker] = e
+                    continue
+                replace = True
+            fetched[ticker] = requests[ticker]
+            if not requests[ticker]:
+                continue
+            n_fetched = sum(len(df) for df in frames if df is not None)
+            n_rows = store.merge(ticker, frames, requests[ticker], interval, replace=replace)
+            if on_result is not None:
+                on_result(ticker, n_fetched, n_rows)
+    store.save()
+    return fetched, errors
@@ -0,0 +1,488 @@
+"""
+dtw_kernels.py
+Vectorized Dynamic Time Warping kernels for the windowed TWSCA path.
+
+All kernels use the same definition as ``twsca.dtw_distance``: squared
+point-wise cost, steps (1, 0), (0, 1) and (1, 1), and the square root of the
+accumulated cost as the distance.
+
+Each row of the accumulated cost matrix is computed with whole-array NumPy
+operations rather than a Python loop over cells. The within-row dependency
+``D[i, j] = min(t[j], c[i, j] + D[i, j - 1])`` is resolved with a prefix
+sum and a running minimum, and the same recurrence runs over a leading
+batch dimension so many windows can be solved at once.
+
+A Sakoe-Chiba band (``radius``, the ``max_warp`` of the analysis scripts)
+limits each row to 2 * radius + 1 cells. Banded problems are stored in a
+diagonal layout, ``band[i, k]`` holding cell (i, i + k - radius), so both
+the point-wise costs and the recurrence only touch in-band cells and a
+window costs O(W * r) time and memory rather than O(W^2).
+
+For threshold screening, ``abandon_above`` first rejects pairs whose
+LB_Keogh bound exceeds the threshold and then stops the recurrence as soon
+as a whole row is above it.
+
+Tolerance: distances agree with ``twsca.dtw_distance`` to within 1e-9
+(relative); the prefix-sum formulation only changes rounding.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+
+def _band(i, m, radius):
+    """Column range [lo, hi) of row i inside a Sakoe-Chiba band."""
+    if radius is None:
+        return 0, m
+    return max(0, i - radius), min(m, i + radius + 1)
+
+
+def _step(prev, row, lo, hi):
+    """
+    Advance the accumulated cost by one row, restricted to columns [lo, hi).
+
+    Args:
+        prev: Previous accumulated row, shape (..., m + 1), column 0 is the
+            boundary
+        row: Point-wise costs of the current row, shape (..., m)
+        lo: First in-band column (0-based)
+        hi: One past the last in-band column
+
+    Returns:
+        Current accumulated row, shape (..., m + 1)
+    """
+    cur = np.full_like(prev, np.inf)
+    if lo >= hi:
+        return cur
+    segment = row[..., lo:hi]
+    # Best of the diagonal and vertical predecessors
+    through = segment + np.minimum(prev[..., lo + 1:hi + 1], prev[..., lo:hi])
+    # Fold in horizontal moves: D[j] = P[j] + min_{k<=j}(through[k] - P[k])
+    prefix = np.cumsum(segment, axis=-1)
+    cur[..., lo + 1:hi + 1] = prefix + np.minimum.accumulate(through - prefix, axis=-1)
+    return cur
+
+
+def _accumulate(cost, radius=None, abandon_above=None):
+    """
+    Accumulated DTW cost for a batch of local cost matrices.
+
+    Args:
+        cost: Array of shape (..., n, m) with squared point-wise costs
+        radius: Sakoe-Chiba band radius (None for no band)
+        abandon_above: Distance threshold; a matrix is abandoned (result
+            inf) as soon as every cell of a row exceeds it, and any final
+            cost above it is also reported as inf
+
+    Returns:
+        Array of shape (...) with the accumulated cost D[n, m]
+    """
+    batch_shape = cost.shape[:-2]
+    n, m = cost.shape[-2:]
+    cost = cost.reshape((-1, n, m))
+
+    limit = None if abandon_above is None else abandon_above ** 2
+    n_total = cost.shape[0]
+    active = np.arange(n_total)
+    prev = np.full((cost.shape[0], m + 1), np.inf)
+    prev[:, 0] = 0.0
+    for i in range(n):
+        lo, hi = _band(i, m, radius)
+        prev = _step(prev, cost[:, i, :], lo, hi)
+        if limit is not None:
+            # Accumulated costs never decrease along a path, so the row
+            # minimum is a lower bound on the final cost
+            keep = prev.min(axis=1) <= limit
+            if not keep.all():
+                active, prev, cost = active[keep], prev[keep], cost[keep]
+                if len(active) == 0:
+                    break
+
+    final = prev[:, -1]
+    if limit is not None:
+        final = np.where(final <= limit, final, np.inf)
+    result = np.full(n_total, np.inf)
+    result[active] = final
+    return result.reshape(batch_shape)
+
+
+def _use_band(m, radius):
+    """True if the diagonal band layout is narrower than full rows of m columns."""
+    return radius is not None and 2 * radius + 1 < m
+
+
+def _band_costs(x, y, radius):
+    """
+    Squared point-wise costs of the in-band cells in diagonal layout.
+
+    Args:
+        x: Series of shape (..., n)
+        y: Series of shape (..., m)
+        radius: Sakoe-Chiba band radius
+
+    Returns:
+        Array of shape (..., n, 2 * radius + 1) with entry [i, k] the cost
+        of cell (i, i + k - radius); NaN where that column is outside y
+    """
+    n, m = x.shape[-1], y.shape[-1]
+    width = 2 * radius + 1
+    pad = [(0, 0)] * (y.ndim - 1) + [(radius, max(0, n + radius - m))]
+    y_pad = np.pad(y, pad, constant_values=np.nan)
+    diagonals = sliding_window_view(y_pad, width, axis=-1)[..., :n, :]
+    return (x[..., :, None] - diagonals) ** 2
+
+
+def _accumulate_band(cost, m, radius, abandon_above=None):
+    """
+    Accumulated DTW cost for a batch of banded local cost matrices.
+
+    The banded counterpart of ``_accumulate``: cell (i, j) lives at
+    position k = j - i + radius of row i, so its diagonal predecessor is
+    at k and its vertical predecessor at k + 1 of the previous row, and
+    its horizontal predecessor at k - 1 of the same row.
+
+    Args:
+        cost: Array of shape (..., n, 2 * radius + 1) from _band_costs
+            (entries outside the m columns are ignored)
+        m: Number of columns of the full problem
+        radius: Sakoe-Chiba band radius
+        abandon_above: As for _accumulate
+
+    Returns:
+        Array of shape (...) with the accumulated cost D[n, m]
+    """
+    batch_shape = cost.shape[:-2]
+    n, width = cost.shape[-2:]
+    cost = cost.reshape((-1, n, width))
+    columns = np.arange(n)[:, None] + np.arange(width)[None, :] - radius
+    valid = (columns >= 0) & (columns < m)
+
+    limit = None if abandon_above is None else abandon_above ** 2
+    n_total = cost.shape[0]
+    active = np.arange(n_total)
+    # One spare inf column so the vertical predecessor of the last position exists
+    prev = np.full((n_total, width + 1), np.inf)
+    prev[:, radius] = 0.0  # D[-1, -1]: the start of every path
+    for i in range(n):
+        in_band = valid[i]
+        row = np.where(in_band, cost[:, i, :], 0.0)
+        through = np.where(in_band, row + np.minimum(prev[:, :width], prev[:, 1:]), np.inf)
+        # Fold in horizontal moves with the same prefix-sum trick as _step
+        prefix = np.cumsum(row, axis=-1)
+        cur = np.full_like(prev, np.inf)
+        cur[:, :width] = np.where(
+            in_band, prefix + np.minimum.accumulate(through - prefix, axis=-1), np.inf)
+        prev = cur
+        if limit is not None:
+            keep = prev.min(axis=1) <= limit
+            if not keep.all():
+                active, prev, cost = active[keep], prev[keep], cost[keep]
+                if len(active) == 0:
+                    break
+
+    last = m - n + radius  # position of cell (n - 1, m - 1)
+    final = prev[:, last] if 0 <= last < width else np.full(len(active), np.inf)
+    if limit is not None:
+        final = np.where(final <= limit, final, np.inf)
+    result = np.full(n_total, np.inf)
+    result[active] = final
+    return result.reshape(batch_shape)
+
+
+def lb_keogh(s1, s2, radius=None):
+    """
+    LB_Keogh lower bound on the banded DTW distance of equal-length series.
+
+    Args:
+        s1: Query series, shape (..., n)
+        s2: Candidate series, shape (..., n)
+        radius: Sakoe-Chiba band radius (None for no band)
+
+    Returns:
+        Lower bound(s) on the DTW distance, shape (...)
+    """
+    s1 = np.asarray(s1, dtype=float)
+    s2 = np.asarray(s2, dtype=float)
+    n = s2.shape[-1]
+    r = n - 1 if radius is None else min(radius, n - 1)
+    pad = [(0, 0)] * (s2.ndim - 1) + [(r, r)]
+    upper = sliding_window_view(np.pad(s2, pad, constant_values=-np.inf),
+                                2 * r + 1, axis=-1).max(axis=-1)
+    lower = sliding_window_view(np.pad(s2, pad, constant_values=np.inf),
+                                2 * r + 1, axis=-1).min(axis=-1)
+    excess = np.where(s1 > upper, s1 - upper, np.where(s1 < lower, lower - s1, 0.0))
+    return np.sqrt(np.sum(excess ** 2, axis=-1))
+
+
+def _backtrack(acc):
+    """
+    Warping path from a full accumulated cost matrix.
+
+    Mirrors the backtracking of ``twsca.dtw_distance`` (including its tie
+    order) so aligned series match ``twsca.compute_twsca``.
+    """
+    path = []
+    i, j = acc.shape[0] - 1, acc.shape[1] - 1
+    while i > 0 and j > 0:
+        path.append((i - 1, j - 1))
+        min_cost = min(acc[i - 1, j - 1], acc[i - 1, j], acc[i, j - 1])
+        if min_cost == acc[i - 1, j - 1]:
+            i, j = i - 1, j - 1
+        elif min_cost == acc[i - 1, j]:
+            i = i - 1
+        else:
+            j = j - 1
+    path.append((0, 0))
+    path.reverse()
+    return np.array(path)
+
+
+def dtw_distance(s1, s2, radius=None, abandon_above=None, return_path=False):
+    """
+    Band-constrained DTW distance with LB_Keogh pruning and early abandoning.
+
+    Cost is O(n * radius) time and memory instead of O(n * m) when a band
+    is given (the warping path needs the full matrix, though). With
+    ``abandon_above`` set, equal-length pairs are first screened with
+    LB_Keogh and the recurrence stops as soon as the threshold can no
+    longer be met; abandoned pairs return ``inf``.
+
+    Args:
+        s1: First series
+        s2: Second series
+        radius: Sakoe-Chiba band radius, e.g. ``max_warp`` (None for no band)
+        abandon_above: Only distances at or below this value are resolved
+        return_path: Also return the warping path (disables abandoning)
+
+    Returns:
+        DTW distance as a float, or (distance, path) if return_path is set
+    """
+    s1 = np.asarray(s1, dtype=float)
+    s2 = np.asarray(s2, dtype=float)
+    if len(s1) == 0 or len(s2) == 0:
+        raise ValueError("Empty sequences are not allowed for DTW computation")
+
+    if return_path:
+        cost = (s1[:, None] - s2[None, :]) ** 2
+        acc = np.empty((len(s1) + 1, len(s2) + 1))
+        acc[0] = np.inf
+        acc[0, 0] = 0.0
+        for i in range(len(s1)):
+            acc[i + 1] = _step(acc[i], cost[i], *_band(i, len(s2), radius))
+        return float(np.sqrt(acc[-1, -1])), _backtrack(acc)
+
+    if (abandon_above is not None and len(s1) == len(s2)
+            and lb_keogh(s1, s2, radius) > abandon_above):
+        return np.inf
+    if _use_band(len(s2), radius):
+        return float(np.sqrt(_accumulate_band(_band_costs(s1, s2, radius), len(s2),
+                                              radius, abandon_above)))
+    cost = (s1[:, None] - s2[None, :]) ** 2
+    return float(np.sqrt(_accumulate(cost, radius, abandon_above)))
+
+
+def _window_costs(x, y, window, start, stop, radius=None):
+    """
+    Local cost matrices of windows ``start..stop-1`` as a strided view.
+
+    The point-wise costs are computed once into a diagonal strip
+    ``strip[a, d] = (x[a] - y[a + d])**2``; the cost matrix of window k+1
+    is then window k's matrix shifted by one sample along the diagonal, so
+    every window is a zero-copy view into the same strip. With a radius
+    the strip only holds the offsets |d| <= radius and the views are the
+    banded matrices of _accumulate_band, shape (stop - start, window,
+    2 * radius + 1); otherwise they are full (stop - start, window, window)
+    matrices.
+    """
+    span = stop - start + window - 1
+    reach = window - 1 if radius is None else radius
+    xs = x[start:start + span]
+    # Pad y so every diagonal offset in [-reach, reach] is addressable
+    y_pad = np.full(span + 2 * reach, np.nan)
+    y_pad[reach:reach + span] = y[start:start + span]
+    offsets = np.arange(2 * reach + 1)
+    strip = (xs[:, None] - y_pad[np.arange(span)[:, None] + offsets[None, :]]) ** 2
+
+    s0, s1 = strip.strides
+    if radius is not None:
+        # Row i of window w is strip row w + i, the same offsets throughout
+        return as_strided(strip, shape=(stop - start, window, 2 * radius + 1),
+                          strides=(s0, s0, s1), writeable=False)
+    base = strip[:, window - 1:]
+    return as_strided(base, shape=(stop - start, window, window),
+                      strides=(s0, s0 - s1, s1), writeable=False)
+
+
+def rolling_dtw_distances(x, y, window, radius=None, abandon_above=None,
+                          block_size=512):
+    """
+    DTW distance of every sliding window of two aligned series.
+
+    Uses the same window convention as ``twsca_tools.windowed``: window k
+    covers samples [k, k + window) and there are len(x) - window windows.
+    Consecutive windows share their point-wise costs (see ``_window_costs``)
+    and blocks of windows are solved together by the batched recurrence.
+
+    With ``abandon_above`` set, windows whose LB_Keogh bound already exceeds
+    the threshold are skipped, the rest are abandoned as soon as they cannot
+    finish under it; both come back as ``inf``.
+
+    Args:
+        x: First normalized series
+        y: Second normalized series (same length as x)
+        window: Window length in samples
+        radius: Sakoe-Chiba band radius, e.g. ``max_warp`` (None for no band)
+        abandon_above: Only distances at or below this value are resolved
+        block_size: Number of windows solved per batch (bounds memory)
+
+    Returns:
+        Array of len(x) - window distances
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n_windows = len(x) - window
+    if n_windows <= 0:
+        return np.empty(0)
+
+    band = _use_band(window, radius)
+
+    def accumulate(costs, limit=None):
+        if band:
+            return _accumulate_band(costs, window, radius, limit)
+        return _accumulate(costs, radius, limit)
+
+    distances = np.empty(n_windows)
+    for start in range(0, n_windows, block_size):
+        stop = min(start + block_size, n_windows)
+        costs = _window_costs(x, y, window, start, stop, radius if band else None)
+        if abandon_above is None:
+            distances[start:stop] = np.sqrt(accumulate(costs))
+            continue
+
+        windows_x = sliding_window_view(x, window)[start:stop]
+        windows_y = sliding_window_view(y, window)[start:stop]
+        candidates = lb_keogh(windows_x, windows_y, radius) <= abandon_above
+        block = np.full(stop - start, np.inf)
+        if candidates.any():
+            block[candidates] = np.sqrt(accumulate(costs[candidates], abandon_above))
+        distances[start:stop] = block
+    return distances
+
+
+def dtw_distances(windows_x, windows_y, radius=None, abandon_above=None,
+                  block_size=None):
+    """
+    DTW distances of a stack of independent, equal-length window pairs.
+
+    Unlike ``rolling_dtw_distances`` the windows need not overlap (e.g.
+    windows normalized one by one), so no point-wise costs are shared; each
+    block builds its own (block, window, window) cost array.
+
+    Args:
+        windows_x: Array of shape (n_windows, window)
+        windows_y: Array of shape (n_windows, window)
+        radius: Sakoe-Chiba band radius (None for no band)
+        abandon_above: Only distances at or below this value are resolved
+        block_size: Number of windows solved per batch; memory is about
+            block_size * window * width * 8 bytes, width being window, or
+            2 * radius + 1 with a narrower band (default: as many as fit
+            in 64 MiB)
+
+    Returns:
+        Array of n_windows distances
+    """
+    windows_x = np.asarray(windows_x, dtype=float)
+    windows_y = np.asarray(windows_y, dtype=float)
+    distances = np.full(len(windows_x), np.inf)
+    window = windows_x.shape[1]
+    band = _use_band(window, radius)
+    if block_size is None:
+        width = 2 * radius + 1 if band else window
+        block_size = max(1, (64 * 2**20) // (8 * window * width))
+    for start in range(0, len(windows_x), block_size):
+        wx = windows_x[start:start + block_size]
+        wy = windows_y[start:start + block_size]
+        candidates = np.ones(len(wx), dtype=bool)
+        if abandon_above is not None:
+            candidates = lb_keogh(wx, wy, radius) <= abandon_above
+            if not candidates.any():
+                continue
+            wx, wy = wx[candidates], wy[candidates]
+        block = distances[start:start + block_size]
+        if band:
+            block[candidates] = np.sqrt(_accumulate_band(
+                _band_costs(wx, wy, radius), window, radius, abandon_above))
+        else:
+            costs = (wx[:, :, None] - wy[:, None, :]) ** 2
+            block[candidates] = np.sqrt(_accumulate(costs, radius, abandon_above))
+    return distances
+
+
+class RollingDTW:
+    """
+    Stateful DTW over a sliding window, updated one sample at a time.
+
+    The local cost matrix of the previous window is kept and shifted by one
+    sample on every update, so only one new row and one new column
+    (2 * window - 1 point-wise costs, or 2 * radius + 1 with a band, whose
+    matrix is kept in the diagonal layout) are computed per step. The
+    optional band and abandoning threshold behave as in ``dtw_distance``.
+
+    Example:
+        >>> rolling = RollingDTW(window=30)
+        >>> for a, b in zip(x, y):
+        ...     dist = rolling.update(a, b)  # None until the window is full
+    """
+
+    def __init__(self, window, radius=None, abandon_above=None):
+        self.window = window
+        self.radius = radius
+        self.abandon_above = abandon_above
+        self._x = np.zeros(window)
+        self._y = np.zeros(window)
+        self._band = _use_band(window, radius)
+        width = 2 * radius + 1 if self._band else window
+        self._cost = np.zeros((window, width))
+        self._count = 0
+
+    @property
+    def ready(self):
+        """True once a full window of samples has been seen."""
+        return self._count >= self.window
+
+    def update(self, x_new, y_new):
+        """
+        Slide the window by one sample.
+
+        Args:
+            x_new: Newest sample of the first series
+            y_new: Newest sample of the second series
+
+        Returns:
+            DTW distance of the current window, or None until it is full
+        """
+        self._x[:-1] = self._x[1:]
+        self._y[:-1] = self._y[1:]
+        self._x[-1] = x_new
+        self._y[-1] = y_new
+
+        if self._band:
+            # A diagonal keeps its offset when both series shift by one
+            r = self.radius
+            self._cost[:-1] = self._cost[1:]
+            self._cost[-1, :r + 1] = (x_new - self._y[-r - 1:]) ** 2
+            back = np.arange(r + 1)
+            rows = self.window - 1 - back
+            self._cost[rows, r + back] = (self._x[rows] - y_new) ** 2
+        else:
+            self._cost[:-1, :-1] = self._cost[1:, 1:]
+            self._cost[-1, :] = (x_new - self._y) ** 2
+            self._cost[:, -1] = (self._x - y_new) ** 2
+
+        self._count += 1
+        if not self.ready:
+            return None
+        if self._band:
+            return float(np.sqrt(_accumulate_band(self._cost, self.window, self.radius,
+                                                  self.abandon_above)))
+        return float(np.sqrt(_accumulate(self._cost, self.radius, self.abandon_above)))
@@ -0,0 +1,328 @@
+"""
+fetcher.py
+Concurrent market-data fetcher shared by the download scripts.
+
+Requests go through a small provider interface, so the same code can pull
+from Yahoo Finance or from a local/HTTP stand-in:
+
+    YFinanceProvider   yfinance ``Ticker.history`` (needs yfinance)
+    LocalProvider      ``<TICKER>.csv`` files from a directory or an HTTP(S)
+                       base URL, in either repository CSV layout, with an
+                       optional simulated round-trip latency
+
+``fetch_many`` runs the requests on a bounded thread pool. Each provider
+carries a token-bucket ``RateLimiter``, so throughput is capped by the
+provider's rate limit rather than by serial round-trips, and failed
+requests are retried with exponential backoff. Every provider returns a
+DataFrame with a DatetimeIndex named 'Date' and at least the Open, High,
+Low, Close and Volume columns; twsca_tools.data_store writes it in the CSV
+layout of each script.
+
+Throughput can be measured offline against a directory of CSVs:
+
+    python -m twsca_tools.fetcher --provider local --source posts/post_2_batons_and_traps/data --latency 0.2 --workers 32
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from twsca_tools.price_matrix import layout_read_args, parse_date_labels
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate: Requests per second (None for no limit)
+        burst: Requests that may be issued back to back
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be issued."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Provider:
+    """
+    Source of daily or weekly bars.
+
+    Subclasses implement ``fetch``; the limiter is shared by every request
+    made through one provider instance.
+
+    Args:
+        rate_limit: Requests per second (None for no limit)
+        burst: Requests that may be issued back to back
+    """
+
+    name = "provider"
+
+    def __init__(self, rate_limit=None, burst=1):
+        self.limiter = RateLimiter(rate_limit, burst)
+
+    def fetch(self, ticker, start, end, interval="1d"):
+        """
+        Bars of one ticker in [start, end).
+
+        Returns:
+            DataFrame indexed by 'Date' (empty if there is no data)
+        """
+        raise NotImplementedError
+
+
+class YFinanceProvider(Provider):
+    """Yahoo Finance through yfinance's ``Ticker.history``."""
+
+    name = "yfinance"
+
+    def __init__(self, rate_limit=2.0, burst=4):
+        super().__init__(rate_limit, burst)
+
+    def fetch(self, ticker, start, end, interval="1d"):
+        import yfinance as yf
+
+        # A range without any bars (a weekend, a holiday) is not an error
+        no_bars = getattr(getattr(yf, 'exceptions', None), 'YFPricesMissingError', ())
+        try:
+            df = yf.Ticker(ticker).history(start=start, end=end, interval=interval,
+                                           raise_errors=True)
+        except no_bars:
+            return pd.DataFrame()
+        df.index.name = 'Date'
+        return df
+
+
+class LocalProvider(Provider):
+    """
+    Stand-in provider serving ``<TICKER>.csv`` files.
+
+    Daily bars come from ``<source>/<TICKER>.csv``, other intervals from
+    ``<source>/<TICKER>_<interval>.csv``. Both CSV layouts of the repository
+    are understood. Dates with UTC offsets are returned in `tz`, as
+    yfinance returns them in the exchange's time zone.
+
+    Args:
+        source: Directory or HTTP(S) base URL
+        latency: Seconds slept per request to simulate a network round trip
+        tz: Time zone for offset-aware dates
+        rate_limit: Requests per second (None for no limit)
+        burst: Requests that may be issued back to back
+    """
+
+    name = "local"
+
+    def __init__(self, source, latency=0.0, tz="America/New_York", rate_limit=None, burst=1):
+        super().__init__(rate_limit, burst)
+        self.source = source
+        self.latency = latency
+        self.tz = tz
+
+    def _location(self, ticker, interval):
+        filename = f"{ticker}.csv" if interval == "1d" else f"{ticker}_{interval}.csv"
+        if self.source.startswith(("http://", "https://")):
+            return f"{self.source.rstrip('/')}/{filename}"
+        return os.path.join(self.source, filename)
+
+    def _read_text(self, location):
+        if location.startswith(("http://", "https://")):
+            try:
+                with urllib.request.urlopen(location, timeout=30) as response:
+                    return response.read().decode('utf-8')
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    return None
+                raise
+        if not os.path.exists(location):
+            return None
+        with open(location) as f:
+            return f.read()
+
+    def fetch(self, ticker, start, end, interval="1d"):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._read_text(self._location(ticker, interval))
+        if text is None:
+            return pd.DataFrame()
+        lines = text.split('\n', 2) + ['']
+        df = pd.read_csv(io.StringIO(text), float_precision='round_trip',
+                         **layout_read_args(lines[0], lines[1]))
+        df.index, utc = parse_date_labels(df.index)
+        bounds = [pd.Timestamp(start), pd.Timestamp(end)]
+        if utc:
+            df.index = df.index.tz_convert(self.tz)
+            bounds = [b.tz_localize(self.tz) for b in bounds]
+        df.index.name = 'Date'
+        df = df.apply(pd.to_numeric, errors='coerce').sort_index()
+        return df[(df.index >= bounds[0]) & (df.index < bounds[1])]
+
+
+def fetch_one(provider, ticker, start, end, interval="1d", retries=3, backoff=1.0):
+    """
+    Fetch one ticker, retrying failed requests with exponential backoff.
+
+    An empty result is not an error and is not retried.
+
+    Args:
+        provider: Provider instance
+        ticker: Ticker symbol
+        start: First date (inclusive)
+        end: Last date (exclusive)
+        interval: Bar interval, e.g. '1d' or '1wk'
+        retries: Extra attempts after a failure
+        backoff: Delay before the first retry in seconds; doubled per retry
+            (plus up to 100% jitter)
+
+    Returns:
+        DataFrame of bars (possibly empty)
+    """
+    for attempt in range(retries + 1):
+        provider.limiter.acquire()
+        try:
+            return provider.fetch(ticker, start, end, interval)
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            time.sleep(delay + random.uniform(0, delay))
+
+
+def fetch_many(provider, tickers, start, end, interval="1d", max_workers=8, retries=3,
+               backoff=1.0, on_result=None):
+    """
+    Fetch many tickers concurrently.
+
+    Args:
+        provider: Provider instance (its limiter caps the request rate)
+        tickers: Ticker symbols
+        start: First date (inclusive)
+        end: Last date (exclusive)
+        interval: Bar interval, e.g. '1d' or '1wk'
+        max_workers: Requests in flight at most
+        retries: Extra attempts per ticker after a failure
+        backoff: Delay before the first retry in seconds
+        on_result: Optional callable(ticker, DataFrame) run in the calling
+            thread as results arrive, in ticker order (e.g. to write files)
+
+    Returns:
+        Tuple of (dict ticker -> DataFrame for tickers with data, dict
+        ticker -> exception for tickers that failed after all retries),
+        both in ticker order
+    """
+    frames, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [(ticker, pool.submit(fetch_one, provider, ticker, start, end, interval,
+                                        retries, backoff))
+                   for ticker in tickers]
+        for ticker, future in futures:
+            try:
+                df = future.result()
+            except Exception as e:
+                errors[ticker] = e
+                continue
+            if df is None or df.empty:
+                continue
+            frames[ticker] = df
+            if on_result is not None:
+                on_result(ticker, df)
+    return frames, errors
+
+
+def parse_tickers(value):
+    """Tickers from a comma-separated list or from @file (one per line or comma-separated)."""
+    if value.startswith('@'):
+        with open(value[1:]) as f:
+            value = f.read().replace('\n', ',')
+    return [ticker.strip() for ticker in value.split(',') if ticker.strip()]
+
+
+def add_fetch_arguments(parser):
+    """Add the provider and concurrency options shared by the download scripts."""
+    parser.add_argument("--provider", type=str, default="yfinance", choices=["yfinance", "local"],
+                        help="Data provider ('local' serves CSVs from --source)")
+    parser.add_argument("--source", type=str, default=None,
+                        help="Directory or HTTP(S) base URL for --provider local")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Concurrent requests (default: 8)")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Requests per second (default: 2 for yfinance, unlimited for local)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries per ticker with exponential backoff (default: 3)")
+
+
+def provider_from_args(args, latency=0.0):
+    """Build the provider selected by add_fetch_arguments options."""
+    if args.provider == "local":
+        if not args.source:
+            raise SystemExit("--provider local needs --source")
+        return LocalProvider(args.source, latency=latency, rate_limit=args.rate_limit,
+                             burst=max(1, args.workers))
+    if args.rate_limit:
+        return YFinanceProvider(rate_limit=args.rate_limit)
+    return YFinanceProvider()
+
+
+def main():
+    """Measure fetch throughput against a provider."""
+    parser = argparse.ArgumentParser(description="Fetch a ticker universe and report throughput")
+    add_fetch_arguments(parser)
+    parser.add_argument("--tickers", type=str, default=None,
+                        help="Comma-separated tickers or @file (default: every CSV in --source)")
+    parser.add_argument("--start-date", type=str, default="2020-01-01")
+    parser.add_argument("--end-date", type=str, default="2025-01-01")
+    parser.add_argument("--interval", type=str, default="1d")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated seconds per request for --provider local")
+    args = parser.parse_args()
+
+    if args.tickers:
+        tickers = parse_tickers(args.tickers)
+    elif args.source and not args.source.startswith(("http://", "https://")):
+        tickers = sorted(name[:-4] for name in os.listdir(args.source)
+                         if name.endswith('.csv') and '_' not in name)
+    else:
+        parser.error("--tickers is required")
+
+    provider = provider_from_args(args, latency=args.latency)
+    start = time.perf_counter()
+    frames, errors = fetch_many(provider, tickers, args.start_date, args.end_date,
+                                interval=args.interval, max_workers=args.workers,
+                                retries=args.retries)
+    elapsed = time.perf_counter() - start
+    rows = sum(len(df) for df in frames.values())
+    print(f"Fetched {len(frames)}/{len(tickers)} tickers ({rows} rows) from {provider.name} "
+          f"in {elapsed:.2f} s ({len(tickers) / elapsed:.1f} tickers/s)")
+    for ticker, error in errors.items():
+        print(f"  {ticker}: {error}")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
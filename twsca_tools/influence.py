@@ -0,0 +1,199 @@
+"""
+influence.py
+Rolling influence series of the Streamlit dashboard (extras/streamlit-twsca.py).
+
+Given the weekly returns table of the dashboard (a 'date' column plus one
+'<TICKER>_Return' column per ticker), these functions compute
+
+- the rolling correlation of every ticker's returns with the main ticker's,
+- the baton handoff: the ticker with the largest absolute correlation in
+  each window, and
+- the correlation entropy: how evenly influence is spread across tickers.
+
+They are kept free of Streamlit so the same code can be benchmarked and
+reused outside the dashboard. ``top_influencer`` and ``shannon_entropy``
+are the plain-array kernels behind the last two, for callers with their own
+influence scores.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Relative variance below which a window counts as constant
+_FLAT_TOLERANCE = 1e-12
+
+
+def _window_sums(values, window):
+    """Sum of every `window`-row block of a 2-D array, via cumulative sums."""
+    cumulative = np.zeros((values.shape[0] + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    return cumulative[window:] - cumulative[:-window]
+
+
+def _centered(values, valid):
+    """Subtract the per-column mean over `valid` rows; invalid entries become 0."""
+    counts = valid.sum(axis=0)
+    means = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    return np.where(valid, values - means, 0.0)
+
+
+def rolling_correlations(df_returns, window, main_col="GME_Return"):
+    """
+    Rolling correlation of every return column with the main ticker's.
+
+    All windows and tickers are computed in one pass from rolling moments:
+    cumulative sums of the pairwise-complete count, sums, squares and cross
+    products give every window's Pearson correlation without slicing. A
+    pair uses the rows where both returns are present and needs at least 2
+    such rows, as with dropna + np.corrcoef per window. Data are centered
+    on their column means first so the cumulative sums stay well
+    conditioned; results agree with np.corrcoef to about 1e-8 even for
+    2-point windows. Cost is linear in rows x tickers, so hundreds of
+    tickers of daily bars take milliseconds.
+
+    Args:
+        df_returns: DataFrame with a 'date' column and '<TICKER>_Return' columns
+        window: Window length in rows (weeks)
+        main_col: Return column of the main ticker
+
+    Returns:
+        DataFrame indexed by 'Week Ending' (date of the window's last row)
+        with one column per other ticker; empty if no window fits
+    """
+    other_return_cols = [col for col in df_returns.columns if col != "date" and col != main_col]
+    n_windows = len(df_returns) - window + 1
+    if not other_return_cols or main_col not in df_returns.columns or n_windows <= 0:
+        return pd.DataFrame()
+
+    x = df_returns[main_col].to_numpy(dtype=float)[:, None]
+    y = df_returns[other_return_cols].to_numpy(dtype=float)
+
+    # Pairwise-complete observations, missing entries zeroed
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x_centered = _centered(x, valid)
+    y_centered = _centered(y, valid)
+
+    count = _window_sums(valid.astype(float), window)
+    sum_x = _window_sums(x_centered, window)
+    sum_y = _window_sums(y_centered, window)
+    sum_xx = _window_sums(x_centered ** 2, window)
+    sum_yy = _window_sums(y_centered ** 2, window)
+    cov = _window_sums(x_centered * y_centered, window) * count - sum_x * sum_y
+    var_x = sum_xx * count - sum_x ** 2
+    var_y = sum_yy * count - sum_y ** 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+    # Fewer than 2 points, or a series that is constant in the window (up to
+    # the cancellation error of the differenced sums): undefined
+    flat_x = var_x <= _FLAT_TOLERANCE * sum_xx * count
+    flat_y = var_y <= _FLAT_TOLERANCE * sum_yy * count
+    corr[(count < 2) | flat_x | flat_y] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+
+    columns = [col.replace('_Return', '') for col in other_return_cols]
+    index = pd.Index(df_returns["date"].iloc[window - 1:], name="Week Ending")
+    return pd.DataFrame(corr, index=index, columns=columns)
+
+
+def top_influencer(values):
+    """
+    Column with the largest absolute value in every row, ignoring NaN.
+
+    The array counterpart of ``abs().idxmax(axis=1)`` after a per-row
+    dropna: ties go to the first column, and rows without any value get
+    position -1.
+
+    Args:
+        values: Array (n_rows, n_columns) of correlations or influence scores
+
+    Returns:
+        Tuple of (positions, signed values at those positions, NaN where
+        the position is -1)
+    """
+    values = np.asarray(values, dtype=float)
+    if values.shape[1] == 0:
+        return np.full(len(values), -1), np.full(len(values), np.nan)
+    magnitude = np.abs(values)
+    missing = np.isnan(magnitude)
+    magnitude[missing] = -np.inf
+    positions = magnitude.argmax(axis=1)
+    picked = values[np.arange(len(values)), positions]
+    empty = missing.all(axis=1)
+    return np.where(empty, -1, positions), np.where(empty, np.nan, picked)
+
+
+def shannon_entropy(weights, min_weight=1e-9):
+    """
+    Shannon entropy (base 2) of every row's absolute weights.
+
+    NaN counts as 0. Each row is normalized to a distribution, entries at
+    or below `min_weight` are dropped and the rest renormalized, matching
+    ``scipy.stats.entropy(row[row > min_weight], base=2)``.
+
+    Args:
+        weights: Array (n_rows, n_columns)
+        min_weight: Rows summing to at most this, and normalized entries at
+            most this, are treated as empty
+
+    Returns:
+        Array (n_rows,) of entropies, NaN for empty rows
+    """
+    weights = np.nan_to_num(np.abs(np.asarray(weights, dtype=float)), nan=0.0)
+    totals = weights.sum(axis=1)
+    valid = totals > min_weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = weights / totals[:, None]
+        p = np.where(p > min_weight, p, 0.0)
+        p /= p.sum(axis=1, keepdims=True)
+        terms = np.where(p > 0, p * np.log2(p), 0.0)
+    return np.where(valid, -terms.sum(axis=1), np.nan)
+
+
+def baton_handoff(rolling_corr_df):
+    """
+    Top influencer (largest absolute correlation) of every window.
+
+    Args:
+        rolling_corr_df: Output of rolling_correlations
+
+    Returns:
+        DataFrame indexed by 'Week Ending' with 'Top Influencer' ("N/A" for
+        windows without any correlation) and its signed 'Correlation'
+    """
+    if rolling_corr_df.empty or len(rolling_corr_df.columns) == 0:
+        return pd.DataFrame(columns=["Top Influencer", "Correlation"])
+
+    positions, correlations = top_influencer(rolling_corr_df.to_numpy())
+    names = np.array(list(rolling_corr_df.columns) + ["N/A"], dtype=object)
+    baton_df = pd.DataFrame({
+        "Top Influencer": names[positions],  # position -1 picks "N/A"
+        "Correlation": correlations,
+    }, index=rolling_corr_df.index)
+    baton_df.index.name = "Week Ending"
+    return baton_df
+
+
+def correlation_entropy(rolling_corr_df):
+    """
+    Shannon entropy (base 2) of the absolute correlations of every window.
+
+    Absolute correlations are normalized to a distribution over tickers; low
+    entropy means one ticker dominates, high entropy means influence is
+    spread out.
+
+    Args:
+        rolling_corr_df: Output of rolling_correlations
+
+    Returns:
+        DataFrame indexed like rolling_corr_df with an 'Entropy' column
+        (NaN for windows without any correlation)
+    """
+    if rolling_corr_df.empty or len(rolling_corr_df.columns) == 0:
+        return pd.DataFrame(columns=["Entropy"])
+
+    entropy_df = pd.DataFrame(index=rolling_corr_df.index)
+    entropy = shannon_entropy(rolling_corr_df.to_numpy())
+    if not np.isnan(entropy).all():
+        entropy_df["Entropy"] = entropy
+    return entropy_df
@@ -0,0 +1,234 @@
+"""
+influence_cube.py
+Precomputed influence series of the Streamlit dashboard for every window.
+
+The dashboard's correlation-window slider only takes a handful of values
+(2 to 12 weeks), so instead of computing rolling correlations, the baton
+handoff and the entropy when the slider moves, all of them can be computed
+once offline and memory-mapped by the dashboard at start-up. Every slider
+position is then a slice of an array on disk.
+
+Layout of a cube directory (default ``extras/data_streamlit/influence_cube``):
+
+    correlations.npy  float64 (n_windows, n_dates, n_tickers) rolling
+                      correlation with the main ticker; NaN where a window
+                      does not fit or has fewer than 2 observations
+    top.npy           int32 (n_windows, n_dates) column of the top
+                      influencer, -1 where there is none
+    entropy.npy       float64 (n_windows, n_dates) correlation entropy
+    dates.npy         datetime64[ns] dates of the input rows (a window is
+                      dated by its last row)
+    meta.json         windows, tickers, main column and the fingerprint of
+                      the input table
+
+The fingerprint is a content hash of the dashboard's input table;
+``open_if_fresh`` only returns a cube built from identical data. Build it
+after downloading new data with
+
+    python -m twsca_tools.influence_cube build extras/data_streamlit/combined_weekly_2024_2025.csv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from twsca_tools.influence import rolling_correlations, shannon_entropy, top_influencer
+
+FORMAT_VERSION = 1
+CUBE_DIRNAME = "influence_cube"
+WINDOWS = tuple(range(2, 13))
+
+
+def default_path(data_path):
+    """Cube directory next to the dashboard's input CSV."""
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), CUBE_DIRNAME)
+
+
+def data_fingerprint(df):
+    """Content hash of the input table, identifying the data a result was computed from."""
+    row_hashes = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def read_dashboard_table(data_path):
+    """Read the dashboard's combined weekly CSV the way the dashboard does."""
+    df = pd.read_csv(data_path)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def build_cube(df, out_dir, windows=WINDOWS, main_col="GME_Return"):
+    """
+    Compute the influence series of every window and write them as a cube.
+
+    Args:
+        df: Dashboard input table ('date' plus '<TICKER>_Return' columns;
+            other columns only enter the fingerprint)
+        out_dir: Cube directory
+        windows: Window lengths to precompute
+        main_col: Return column of the main ticker
+
+    Returns:
+        Path of the cube directory
+    """
+    return_cols = [col for col in df.columns if col == "date" or col.endswith("_Return")]
+    df_returns = df[return_cols]
+    tickers = [col.replace("_Return", "") for col in return_cols
+               if col != "date" and col != main_col]
+    n_dates = len(df_returns)
+
+    correlations = np.full((len(windows), n_dates, len(tickers)), np.nan)
+    top = np.full((len(windows), n_dates), -1, dtype=np.int32)
+    entropy = np.full((len(windows), n_dates), np.nan)
+    for i, window in enumerate(windows):
+        rolling_corr_df = rolling_correlations(df_returns, window, main_col=main_col)
+        if rolling_corr_df.empty:
+            continue
+        block = rolling_corr_df.to_numpy()
+        correlations[i, window - 1:] = block
+        top[i, window - 1:] = top_influencer(block)[0]
+        entropy[i, window - 1:] = shannon_entropy(block)
+
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        'correlations': correlations,
+        'top': top,
+        'entropy': entropy,
+        'dates': df_returns["date"].to_numpy(dtype='datetime64[ns]'),
+    }
+    for name, array in arrays.items():
+        tmp = os.path.join(out_dir, f"{name}.tmp.npy")
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(out_dir, f"{name}.npy"))
+    meta = {
+        'version': FORMAT_VERSION,
+        'windows': list(windows),
+        'tickers': tickers,
+        'main_col': main_col,
+        'fingerprint': data_fingerprint(df),
+    }
+    # meta.json is replaced last so a reader never pairs it with partial arrays
+    tmp_meta = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, os.path.join(out_dir, "meta.json"))
+    return out_dir
+
+
+class InfluenceCube:
+    """
+    Read-only, memory-mapped view of a built cube.
+
+    The accessors return the same frames as the functions in
+    twsca_tools.influence for that window.
+
+    Args:
+        cube_dir: Directory written by build_cube
+    """
+
+    def __init__(self, cube_dir):
+        self.path = cube_dir
+        with open(os.path.join(cube_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported influence cube version in {cube_dir}")
+        self.windows = self.meta['windows']
+        self.tickers = self.meta['tickers']
+        self.fingerprint = self.meta['fingerprint']
+        self.correlations = np.load(os.path.join(cube_dir, "correlations.npy"), mmap_mode='r')
+        self.top = np.load(os.path.join(cube_dir, "top.npy"), mmap_mode='r')
+        self.entropy = np.load(os.path.join(cube_dir, "entropy.npy"), mmap_mode='r')
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(cube_dir, "dates.npy")))
+        expected = (len(self.windows), len(self.dates), len(self.tickers))
+        if self.correlations.shape != expected:
+            raise ValueError(f"Influence cube in {cube_dir} does not match its metadata")
+
+    def __contains__(self, window):
+        return window in self.windows
+
+    def _slot(self, window):
+        return self.windows.index(window)
+
+    def _index(self, window):
+        return pd.DatetimeIndex(self.dates[window - 1:], name="Week Ending")
+
+    def rolling_correlations(self, window):
+        """Rolling correlations of one window, as influence.rolling_correlations."""
+        if window > len(self.dates) or not self.tickers:
+            return pd.DataFrame()
+        block = self.correlations[self._slot(window), window - 1:]
+        return pd.DataFrame(block, index=self._index(window), columns=self.tickers)
+
+    def baton_handoff(self, window):
+        """Top influencer series of one window, as influence.baton_handoff."""
+        if window > len(self.dates) or not self.tickers:
+            return pd.DataFrame(columns=["Top Influencer", "Correlation"])
+        slot = self._slot(window)
+        top = np.asarray(self.top[slot, window - 1:])
+        block = self.correlations[slot, window - 1:]
+        has_top = top >= 0
+        names = np.array(self.tickers + ["N/A"], dtype=object)
+        correlation = np.where(has_top, block[np.arange(len(top)), np.maximum(top, 0)], np.nan)
+        return pd.DataFrame({
+            "Top Influencer": names[np.where(has_top, top, -1)],
+            "Correlation": correlation,
+        }, index=self._index(window))
+
+    def correlation_entropy(self, window):
+        """Correlation entropy of one window, as influence.correlation_entropy."""
+        if window > len(self.dates) or not self.tickers:
+            return pd.DataFrame(columns=["Entropy"])
+        entropy_df = pd.DataFrame(index=self._index(window))
+        values = self.entropy[self._slot(window), window - 1:]
+        if not np.isnan(values).all():
+            entropy_df["Entropy"] = values
+        return entropy_df
+
+
+def open_if_fresh(cube_dir, fingerprint):
+    """
+    Open a cube if it was built from the data with this fingerprint.
+
+    Returns:
+        InfluenceCube, or None if it is missing or built from other data
+    """
+    try:
+        cube = InfluenceCube(cube_dir)
+    except (FileNotFoundError, ValueError):
+        return None
+    return cube if cube.fingerprint == fingerprint else None
+
+
+def main():
+    """Build or describe an influence cube."""
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's influence series for every window")
+    parser.add_argument("action", choices=["build", "info"],
+                        help="'build' computes the cube, 'info' prints its summary")
+    parser.add_argument("data_path", type=str, help="Dashboard input CSV (combined weekly table)")
+    parser.add_argument("--windows", type=str, default=None,
+                        help="Comma-separated window lengths (default: 2 to 12)")
+    parser.add_argument("--out", type=str, default=None,
+                        help="Cube directory (default: influence_cube next to the CSV)")
+    args = parser.parse_args()
+
+    cube_dir = args.out or default_path(args.data_path)
+    df = read_dashboard_table(args.data_path)
+    if args.action == "build":
+        windows = tuple(int(w) for w in args.windows.split(",")) if args.windows else WINDOWS
+        build_cube(df, cube_dir, windows=windows)
+
+    cube = InfluenceCube(cube_dir)
+    state = "fresh" if cube.fingerprint == data_fingerprint(df) else "stale"
+    size = cube.correlations.nbytes + cube.top.nbytes + cube.entropy.nbytes
+    print(f"{cube_dir}: {len(cube.windows)} windows x {len(cube.dates)} dates x "
+          f"{len(cube.tickers)} tickers ({size / 2**20:.1f} MB, {state})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
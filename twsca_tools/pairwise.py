@@ -0,0 +1,317 @@
+"""
+pairwise.py
+All-pairs windowed TWSCA: N x N correlation and DTW matrices per window.
+
+Comparing every ticker with every other one through the per-pair path
+would smooth, normalize and transform each series N - 1 times. Here every
+ticker is prepared exactly once on a shared calendar:
+
+1. LLT smoothing and z-score normalization of the whole series,
+2. the sliding windows (strided views) and their magnitude spectra,
+3. the spectra centered and scaled to unit norm, so the spectral
+   correlation of two windows is a plain dot product.
+
+Correlations of all pairs then come from batched matrix products over
+tiles of tickers and blocks of windows, sized so the operands of one
+product stay cache-resident. Only tiles on or above the diagonal are
+computed (correlation and DTW are both symmetric), and DTW runs once per
+unordered pair on the precomputed windows.
+
+Results are stored in condensed form, i.e. the strict upper triangle of
+each window's matrix in row-major order (as ``scipy.spatial.distance.
+squareform``), in ``<output_dir>/twsca_pairs/window=<W>/``:
+
+    correlation.npy   float64 (n_windows, n_pairs)
+    dtw.npy           float64 (n_windows, n_pairs)
+    dates.npy         datetime64[ns] date of every window
+    meta.json         tickers, window, parameters, whether dates are UTC
+
+Calendar: the series are aligned on the dates common to *all* tickers, so
+a pair's values equal the per-pair analysis whenever the two tickers cover
+that same calendar. Window dates follow the batch convention (window k
+covers samples [k, k + window) and is dated by sample k + window).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from twsca_tools import dtw_kernels, price_matrix, windowed
+
+FORMAT_VERSION = 1
+STORE_DIRNAME = "twsca_pairs"
+TILE_TICKERS = 64
+TILE_BYTES = 4 * 2**20
+
+
+def store_path(output_dir, window):
+    """Directory of the all-pairs store for one window length."""
+    return os.path.join(output_dir, STORE_DIRNAME, f"window={window}")
+
+
+def n_pairs(n_tickers):
+    """Number of unordered pairs of distinct tickers."""
+    return n_tickers * (n_tickers - 1) // 2
+
+
+def condensed_index(n_tickers, i, j):
+    """Position of pair (i, j), i < j, in a condensed matrix."""
+    return i * n_tickers - i * (i + 1) // 2 + (j - i - 1)
+
+
+def common_calendar(series):
+    """Dates present in every series (sorted)."""
+    series = list(series)
+    dates = series[0].index
+    for s in series[1:]:
+        dates = dates.intersection(s.index)
+    return dates.sort_values()
+
+
+def unit_spectra(windows):
+    """
+    Magnitude spectra of a stack of windows, centered and scaled to unit norm.
+
+    Args:
+        windows: Array of shape (n_windows, window)
+
+    Returns:
+        Tuple of (unit spectra, raw magnitude spectra, mask of constant
+        spectra); constant spectra become zero rows
+    """
+    mag = windowed.window_spectra(windows)
+    centered = mag - mag.mean(axis=1, keepdims=True)
+    norm = np.sqrt(np.einsum('ij,ij->i', centered, centered))
+    constant = np.std(mag, axis=1) == 0
+    unit = np.divide(centered, norm[:, None], out=np.zeros_like(centered),
+                     where=~constant[:, None])
+    return unit, mag, constant
+
+
+def pairwise_correlations(spectra, magnitudes, constant, tile=TILE_TICKERS):
+    """
+    Spectral correlation of every pair of tickers in every window.
+
+    Args:
+        spectra: Array (n_tickers, n_windows, n_bins) from unit_spectra
+        magnitudes: Array (n_tickers, n_windows, n_bins) of raw spectra
+        constant: Boolean array (n_tickers, n_windows) of constant spectra
+        tile: Tickers per tile
+
+    Returns:
+        Condensed array (n_windows, n_pairs); the special cases follow
+        windowed.correlate_spectra (1.0 for two equal constant spectra,
+        0.0 if only one is constant)
+    """
+    n_tickers, n_windows, n_bins = spectra.shape
+    out = np.empty((n_windows, n_pairs(n_tickers)))
+    # Windows per block so both operand tiles fit in about TILE_BYTES
+    block = max(1, TILE_BYTES // (2 * 8 * n_bins * min(tile, n_tickers)))
+    for a0 in range(0, n_tickers, tile):
+        a1 = min(a0 + tile, n_tickers)
+        for b0 in range(a0, n_tickers, tile):
+            b1 = min(b0 + tile, n_tickers)
+            rows, cols = np.meshgrid(np.arange(a0, a1), np.arange(b0, b1), indexing='ij')
+            upper = rows < cols
+            if not upper.any():
+                continue
+            pairs = condensed_index(n_tickers, rows[upper], cols[upper])
+            for k0 in range(0, n_windows, block):
+                k1 = min(k0 + block, n_windows)
+                left = spectra[a0:a1, k0:k1].transpose(1, 0, 2)    # (T, ta, bins)
+                right = spectra[b0:b1, k0:k1].transpose(1, 2, 0)   # (T, bins, tb)
+                out[k0:k1, pairs] = np.matmul(left, right)[:, upper]
+
+    # Constant spectra: 0.0, or 1.0 when both are constant and equal
+    for k in np.flatnonzero(constant.any(axis=0)):
+        flat = np.flatnonzero(constant[:, k])
+        for i in flat:
+            for j in range(n_tickers):
+                if i == j:
+                    continue
+                lo, hi = min(i, j), max(i, j)
+                equal = constant[j, k] and np.isclose(magnitudes[i, k], magnitudes[j, k]).all()
+                out[k, condensed_index(n_tickers, lo, hi)] = 1.0 if equal else 0.0
+    return np.clip(out, -1.0, 1.0)
+
+
+def pairwise_dtw(series, window, dtw_mode='full', max_warp=None, dtw_threshold=None):
+    """
+    DTW distance of every pair of tickers in every window.
+
+    Args:
+        series: Array (n_tickers, n_samples) of normalized series
+        window: Window length in samples
+        dtw_mode: 'full' solves all windows of a pair as one batch;
+            'incremental' reuses the previous window's cost matrix
+        max_warp: Sakoe-Chiba band radius (None for no band)
+        dtw_threshold: Distances above this are reported as inf
+
+    Returns:
+        Condensed array (n_windows, n_pairs)
+    """
+    n_tickers, n_samples = series.shape
+    windows = [windowed.sliding_windows(s, window) for s in series]
+    out = np.empty((n_samples - window, n_pairs(n_tickers)))
+    for i in range(n_tickers):
+        for j in range(i + 1, n_tickers):
+            if dtw_mode == 'incremental':
+                distances = dtw_kernels.rolling_dtw_distances(
+                    series[i], series[j], window, radius=max_warp, abandon_above=dtw_threshold)
+            else:
+                distances = dtw_kernels.dtw_distances(
+                    windows[i], windows[j], radius=max_warp, abandon_above=dtw_threshold)
+            out[:, condensed_index(n_tickers, i, j)] = distances
+    return out
+
+
+def compute_all_pairs(prices, window=30, llt_sigma=1.0, llt_alpha=0.5, dtw_mode='full',
+                      max_warp=None, dtw_threshold=None, tile=TILE_TICKERS):
+    """
+    Windowed TWSCA of every pair in a set of price series.
+
+    Args:
+        prices: Dict of ticker -> price Series (date index)
+        window: Window length in samples
+        llt_sigma: LLT filter sigma
+        llt_alpha: LLT filter alpha
+        dtw_mode: 'full' or 'incremental' (see pairwise_dtw)
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: Distances above this are reported as inf
+        tile: Tickers per correlation tile
+
+    Returns:
+        Dict with 'tickers', 'dates' (one per window), and condensed
+        'correlation' and 'dtw' arrays of shape (n_windows, n_pairs)
+    """
+    import twsca
+
+    tickers = list(prices)
+    dates = common_calendar(prices.values())
+    if len(dates) <= window:
+        raise ValueError(f"Only {len(dates)} dates common to all tickers; need more than {window}")
+
+    # Every ticker is smoothed, normalized and transformed exactly once
+    normalized = np.empty((len(tickers), len(dates)))
+    for t, ticker in enumerate(tickers):
+        aligned = prices[ticker].loc[dates].to_numpy(dtype=float)
+        smoothed = twsca.llt_filter(aligned, sigma=llt_sigma, alpha=llt_alpha)
+        normalized[t] = twsca.normalize_series(smoothed)
+
+    prepared = [unit_spectra(windowed.sliding_windows(s, window)) for s in normalized]
+    spectra = np.stack([unit for unit, _, _ in prepared])
+    magnitudes = np.stack([mag for _, mag, _ in prepared])
+    constant = np.stack([flat for _, _, flat in prepared])
+
+    return {
+        'tickers': tickers,
+        'dates': dates[window:],
+        'correlation': pairwise_correlations(spectra, magnitudes, constant, tile=tile),
+        'dtw': pairwise_dtw(normalized, window, dtw_mode=dtw_mode, max_warp=max_warp,
+                            dtw_threshold=dtw_threshold),
+    }
+
+
+def write_pair_store(store_dir, result, window, params=None):
+    """
+    Write the output of compute_all_pairs as a condensed matrix store.
+
+    Args:
+        store_dir: Store directory (see store_path)
+        result: Dict returned by compute_all_pairs
+        window: Window length the result was computed with
+        params: Extra parameters to record in meta.json
+
+    Returns:
+        Path of the store directory
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    # Parsed like the price matrix, so string labels with mixed UTC offsets
+    # (CSV dates spanning DST) resolve to UTC instants
+    dates, utc = price_matrix.parse_date_labels(result['dates'])
+    if utc:
+        dates = dates.tz_localize(None)
+    arrays = {
+        'correlation': result['correlation'],
+        'dtw': result['dtw'],
+        'dates': dates.to_numpy(dtype='datetime64[ns]'),
+    }
+    for name, array in arrays.items():
+        tmp = os.path.join(store_dir, f"{name}.tmp.npy")
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(store_dir, f"{name}.npy"))
+    meta = {
+        'version': FORMAT_VERSION,
+        'tickers': result['tickers'],
+        'window': window,
+        'utc': utc,
+        'params': params or {},
+    }
+    # meta.json is replaced last so a reader never pairs it with partial arrays
+    tmp_meta = os.path.join(store_dir, "meta.json.tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, os.path.join(store_dir, "meta.json"))
+    return store_dir
+
+
+class PairStore:
+    """
+    Read-only, memory-mapped view of an all-pairs store.
+
+    Args:
+        store_dir: Directory written by write_pair_store
+
+    Example:
+        >>> store = PairStore("output/twsca_pairs/window=30")
+        >>> corr = store.matrix('correlation', -1)   # N x N, latest window
+        >>> pair = store.pair("GME", "AMC")          # one pair over time
+    """
+
+    def __init__(self, store_dir):
+        self.path = store_dir
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported pair store version in {store_dir}")
+        self.tickers = self.meta['tickers']
+        self.window = self.meta['window']
+        self.correlation = np.load(os.path.join(store_dir, "correlation.npy"), mmap_mode='r')
+        self.dtw = np.load(os.path.join(store_dir, "dtw.npy"), mmap_mode='r')
+        dates = pd.DatetimeIndex(np.load(os.path.join(store_dir, "dates.npy")), name='Date')
+        self.dates = dates.tz_localize('UTC') if self.meta['utc'] else dates
+        self._ticker_pos = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def matrix(self, kind, k):
+        """
+        Full symmetric matrix of one window.
+
+        Args:
+            kind: 'correlation' or 'dtw'
+            k: Window position (negative counts from the end)
+
+        Returns:
+            DataFrame (tickers x tickers); the diagonal is 1.0 for
+            correlation and 0.0 for DTW
+        """
+        condensed = getattr(self, kind)[k]
+        n = len(self.tickers)
+        full = np.zeros((n, n))
+        rows, cols = np.triu_indices(n, k=1)
+        full[rows, cols] = condensed
+        full[cols, rows] = condensed
+        np.fill_diagonal(full, 1.0 if kind == 'correlation' else 0.0)
+        return pd.DataFrame(full, index=self.tickers, columns=self.tickers)
+
+    def pair(self, ticker_a, ticker_b):
+        """Correlation and DTW distance of one pair over all windows."""
+        i, j = sorted((self._ticker_pos[ticker_a], self._ticker_pos[ticker_b]))
+        if i == j:
+            raise ValueError("A pair needs two different tickers")
+        p = condensed_index(len(self.tickers), i, j)
+        return pd.DataFrame({
+            'correlation': self.correlation[:, p],
+            'dtw_distance': self.dtw[:, p],
+        }, index=self.dates)
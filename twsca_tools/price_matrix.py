@@ -0,0 +1,324 @@
+"""
+price_matrix.py
+Aligned, memory-mapped price matrix built from the downloaded CSV files.
+
+Parsing one CSV per ticker and re-aligning every pair with
+``index.intersection`` dominates start-up time on large universes. This
+module parses the CSVs once into a single float64 array on the union of
+all dates, which analysis scripts then open with ``np.load(mmap_mode='r')``:
+opening costs a few milliseconds regardless of universe size, slices are
+zero-copy views, and parallel workers opening the same file share the
+same page-cache pages.
+
+Layout of a matrix directory (default ``<data_dir>/price_matrix``):
+
+    prices.npy   float64 (n_fields, n_tickers, n_dates); NaN where a ticker
+                 has no row for a date
+    dates.npy    datetime64[ns] date index shared by every series (UTC
+                 instants when the CSVs carry UTC offsets)
+    meta.json    tickers, fields, shape, whether dates are UTC, and the
+                 size/mtime of every source CSV
+
+The array is field-major so each ticker's series of one field is a
+contiguous row. Both CSV layouts in the repository are understood: the
+single-header yfinance ``history()`` files of post 2 and the 3-row-header
+``download()`` files of post 1. ``is_fresh`` compares the recorded
+size/mtime of each source with the files on disk, so a stale matrix is
+ignored in favor of the CSVs until it is rebuilt:
+
+    python -m twsca_tools.price_matrix build posts/post_2_batons_and_traps/data
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+MATRIX_DIRNAME = "price_matrix"
+
+
+def default_path(data_dir):
+    """Matrix directory used for a data directory."""
+    return os.path.join(data_dir, MATRIX_DIRNAME)
+
+
+def csv_read_args(path):
+    """
+    ``pd.read_csv`` keyword arguments for a price CSV in either layout.
+
+    Args:
+        path: CSV written by one of the download scripts
+
+    Returns:
+        Dict of read_csv arguments that yield the date labels as index
+    """
+    with open(path) as f:
+        return layout_read_args(f.readline(), f.readline())
+
+
+def layout_read_args(first_line, second_line):
+    """``pd.read_csv`` keyword arguments given the first two lines of a price CSV."""
+    if second_line.startswith('Ticker,'):
+        # yfinance download() layout: Price/Ticker/Date header rows
+        header = first_line.strip().split(',')
+        return {'skiprows': 3, 'header': None, 'index_col': 0,
+                'names': ['Date'] + header[1:]}
+    return {'index_col': 0}
+
+
+def read_price_csv(path):
+    """
+    Read one downloaded price CSV in either repository layout.
+
+    Args:
+        path: CSV written by one of the download scripts
+
+    Returns:
+        DataFrame with the FIELDS columns (NaN where a field is missing)
+        and the raw date labels as index
+    """
+    df = pd.read_csv(path, **csv_read_args(path))
+    df = df.reindex(columns=list(FIELDS))
+    return df.apply(pd.to_numeric, errors='coerce')
+
+
+def parse_date_labels(labels):
+    """
+    Parse date labels as written by the download scripts.
+
+    Returns:
+        Tuple of (DatetimeIndex, utc); labels with UTC offsets are resolved
+        to UTC instants (utc=True), plain dates stay naive
+    """
+    labels = pd.Index(labels).astype(str)
+    has_offset = labels.str.contains(r'[+-]\d{2}:\d{2}$', regex=True)
+    if has_offset.all():
+        return pd.DatetimeIndex(pd.to_datetime(labels, utc=True)), True
+    if has_offset.any():
+        raise ValueError("Date labels mix UTC offsets and naive dates")
+    return pd.DatetimeIndex(pd.to_datetime(labels)), False
+
+
+def _source_stats(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def build_price_matrix(data_dir, tickers=None, out_dir=None):
+    """
+    Parse the CSVs of a data directory into a memory-mappable matrix.
+
+    Args:
+        data_dir: Directory holding <TICKER>.csv files
+        tickers: Tickers to include (default: every CSV in data_dir)
+        out_dir: Matrix directory (default: <data_dir>/price_matrix)
+
+    Returns:
+        Path of the matrix directory
+    """
+    out_dir = out_dir or default_path(data_dir)
+    if tickers is None:
+        tickers = sorted(name[:-4] for name in os.listdir(data_dir) if name.endswith('.csv'))
+
+    frames, sources = {}, {}
+    utc = None
+    for ticker in tickers:
+        path = os.path.join(data_dir, f"{ticker}.csv")
+        if not os.path.exists(path):
+            print(f"Data file not found: {path}")
+            continue
+        df = read_price_csv(path)
+        df.index, is_utc = parse_date_labels(df.index)
+        if utc is not None and is_utc != utc:
+            raise ValueError(f"{path}: dates are not in the same form as the other files")
+        utc = is_utc
+        frames[ticker] = df[~df.index.duplicated(keep='last')].sort_index()
+        sources[ticker] = _source_stats(path)
+    if not frames:
+        raise ValueError(f"No price CSVs found in {data_dir}")
+
+    dates = frames[next(iter(frames))].index
+    for df in frames.values():
+        dates = dates.union(df.index)
+
+    os.makedirs(out_dir, exist_ok=True)
+    names = list(frames)
+    shape = (len(FIELDS), len(names), len(dates))
+    tmp_prices = os.path.join(out_dir, "prices.tmp.npy")
+    prices = np.lib.format.open_memmap(tmp_prices, mode='w+', dtype=np.float64, shape=shape)
+    prices[:] = np.nan
+    for j, ticker in enumerate(names):
+        df = frames[ticker]
+        positions = dates.get_indexer(df.index)
+        prices[:, j, positions] = df.to_numpy(dtype=np.float64).T
+    prices.flush()
+    del prices
+
+    tmp_dates = os.path.join(out_dir, "dates.tmp.npy")
+    np.save(tmp_dates, dates.tz_localize(None).to_numpy(dtype='datetime64[ns]'))
+    meta = {
+        'version': FORMAT_VERSION,
+        'tickers': names,
+        'fields': list(FIELDS),
+        'shape': list(shape),
+        'utc': bool(utc),
+        'sources': sources,
+    }
+    # meta.json is replaced last so a reader never pairs it with a partial array
+    os.replace(tmp_prices, os.path.join(out_dir, "prices.npy"))
+    os.replace(tmp_dates, os.path.join(out_dir, "dates.npy"))
+    tmp_meta = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, os.path.join(out_dir, "meta.json"))
+    return out_dir
+
+
+def is_fresh(matrix_dir, data_dir, tickers=None):
+    """
+    Check that a matrix exists and matches the CSVs it was built from.
+
+    Args:
+        matrix_dir: Matrix directory
+        data_dir: Directory holding the source CSVs
+        tickers: Tickers that must be present (default: any)
+
+    Returns:
+        True if every (requested) ticker's CSV is unchanged since the build
+    """
+    try:
+        with open(os.path.join(matrix_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    if meta.get('version') != FORMAT_VERSION:
+        return False
+    sources = meta['sources']
+    for ticker in (tickers if tickers is not None else sources):
+        path = os.path.join(data_dir, f"{ticker}.csv")
+        if ticker not in sources:
+            # Only stale if there is a CSV the matrix does not cover
+            if os.path.exists(path):
+                return False
+            continue
+        try:
+            if _source_stats(path) != sources[ticker]:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+class PriceMatrix:
+    """
+    Read-only, memory-mapped view of a built price matrix.
+
+    Args:
+        matrix_dir: Directory written by build_price_matrix
+
+    Example:
+        >>> matrix = PriceMatrix("data/price_matrix")
+        >>> close = matrix.series("GME")          # pandas Series, no parsing
+        >>> block = matrix.values("Close")        # (n_tickers, n_dates) view
+    """
+
+    def __init__(self, matrix_dir):
+        self.path = matrix_dir
+        with open(os.path.join(matrix_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported price matrix version in {matrix_dir}")
+        self.tickers = self.meta['tickers']
+        self.fields = self.meta['fields']
+        self.prices = np.load(os.path.join(matrix_dir, "prices.npy"), mmap_mode='r')
+        if list(self.prices.shape) != self.meta['shape']:
+            raise ValueError(f"Price matrix in {matrix_dir} does not match its metadata")
+        dates = pd.DatetimeIndex(np.load(os.path.join(matrix_dir, "dates.npy")), name='Date')
+        self.dates = dates.tz_localize('UTC') if self.meta['utc'] else dates
+        self._ticker_pos = {ticker: j for j, ticker in enumerate(self.tickers)}
+
+    def __contains__(self, ticker):
+        return ticker in self._ticker_pos
+
+    def values(self, field='Close', ticker=None):
+        """
+        Zero-copy array view of one field.
+
+        Args:
+            field: One of FIELDS
+            ticker: Restrict to one ticker (default: all, in self.tickers order)
+
+        Returns:
+            Array of shape (n_dates,) for a ticker, else (n_tickers, n_dates)
+        """
+        block = self.prices[self.fields.index(field)]
+        if ticker is None:
+            return block
+        return block[self._ticker_pos[ticker]]
+
+    def series(self, ticker, field='Close'):
+        """
+        One ticker's series on the dates it has data for.
+
+        The values share memory with the map unless the ticker has missing
+        dates, in which case only its valid rows are copied.
+        """
+        values = self.values(field, ticker)
+        valid = ~np.isnan(self.values('Close', ticker))
+        if valid.all():
+            return pd.Series(values, index=self.dates, name=field, copy=False)
+        return pd.Series(values[valid], index=self.dates[valid], name=field)
+
+    def frame(self, ticker):
+        """One ticker's FIELDS as a DataFrame, like a parsed CSV."""
+        block = self.prices[:, self._ticker_pos[ticker], :]
+        valid = ~np.isnan(block[self.fields.index('Close')])
+        if valid.all():
+            return pd.DataFrame(block.T, index=self.dates, columns=self.fields)
+        return pd.DataFrame(block[:, valid].T, index=self.dates[valid], columns=self.fields)
+
+
+def open_if_fresh(data_dir, tickers=None):
+    """
+    Open the default matrix of a data directory if it is up to date.
+
+    Returns:
+        PriceMatrix, or None if it is missing or older than the CSVs
+    """
+    matrix_dir = default_path(data_dir)
+    if not is_fresh(matrix_dir, data_dir, tickers):
+        return None
+    return PriceMatrix(matrix_dir)
+
+
+def main():
+    """Build or describe a price matrix."""
+    parser = argparse.ArgumentParser(description="Build a memory-mapped price matrix from CSVs")
+    parser.add_argument("action", choices=["build", "info"],
+                        help="'build' parses the CSVs, 'info' prints the matrix summary")
+    parser.add_argument("data_dir", type=str, help="Directory holding <TICKER>.csv files")
+    parser.add_argument("--tickers", type=str, default=None,
+                        help="Comma-separated tickers to include (default: every CSV)")
+    parser.add_argument("--out", type=str, default=None,
+                        help="Matrix directory (default: <data_dir>/price_matrix)")
+    args = parser.parse_args()
+
+    matrix_dir = args.out or default_path(args.data_dir)
+    if args.action == "build":
+        tickers = args.tickers.split(",") if args.tickers else None
+        build_price_matrix(args.data_dir, tickers=tickers, out_dir=matrix_dir)
+
+    matrix = PriceMatrix(matrix_dir)
+    state = "fresh" if is_fresh(matrix_dir, args.data_dir) else "stale"
+    print(f"{matrix_dir}: {len(matrix.tickers)} tickers x {len(matrix.dates)} dates "
+          f"({matrix.prices.nbytes / 2**20:.1f} MB, {state})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+result_cache.py
+Content-addressed on-disk cache for TWSCA pair computations.
+
+Entries are keyed by a SHA-256 hash of the aligned input arrays and the
+analysis parameters, so a pair is only recomputed when its data or its
+settings change. Each entry is a single ``.npz`` file; the file's mtime is
+refreshed on every hit and the least recently used entries are evicted once
+the cache grows past its size limit.
+
+Inspect or clear a cache from the command line:
+
+    python -m twsca_tools.result_cache info output/.twsca_cache
+    python -m twsca_tools.result_cache clear output/.twsca_cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Bump when the layout of cached results changes
+CACHE_VERSION = 1
+
+
+class ResultCache:
+    """
+    Size-bounded, LRU-evicted store of computed arrays.
+
+    Args:
+        cache_dir: Directory holding the cache entries
+        max_bytes: Total size above which least recently used entries are
+            evicted
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(arrays, params):
+        """
+        Hash input arrays and parameters into a cache key.
+
+        Args:
+            arrays: Sequence of array-likes (e.g. the aligned price series)
+            params: JSON-serializable dict of analysis parameters
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}".encode())
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Dict of arrays, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, arrays):
+        """
+        Store an entry atomically and evict old entries if over the limit.
+
+        Args:
+            key: Key from make_key
+            arrays: Dict of name -> array-like
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        """List (mtime, size, path) for every entry, oldest first."""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by a concurrent process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def info(self):
+        """
+        Summarize the cache contents.
+
+        Returns:
+            Dict with path, entry count, total and maximum size in bytes
+        """
+        entries = self._entries()
+        return {
+            'path': os.path.abspath(self.cache_dir),
+            'entries': len(entries),
+            'total_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def clear(self):
+        """
+        Remove every entry.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def print_cache_info(cache):
+    """Print a one-line summary of a ResultCache."""
+    info = cache.info()
+    print(f"Cache {info['path']}: {info['entries']} entries, "
+          f"{info['total_bytes'] / 2**20:.1f} MB of {info['max_bytes'] / 2**20:.0f} MB")
+
+
+def main():
+    """Inspect or clear a result cache."""
+    parser = argparse.ArgumentParser(description="Inspect or clear a TWSCA result cache")
+    parser.add_argument("action", choices=["info", "clear"],
+                        help="'info' prints a summary, 'clear' removes every entry")
+    parser.add_argument("cache_dir", type=str,
+                        help="Cache directory (e.g. output/.twsca_cache)")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.action == "clear":
+        print(f"Removed {cache.clear()} cache entries from {args.cache_dir}")
+    else:
+        print_cache_info(cache)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
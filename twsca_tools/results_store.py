@@ -0,0 +1,279 @@
+"""
+results_store.py
+Columnar (Parquet) store for windowed TWSCA results.
+
+All pairs of one main ticker live in a single Parquet file, so a run writes
+and a reader loads one typed table instead of two small CSVs per pair:
+
+    <output_dir>/twsca_results/main_ticker=GME/part-0.parquet
+
+The directory layout follows the Hive partitioning convention, so the whole
+store can also be opened as one dataset (``pyarrow.dataset``, DuckDB,
+Spark). Each file holds the long-format table
+
+    date          timestamp[ns, UTC]   window end date
+    ticker        string               comparison ticker
+    correlation   float64              spectral correlation of the window
+    dtw_distance  float64              DTW distance of the window
+
+sorted by date within each ticker. Writes go to a temporary file that
+replaces the partition with os.replace, so readers never see a partially
+written file. ``write_results`` stores the in-memory results of a run;
+``ResultsWriter`` streams rows batch by batch for runs whose results do
+not fit in memory.
+
+Parquet support needs ``pyarrow``; callers check ``parquet_available()``
+and fall back to CSV output without it.
+"""
+
+import os
+
+import pandas as pd
+
+STORE_DIRNAME = "twsca_results"
+PARTITION_FILE = "part-0.parquet"
+COLUMNS = ['date', 'ticker', 'correlation', 'dtw_distance']
+
+
+def parquet_available():
+    """True if a Parquet engine (pyarrow) can be imported."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def store_path(output_dir):
+    """Location of the results store inside an analysis output directory."""
+    return os.path.join(output_dir, STORE_DIRNAME)
+
+
+def partition_path(store_dir, main_ticker):
+    """Parquet file holding every pair of one main ticker."""
+    return os.path.join(store_dir, f"main_ticker={main_ticker}", PARTITION_FILE)
+
+
+def results_to_frame(correlation, dtw):
+    """
+    Combine per-ticker result frames into the long-format store table.
+
+    Args:
+        correlation: Dict of ticker -> DataFrame with a 'correlation' column
+        dtw: Dict of ticker -> DataFrame with a 'dtw_distance' column
+
+    Returns:
+        DataFrame with the store columns, sorted by ticker and date
+    """
+    frames = []
+    for ticker in sorted(set(correlation) | set(dtw)):
+        parts = []
+        if ticker in correlation:
+            parts.append(correlation[ticker][['correlation']])
+        if ticker in dtw:
+            parts.append(dtw[ticker][['dtw_distance']])
+        pair = pd.concat(parts, axis=1).reindex(columns=['correlation', 'dtw_distance'])
+        frames.append(pd.DataFrame({
+            'date': pd.to_datetime(pair.index, utc=True).astype('datetime64[ns, UTC]'),
+            'ticker': ticker,
+            'correlation': pair['correlation'].to_numpy(dtype=float),
+            'dtw_distance': pair['dtw_distance'].to_numpy(dtype=float),
+        }))
+    if not frames:
+        return _empty_frame()
+    return pd.concat(frames, ignore_index=True).sort_values(['ticker', 'date'], ignore_index=True)
+
+
+def _empty_frame():
+    return pd.DataFrame({
+        'date': pd.Series(dtype='datetime64[ns, UTC]'),
+        'ticker': pd.Series(dtype=str),
+        'correlation': pd.Series(dtype=float),
+        'dtw_distance': pd.Series(dtype=float),
+    })
+
+
+def read_results(store_dir, main_ticker, tickers=None):
+    """
+    Read the results table of one main ticker.
+
+    Args:
+        store_dir: Store directory (see store_path)
+        main_ticker: Main ticker symbol
+        tickers: Optional list of comparison tickers to read
+
+    Returns:
+        DataFrame with the store columns (empty if nothing is stored)
+    """
+    path = partition_path(store_dir, main_ticker)
+    if not os.path.exists(path):
+        return _empty_frame()
+    filters = [('ticker', 'in', list(tickers))] if tickers is not None else None
+    return pd.read_parquet(path, columns=COLUMNS, filters=filters)
+
+
+def last_result_dates(store_dir, main_ticker):
+    """
+    Last stored window end date of every comparison ticker.
+
+    Returns:
+        Dict of ticker -> UTC Timestamp
+    """
+    table = read_results(store_dir, main_ticker)
+    return table.groupby('ticker')['date'].max().to_dict()
+
+
+def write_results(store_dir, main_ticker, correlation, dtw, append=False):
+    """
+    Store the results of a run.
+
+    Without ``append``, the stored rows of every ticker in this run are
+    replaced and other tickers are kept. With ``append``, a ticker's stored
+    rows dated on or after its first new row are replaced by the new rows
+    and the earlier ones are kept.
+
+    Args:
+        store_dir: Store directory (see store_path)
+        main_ticker: Main ticker symbol
+        correlation: Dict of ticker -> correlation DataFrame
+        dtw: Dict of ticker -> DTW DataFrame
+        append: Replace only the tail of each ticker's stored rows
+
+    Returns:
+        Number of rows written by this run
+    """
+    new = results_to_frame(correlation, dtw)
+    existing = read_results(store_dir, main_ticker)
+    if append and not new.empty:
+        first = new.groupby('ticker')['date'].min()
+        cutoff = existing['ticker'].map(first)
+        existing = existing[cutoff.isna() | (existing['date'] < cutoff)]
+    elif not append:
+        existing = existing[~existing['ticker'].isin(new['ticker'].unique())]
+
+    parts = [frame for frame in (existing, new) if not frame.empty]
+    table = pd.concat(parts, ignore_index=True) if parts else _empty_frame()
+    table = table.sort_values(['ticker', 'date'], ignore_index=True)
+
+    path = partition_path(store_dir, main_ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return len(new)
+
+
+def load_results(store_dir, main_ticker):
+    """
+    Load the store in the layout used by the plotting code.
+
+    Returns:
+        Dict with 'correlation' and 'dtw' entries, each a dict of
+        ticker -> DataFrame indexed by a UTC DatetimeIndex named 'Date'
+    """
+    results = {'correlation': {}, 'dtw': {}}
+    table = read_results(store_dir, main_ticker)
+    for ticker, pair in table.groupby('ticker', sort=True):
+        pair = pair.set_index('date').rename_axis('Date')
+        results['correlation'][ticker] = pair[['correlation']]
+        results['dtw'][ticker] = pair[['dtw_distance']]
+    return results
+
+
+class ResultsWriter:
+    """
+    Write result rows to a main ticker's partition as they are produced.
+
+    Each ``write`` appends one Parquet row group to a temporary file, so
+    memory is bounded by the size of one batch. ``close`` copies the stored
+    rows of tickers this writer did not touch, again batch by batch, and
+    replaces the partition. Leaving a ``with`` block through an exception
+    discards the temporary file and keeps the old partition.
+
+    Args:
+        store_dir: Store directory (see store_path)
+        main_ticker: Main ticker symbol
+
+    Example:
+        >>> with ResultsWriter(store_dir, "GME") as writer:
+        ...     for rows in streaming.stream_pair(...):
+        ...         writer.write(rows)
+    """
+
+    def __init__(self, store_dir, main_ticker):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self.schema = pa.schema([
+            ('date', pa.timestamp('ns', tz='UTC')),
+            ('ticker', pa.string()),
+            ('correlation', pa.float64()),
+            ('dtw_distance', pa.float64()),
+        ])
+        self.path = partition_path(store_dir, main_ticker)
+        self._tmp_path = f"{self.path}.tmp"
+        self._writer = None
+        self._tickers = set()
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write_table(self, table):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = self._pq.ParquetWriter(self._tmp_path, self.schema)
+        self._writer.write_table(table)
+
+    def write(self, frame):
+        """
+        Append rows in the store layout (date, ticker, correlation, dtw_distance).
+
+        Args:
+            frame: DataFrame with the store columns; naive dates are taken as UTC
+        """
+        if frame.empty:
+            return
+        frame = frame[COLUMNS].assign(
+            date=pd.to_datetime(frame['date'], utc=True).astype('datetime64[ns, UTC]'))
+        self._write_table(self._pa.Table.from_pandas(frame, schema=self.schema,
+                                                     preserve_index=False))
+        self._tickers.update(frame['ticker'].unique())
+        self.rows += len(frame)
+
+    def close(self):
+        """
+        Carry over untouched tickers and replace the partition.
+
+        Returns:
+            Number of rows written through this writer
+        """
+        if self._writer is None:
+            return self.rows  # nothing written, leave the partition as it is
+        if os.path.exists(self.path):
+            import pyarrow.compute as pc
+            written = self._pa.array(sorted(self._tickers), type=self._pa.string())
+            for batch in self._pq.ParquetFile(self.path).iter_batches(columns=COLUMNS):
+                table = self._pa.Table.from_batches([batch]).cast(self.schema)
+                keep = pc.invert(pc.is_in(table['ticker'], value_set=written))
+                self._write_table(table.filter(keep))
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+        return self.rows
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
@@ -0,0 +1,119 @@
+"""
+startup.py
+Dependency checks and import-time measurement for the scripts.
+
+The scripts import heavy optional packages (twsca, which pulls in scipy;
+matplotlib) inside the functions that use them, so ``--help``, cache hits
+and other paths that never compute or plot start quickly. ``require`` is
+the use-time counterpart of the old import-time ``pip install`` fallbacks:
+it imports a module or exits with the command that installs it, and never
+installs anything itself. ``missing`` checks requirements without
+importing them.
+
+Where start-up time goes can be measured with Python's ``-X importtime``,
+summarized per top-level import:
+
+    python -m twsca_tools.startup posts/post_2_batons_and_traps/run_twsca_analysis.py --help
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import time
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def _module_name(requirement):
+    """Module of a pip requirement such as 'twsca>=0.3.0'."""
+    return re.split(r'[<>=!~ \[]', requirement, maxsplit=1)[0].replace('-', '_')
+
+
+def missing(requirements):
+    """
+    Requirements whose module cannot be found, without importing anything.
+
+    Args:
+        requirements: pip requirement strings, e.g. ['twsca>=0.3.0', 'pyarrow']
+
+    Returns:
+        List of the requirements that are not installed
+    """
+    return [requirement for requirement in requirements
+            if importlib.util.find_spec(_module_name(requirement)) is None]
+
+
+def require(module, requirement=None):
+    """
+    Import a module, or exit with the command that installs it.
+
+    Args:
+        module: Module name, e.g. 'twsca'
+        requirement: pip requirement to suggest (default: the module name)
+
+    Returns:
+        The imported module
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise SystemExit(f"{module} is required here but could not be imported ({e}).\n"
+                         f"Install it with: pip install '{requirement or module}'")
+
+
+def measure_imports(argv):
+    """
+    Run a Python script under ``-X importtime``.
+
+    Args:
+        argv: Script path and its arguments
+
+    Returns:
+        Tuple of (wall seconds, list of (module, self_us, cumulative_us,
+        depth) in import order, exit status)
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', *argv],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    modules = []
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return wall, modules, process.returncode
+
+
+def main():
+    """Report where a script's start-up time goes."""
+    parser = argparse.ArgumentParser(
+        description="Measure a script's start-up time and its slowest top-level imports")
+    parser.add_argument("--top", type=int, default=15,
+                        help="Top-level imports to list (default: 15)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs; the fastest is reported (default: 3)")
+    parser.add_argument("script", help="Python script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    args = parser.parse_args()
+
+    runs = [measure_imports([args.script, *args.args]) for _ in range(max(1, args.repeat))]
+    wall, modules, status = min(runs, key=lambda run: run[0])
+    top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True)
+    total_us = sum(m[2] for m in top_level)
+
+    name = " ".join([os.path.basename(args.script), *args.args])
+    print(f"{name}: {wall:.3f} s wall (exit status {status}), "
+          f"{total_us / 1e6:.3f} s importing {len(modules)} modules")
+    print(f"{'cumulative':>12} {'self':>10}  top-level import")
+    for module, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{cumulative_us / 1e6:10.3f} s {self_us / 1e6:8.3f} s  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+streaming.py
+Bounded-memory windowed TWSCA for minute- or tick-resolution input.
+
+The batch path loads every series completely, smooths and normalizes it as
+a whole and then windows it. Here each pair is processed as a pipeline of
+chunks instead:
+
+1. ``read_series_chunks`` reads a price CSV ``chunk_size`` rows at a time.
+2. ``align_chunks`` merge-joins the two sorted streams on common timestamps.
+3. ``StreamingLLT`` applies the same LLT filter as ``twsca.llt_filter``.
+   The filter is local (each output depends on ``iterations * (int(6 *
+   sigma) | 1) // 2`` samples on either side), so holding back that many
+   samples of context makes the streamed output equal the whole-series
+   filter.
+4. A ring buffer keeps the last ``window`` smoothed samples of each side.
+   Every completed window is z-scored on its own and scored with the
+   batched spectral correlation and DTW kernels.
+
+``stream_pair`` yields the result rows in the results-store layout batch by
+batch, so they can go straight to ``results_store.ResultsWriter``. Memory
+is bounded by the chunk size and window length, not the history length.
+
+Differences from the batch path: windows are normalized one by one (a
+global z-score needs the whole series), so values differ from
+``run_twsca_analysis.py`` without ``--stream``. Window dates follow the
+batch convention, i.e. a window covering samples [k, k + window) is dated
+by sample k + window.
+"""
+
+import numpy as np
+import pandas as pd
+
+from twsca_tools import dtw_kernels, windowed
+from twsca_tools.price_matrix import csv_read_args, parse_date_labels
+
+
+def read_series_chunks(path, column='Close', chunk_size=100_000):
+    """
+    Read one column of a price CSV in chunks.
+
+    Both repository CSV layouts are understood (see price_matrix). Rows must
+    be in ascending time order; NaN values are skipped and repeated
+    timestamps keep their last row.
+
+    Args:
+        path: CSV with a timestamp first column
+        column: Price column to read
+        chunk_size: Rows parsed per chunk
+
+    Yields:
+        Tuples of (timestamps as int64 ns, values, utc) where utc tells
+        whether the labels carried UTC offsets
+    """
+    last = None
+    for chunk in pd.read_csv(path, chunksize=chunk_size, **csv_read_args(path)):
+        values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+        dates, utc = parse_date_labels(chunk.index)
+        stamps = dates.tz_localize(None).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if np.any(np.diff(stamps) < 0) or (last is not None and len(stamps) and stamps[0] < last):
+            raise ValueError(f"{path}: timestamps are not in ascending order")
+
+        keep = ~np.isnan(values)
+        # Last row of each repeated timestamp, including one split across chunks
+        keep[:-1] &= stamps[1:] != stamps[:-1]
+        if last is not None:
+            keep &= stamps > last
+        if len(stamps):
+            last = stamps[-1]
+        if keep.any():
+            yield stamps[keep], values[keep], utc
+
+
+def align_chunks(chunks_a, chunks_b):
+    """
+    Merge-join two sorted chunk streams on their common timestamps.
+
+    Only the unmatched tail of the stream that is ahead is held between
+    chunks.
+
+    Args:
+        chunks_a: Iterable from read_series_chunks
+        chunks_b: Iterable from read_series_chunks
+
+    Yields:
+        Tuples of (timestamps, values_a, values_b, utc)
+    """
+    chunks_a, chunks_b = iter(chunks_a), iter(chunks_b)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0))
+    (stamps_a, values_a), (stamps_b, values_b) = empty, empty
+    utc = None
+    while True:
+        if len(stamps_a) == 0:
+            chunk = next(chunks_a, None)
+            if chunk is None:
+                return
+            stamps_a, values_a, utc = chunk
+        if len(stamps_b) == 0:
+            chunk = next(chunks_b, None)
+            if chunk is None:
+                return
+            stamps_b, values_b, utc_b = chunk
+            if utc_b != utc:
+                raise ValueError("Series mix UTC-offset and naive timestamps")
+
+        # Everything up to the earlier of the two chunk ends can be matched now
+        cutoff = min(stamps_a[-1], stamps_b[-1])
+        n_a = np.searchsorted(stamps_a, cutoff, side='right')
+        n_b = np.searchsorted(stamps_b, cutoff, side='right')
+        common, idx_a, idx_b = np.intersect1d(stamps_a[:n_a], stamps_b[:n_b],
+                                              assume_unique=True, return_indices=True)
+        if len(common):
+            yield common, values_a[:n_a][idx_a], values_b[:n_b][idx_b], utc
+        stamps_a, values_a = stamps_a[n_a:], values_a[n_a:]
+        stamps_b, values_b = stamps_b[n_b:], values_b[n_b:]
+
+
+def llt_reach(sigma=1.0, iterations=3):
+    """Samples on either side that one ``twsca.llt_filter`` output depends on."""
+    return iterations * ((int(6 * sigma) | 1) // 2)
+
+
+class StreamingLLT:
+    """
+    ``twsca.llt_filter`` applied to a series that arrives in pieces.
+
+    Output lags the input by ``reach`` samples: a sample is emitted once
+    every sample it depends on has arrived, and ``flush`` emits the rest
+    with the same end-of-series handling as the whole-series filter.
+
+    Args:
+        sigma: Gaussian kernel width, as in twsca.llt_filter
+        alpha: Detail attenuation, as in twsca.llt_filter
+        iterations: Filter passes, as in twsca.llt_filter
+    """
+
+    def __init__(self, sigma=1.0, alpha=0.5, iterations=3):
+        from twsca import llt_filter
+
+        self._filter = llt_filter
+        self.sigma = sigma
+        self.alpha = alpha
+        self.iterations = iterations
+        self.reach = llt_reach(sigma, iterations)
+        self._raw = np.empty(0)
+        self._offset = 0   # stream position of self._raw[0]
+        self._emitted = 0  # number of samples emitted so far
+
+    def push(self, values):
+        """
+        Add samples.
+
+        Returns:
+            Smoothed values that are now final (possibly empty)
+        """
+        self._raw = np.concatenate([self._raw, np.asarray(values, dtype=float)])
+        return self._emit(len(self._raw) - self.reach)
+
+    def flush(self):
+        """Emit the remaining samples at the end of the series."""
+        return self._emit(len(self._raw))
+
+    def _emit(self, stop):
+        start = self._emitted - self._offset
+        if stop <= start:
+            return np.empty(0)
+        smoothed = self._filter(self._raw, sigma=self.sigma, alpha=self.alpha,
+                                iterations=self.iterations)
+        out = smoothed[start:stop]
+        self._emitted += len(out)
+        # Keep `reach` samples of left context for the next unemitted sample
+        drop = max(0, self._emitted - self._offset - self.reach)
+        self._raw = self._raw[drop:]
+        self._offset += drop
+        return out
+
+
+def _zscore_rows(windows):
+    """Z-score every window on its own (constant windows become zeros)."""
+    mean = windows.mean(axis=1, keepdims=True)
+    std = windows.std(axis=1, keepdims=True)
+    return np.divide(windows - mean, std, out=np.zeros_like(windows), where=std > 0)
+
+
+def stream_pair(main_path, comparison_path, ticker, window=30, column='Close',
+                chunk_size=100_000, llt_sigma=1.0, llt_alpha=0.5, max_warp=None,
+                dtw_threshold=None, batch_windows=4096):
+    """
+    Windowed TWSCA of one pair, computed chunk by chunk.
+
+    Args:
+        main_path: Price CSV of the main ticker
+        comparison_path: Price CSV of the comparison ticker
+        ticker: Comparison ticker symbol (written to the 'ticker' column)
+        window: Window length in samples
+        column: Price column to analyze
+        chunk_size: CSV rows parsed per chunk
+        llt_sigma: LLT filter sigma
+        llt_alpha: LLT filter alpha
+        max_warp: Sakoe-Chiba band radius for DTW (None for no band)
+        dtw_threshold: Windows whose DTW distance exceeds this are reported as inf
+        batch_windows: Windows scored per batch (bounds the working set)
+
+    Yields:
+        DataFrames with the results-store columns date, ticker,
+        correlation and dtw_distance
+    """
+    smoothers = (StreamingLLT(llt_sigma, llt_alpha), StreamingLLT(llt_sigma, llt_alpha))
+    pending = np.empty(0, dtype=np.int64)  # timestamps still inside the LLT lag
+    ring_stamps = np.empty(0, dtype=np.int64)
+    ring_x, ring_y = np.empty(0), np.empty(0)
+    utc = False
+
+    def score(stamps, x, y):
+        nonlocal ring_stamps, ring_x, ring_y
+        ext_stamps = np.concatenate([ring_stamps, stamps])
+        ext_x = np.concatenate([ring_x, x])
+        ext_y = np.concatenate([ring_y, y])
+        windows_x = windowed.sliding_windows(ext_x, window)
+        windows_y = windowed.sliding_windows(ext_y, window)
+        labels = ext_stamps[window:]
+        for start in range(0, len(windows_x), batch_windows):
+            zx = _zscore_rows(windows_x[start:start + batch_windows])
+            zy = _zscore_rows(windows_y[start:start + batch_windows])
+            dates = pd.DatetimeIndex(labels[start:start + batch_windows].view('datetime64[ns]'))
+            yield pd.DataFrame({
+                'date': dates.tz_localize('UTC') if utc else dates,
+                'ticker': ticker,
+                'correlation': windowed.correlate_spectra(windowed.window_spectra(zx),
+                                                          windowed.window_spectra(zy)),
+                'dtw_distance': dtw_kernels.dtw_distances(zx, zy, radius=max_warp,
+                                                          abandon_above=dtw_threshold),
+            })
+        # The last `window` samples start the next batch of windows
+        ring_stamps, ring_x, ring_y = ext_stamps[-window:], ext_x[-window:], ext_y[-window:]
+
+    def release(x, y):
+        nonlocal pending
+        stamps, pending = pending[:len(x)], pending[len(x):]
+        return score(stamps, x, y)
+
+    aligned = align_chunks(read_series_chunks(main_path, column, chunk_size),
+                           read_series_chunks(comparison_path, column, chunk_size))
+    for stamps, values_main, values_comp, utc in aligned:
+        pending = np.concatenate([pending, stamps])
+        yield from release(smoothers[0].push(values_main), smoothers[1].push(values_comp))
+    yield from release(smoothers[0].flush(), smoothers[1].flush())